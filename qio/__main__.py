@@ -18,7 +18,7 @@ from traceback import format_exc
 
 import click
 
-from qio import __version__, exception, maintenance
+from qio import __version__, exception
 from qio.cli import PlatformioCLI
 from qio.compat import IS_CYGWIN, ensure_python3
 
@@ -53,12 +53,17 @@ def cli(ctx, force, caller, no_ansi):  # pylint: disable=unused-argument
     except:  # pylint: disable=bare-except
         pass
 
+    # pylint: disable=import-outside-toplevel
+    from qio import maintenance
+
     maintenance.on_platformio_start(ctx, caller)
 
 
 @cli.result_callback()
 @click.pass_context
 def process_result(ctx, result, *_, **__):
+    from qio import maintenance  # pylint: disable=import-outside-toplevel
+
     maintenance.on_platformio_end(ctx, result)
 
 
@@ -105,6 +110,8 @@ def main(argv=None):
             exit_code = int(exc.code)
     except Exception as exc:  # pylint: disable=broad-except
         if not isinstance(exc, exception.ReturnErrorCode):
+            from qio import maintenance  # pylint: disable=import-outside-toplevel
+
             maintenance.on_platformio_exception(exc)
             error_str = "Error: "
             if isinstance(exc, exception.PlatformioException):
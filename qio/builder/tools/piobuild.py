@@ -34,6 +34,8 @@ SRC_CXX_EXT = ["cc", "cpp", "cxx", "c++"]
 SRC_BUILD_EXT = SRC_C_EXT + SRC_CXX_EXT + SRC_ASM_EXT
 SRC_FILTER_DEFAULT = ["+<*>", "-<.git%s>" % os.sep, "-<.svn%s>" % os.sep]
 
+_SRC_TREE_INDEXES = {}
+
 
 def scons_patched_match_splitext(path, suffixes=None):
     """Patch SCons Builder, append $OBJSUFFIX to the end of each target"""
@@ -159,7 +161,9 @@ def ProcessProjectDeps(env):
             )
             env.Exit(1)
 
-    if "test" not in env["BUILD_TYPE"] or env.GetProjectOption("test_build_src"):
+    if "test" in env["BUILD_TYPE"] and env.GetProjectOption("test_build_src"):
+        plb.env.BuildTestSharedSources("$PROJECT_SRC_DIR", env.get("SRC_FILTER"))
+    elif "test" not in env["BUILD_TYPE"]:
         plb.env.BuildSources(
             "$BUILD_SRC_DIR", "$PROJECT_SRC_DIR", env.get("SRC_FILTER")
         )
@@ -255,10 +259,16 @@ def StringifyMacro(env, value):  # pylint: disable=unused-argument
 
 
 def MatchSourceFiles(env, src_dir, src_filter=None, src_exts=None):
+    src_dir = env.subst(src_dir)
     src_filter = env.subst(src_filter) if src_filter else None
     src_filter = src_filter or SRC_FILTER_DEFAULT
     src_exts = src_exts or (SRC_BUILD_EXT + SRC_HEADER_EXT)
-    return fs.match_src_files(env.subst(src_dir), src_filter, src_exts)
+    # share the source tree index between calls within the same build
+    if src_dir not in _SRC_TREE_INDEXES:
+        _SRC_TREE_INDEXES[src_dir] = fs.SourceTreeIndex(src_dir)
+    return fs.match_src_files(
+        src_dir, src_filter, src_exts, src_index=_SRC_TREE_INDEXES[src_dir]
+    )
 
 
 def CollectBuildFiles(
@@ -20,7 +20,8 @@ import SCons.Defaults  # pylint: disable=import-error
 import SCons.Subst  # pylint: disable=import-error
 from SCons.Script import COMMAND_LINE_TARGETS  # pylint: disable=import-error
 
-from qio.proc import exec_command, where_is_program
+from qio.proc import where_is_program
+from qio.toolchain import get_compiler_defines
 
 
 def IsIntegrationDump(_):
@@ -65,26 +66,9 @@ def DumpIntegrationIncludes(env):
 
 
 def get_gcc_defines(env):
-    items = []
-    try:
-        sysenv = os.environ.copy()
-        sysenv["PATH"] = str(env["ENV"]["PATH"])
-        result = exec_command(
-            "echo | %s -dM -E -" % env.subst("$CC"), env=sysenv, shell=True
-        )
-    except OSError:
-        return items
-    if result["returncode"] != 0:
-        return items
-    for line in result["out"].split("\n"):
-        tokens = line.strip().split(" ", 2)
-        if not tokens or tokens[0] != "#define":
-            continue
-        if len(tokens) > 2:
-            items.append("%s=%s" % (tokens[1], tokens[2]))
-        else:
-            items.append(tokens[1])
-    return items
+    sysenv = os.environ.copy()
+    sysenv["PATH"] = str(env["ENV"]["PATH"])
+    return get_compiler_defines(env.subst("$CC"), env=sysenv)
 
 
 def dump_defines(env):
@@ -15,8 +15,10 @@
 # pylint: disable=too-many-instance-attributes, too-many-public-methods
 # pylint: disable=assignment-from-no-return, unused-argument, too-many-lines
 
+import atexit
 import hashlib
 import io
+import json
 import os
 import re
 import sys
@@ -108,6 +110,126 @@ class LibBuilderFactory:
         return []
 
 
+class IncludeGraphCache:
+    """Persistent cache of the implicit includes found by LDF scanners
+
+    Every scanned file is stored with the digests of all its dependencies
+    (the file itself and the includes found in it). An entry is reused only
+    when none of those files changed since the previous build. Scanning
+    results are grouped by a scanner context (LDF mode, include dirs,
+    CPPDEFINES) because the same file can resolve to different headers.
+    A context is reset when a file is added to or removed from one of
+    its include dirs or from the nested directories where the scanned files
+    and their includes were found (`#include "sub/header.h"`).
+    """
+
+    VERSION = 2
+
+    def __init__(self, path):
+        self.path = path
+        self._files = {}
+        self._graphs = {}
+        self._digests = {}  # file digests actual for the current run
+        self._validated_contexts = set()
+        self._modified = False
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            data = fs.load_json(self.path)
+        except exception.InvalidJSONFile:
+            return
+        if data.get("version") != self.VERSION:
+            return
+        self._files = data.get("files", {})
+        self._graphs = data.get("graphs", {})
+
+    def save(self):
+        if not self._modified or not os.path.isdir(os.path.dirname(self.path)):
+            return
+        # drop the files which are not referenced anymore
+        used_files = set()
+        for graph in self._graphs.values():
+            for entry in graph["entries"].values():
+                used_files.update(entry["deps"].keys())
+        self._files = {
+            path: state for path, state in self._files.items() if path in used_files
+        }
+        with open(self.path, mode="w", encoding="utf8") as fp:
+            json.dump(
+                dict(version=self.VERSION, files=self._files, graphs=self._graphs),
+                fp,
+            )
+        self._modified = False
+
+    @staticmethod
+    def get_dir_stamp(path):
+        return os.path.getmtime(path) if os.path.isdir(path) else None
+
+    def get_context(self, include_dirs, *options):
+        context = hashlib.sha1(
+            hashlib_encode_data(
+                json.dumps([include_dirs, options], sort_keys=True, default=str)
+            )
+        ).hexdigest()
+        if context in self._validated_contexts:
+            return context
+        self._validated_contexts.add(context)
+        dirs = {d: self.get_dir_stamp(d) for d in include_dirs}
+        graph = self._graphs.get(context, {})
+        if graph.get("dirs") != dirs or any(
+            self.get_dir_stamp(d) != stamp
+            for d, stamp in graph.get("subdirs", {}).items()
+        ):
+            self._graphs[context] = dict(dirs=dirs, subdirs={}, entries={})
+            self._modified = True
+        return context
+
+    def get_file_digest(self, path):
+        if path in self._digests:
+            return self._digests[path]
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._digests[path] = None
+            return None
+        state = self._files.get(path)
+        if state and state[0] == st.st_mtime and state[1] == st.st_size:
+            digest = state[2]
+        else:
+            digest = fs.calculate_file_hashsum("sha1", path)
+            self._files[path] = [st.st_mtime, st.st_size, digest]
+            self._modified = True
+        self._digests[path] = digest
+        return digest
+
+    def get(self, context, path):
+        entry = self._graphs[context]["entries"].get(path)
+        if not entry:
+            return None
+        for dep_path, digest in entry["deps"].items():
+            if self.get_file_digest(dep_path) != digest:
+                return None
+        return entry["includes"]
+
+    def set(self, context, path, includes):
+        deps = {}
+        for item in [path] + includes:
+            digest = self.get_file_digest(item)
+            if digest is None:  # do not cache unresolved files
+                return
+            deps[item] = digest
+        graph = self._graphs[context]
+        graph["entries"][path] = dict(deps=deps, includes=includes)
+        for item in deps:
+            item_dir = os.path.dirname(item)
+            if item_dir not in graph["dirs"] and item_dir not in graph["subdirs"]:
+                graph["subdirs"][item_dir] = self.get_dir_stamp(item_dir)
+        self._modified = True
+
+
 class LibBuilderBase:
 
     CLASSIC_SCANNER = SCons.Scanner.C.CScanner()
@@ -120,6 +242,7 @@ class LibBuilderBase:
     PARSE_SRC_BY_H_NAME = True
 
     _INCLUDE_DIRS_CACHE = None
+    _INCLUDE_GRAPH_CACHE = None
 
     def __init__(self, env, path, manifest=None, verbose=False):
         self.env = env.Clone()
@@ -353,6 +476,14 @@ class LibBuilderBase:
         include_dirs = [self.env.Dir(d) for d in self.get_include_dirs()]
         include_dirs.extend(LibBuilderBase._INCLUDE_DIRS_CACHE)
 
+        graph_cache = self.get_include_graph_cache()
+        graph_context = graph_cache.get_context(
+            [d.get_abspath() for d in include_dirs],
+            self.lib_ldf_mode,
+            self.CCONDITIONAL_SCANNER_DEPTH,
+            self.env.Flatten(self.env.subst("$CPPDEFINES")),
+        )
+
         result = []
         search_files = search_files or []
         while search_files:
@@ -361,23 +492,15 @@ class LibBuilderBase:
                 continue
             self._processed_search_files.append(node.get_abspath())
 
-            try:
-                assert "+" in self.lib_ldf_mode
-                candidates = LibBuilderBase.CCONDITIONAL_SCANNER(
-                    node,
-                    self.env,
-                    tuple(include_dirs),
-                    depth=self.CCONDITIONAL_SCANNER_DEPTH,
-                )
-
-            except Exception as exc:  # pylint: disable=broad-except
-                if self.verbose and "+" in self.lib_ldf_mode:
-                    sys.stderr.write(
-                        "Warning! Classic Pre Processor is used for `%s`, "
-                        "advanced has failed with `%s`\n" % (node.get_abspath(), exc)
-                    )
-                candidates = LibBuilderBase.CLASSIC_SCANNER(
-                    node, self.env, tuple(include_dirs)
+            cached_includes = graph_cache.get(graph_context, node.get_abspath())
+            if cached_includes is not None:
+                candidates = [self.env.File(p) for p in cached_includes]
+            else:
+                candidates = self._scan_implicit_includes(node, include_dirs)
+                graph_cache.set(
+                    graph_context,
+                    node.get_abspath(),
+                    [c.get_abspath() for c in candidates],
                 )
 
             # print(node.get_abspath(), [c.get_abspath() for c in candidates])
@@ -406,6 +529,31 @@ class LibBuilderBase:
 
         return result
 
+    def get_include_graph_cache(self):
+        if not LibBuilderBase._INCLUDE_GRAPH_CACHE:
+            LibBuilderBase._INCLUDE_GRAPH_CACHE = IncludeGraphCache(
+                self.env.subst(os.path.join("$BUILD_DIR", "ldf.cache.json"))
+            )
+            atexit.register(LibBuilderBase._INCLUDE_GRAPH_CACHE.save)
+        return LibBuilderBase._INCLUDE_GRAPH_CACHE
+
+    def _scan_implicit_includes(self, node, include_dirs):
+        try:
+            assert "+" in self.lib_ldf_mode
+            return LibBuilderBase.CCONDITIONAL_SCANNER(
+                node,
+                self.env,
+                tuple(include_dirs),
+                depth=self.CCONDITIONAL_SCANNER_DEPTH,
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            if self.verbose and "+" in self.lib_ldf_mode:
+                sys.stderr.write(
+                    "Warning! Classic Pre Processor is used for `%s`, "
+                    "advanced has failed with `%s`\n" % (node.get_abspath(), exc)
+                )
+            return LibBuilderBase.CLASSIC_SCANNER(node, self.env, tuple(include_dirs))
+
     def search_deps_recursive(self, search_files=None):
         self.process_dependencies()
 
@@ -495,7 +643,12 @@ class LibBuilderBase:
             nodes = self.env.CollectBuildFiles(
                 self.build_dir, self.src_dir, self.src_filter
             )
-            if nodes:
+            if nodes and "test" in self.env["BUILD_TYPE"]:
+                # reuse an archive between the test suites
+                libs.append(
+                    self.env.BuildTestSharedLibrary(self.path, self.build_dir, nodes)
+                )
+            elif nodes:
                 libs.append(
                     self.env.BuildLibrary(
                         self.build_dir, self.src_dir, self.src_filter, nodes
@@ -1190,6 +1343,9 @@ def ConfigureProjectLibBuilder(env):
     else:
         click.echo("No dependencies")
 
+    if "test" in env["BUILD_TYPE"]:
+        project.env.SaveTestFingerprint(project)
+
     return project
 
 
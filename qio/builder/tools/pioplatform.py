@@ -34,6 +34,9 @@ from qio.project.config import ProjectOptions
 def _PioPlatform():
     env = DefaultEnvironment()
     p = PlatformFactory.new(os.path.dirname(env["PLATFORM_MANIFEST"]))
+    snapshot = env.GetProjectSnapshot()
+    if snapshot:
+        p.apply_project_snapshot(snapshot)
     p.configure_project_packages(env["PIOENV"], COMMAND_LINE_TARGETS)
     return p
 
@@ -12,11 +12,28 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from qio import util
 from qio.compat import MISSING
+from qio.platform.base import PlatformBase
 from qio.project.config import ProjectConfig
 
 
+@util.memoized()
+def _LoadProjectSnapshot(path):
+    data = PlatformBase.load_project_snapshot(path)
+    if not data or not ProjectConfig.from_snapshot(data["config"], register=True):
+        return None
+    return data
+
+
+def GetProjectSnapshot(env):
+    if not env.get("PROJECT_SNAPSHOT"):
+        return None
+    return _LoadProjectSnapshot(env["PROJECT_SNAPSHOT"])
+
+
 def GetProjectConfig(env):
+    env.GetProjectSnapshot()
     return ProjectConfig.get_instance(env["PROJECT_CONFIG"])
 
 
@@ -47,6 +64,7 @@ def exists(_):
 
 
 def generate(env):
+    env.AddMethod(GetProjectSnapshot)
     env.AddMethod(GetProjectConfig)
     env.AddMethod(GetProjectOptions)
     env.AddMethod(GetProjectOption)
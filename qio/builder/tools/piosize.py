@@ -12,19 +12,137 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-# pylint: disable=too-many-locals
+# pylint: disable=too-many-locals,too-many-branches
 
 import json
 import sys
+from bisect import bisect_right
 from os import environ, makedirs, remove
-from os.path import isdir, join, splitdrive
+from os.path import isabs, isdir, isfile, join, splitdrive
 
+from elftools.common.exceptions import ELFError
+from elftools.elf.constants import SH_FLAGS
 from elftools.elf.descriptions import describe_sh_flags
 from elftools.elf.elffile import ELFFile
 
+from qio import fs
 from qio.compat import IS_WINDOWS
 from qio.proc import exec_command
 
+SIZEDATA_CACHE_VERSION = 1
+
+
+class DwarfLineIndex:
+    """Address to source location index built from the `.debug_line` section"""
+
+    def __init__(self, sequences, loaded_ranges=None):
+        ranges = []
+        for sequence in sequences:
+            if self._is_loaded_sequence(sequence, loaded_ranges):
+                ranges.extend(sequence)
+        ranges.sort(key=lambda item: item[0])
+        self._ranges = ranges
+        self._starts = [item[0] for item in ranges]
+
+    def __len__(self):
+        return len(self._ranges)
+
+    @classmethod
+    def from_elffile(cls, elffile):
+        return cls(cls._iter_sequences(elffile), cls._get_loaded_ranges(elffile))
+
+    @staticmethod
+    def _get_loaded_ranges(elffile):
+        return [
+            (section["sh_addr"], section["sh_addr"] + section["sh_size"])
+            for section in elffile.iter_sections()
+            if section["sh_flags"] & SH_FLAGS.SHF_ALLOC and section["sh_size"]
+        ]
+
+    @staticmethod
+    def _is_loaded_sequence(sequence, loaded_ranges):
+        """The sequences of the sections removed by a linker (GC sections)
+        are kept with the relocated to 0 addresses and overlap real code.
+        A 0-based sequence is kept when a loaded section starts at 0 (a flash
+        of many MCUs), otherwise it is not distinguished from discarded code"""
+        if not sequence:
+            return False
+        if loaded_ranges is None:
+            return sequence[0][0] != 0
+        start, end = sequence[0][0], sequence[-1][1]
+        return any(lo <= start and end <= hi for lo, hi in loaded_ranges)
+
+    @classmethod
+    def _iter_sequences(cls, elffile):
+        dwarfinfo = elffile.get_dwarf_info()
+        for cu in dwarfinfo.iter_CUs():
+            lineprog = dwarfinfo.line_program_for_CU(cu)
+            if not lineprog:
+                continue
+            comp_dir = cu.get_top_DIE().attributes.get("DW_AT_comp_dir")
+            comp_dir = cls._decode(comp_dir.value) if comp_dir else ""
+            file_paths = {}
+            sequence = []
+            prev_state = None
+            for entry in lineprog.get_entries():
+                state = entry.state
+                if state is None:
+                    continue
+                if prev_state and state.address > prev_state.address:
+                    if prev_state.file not in file_paths:
+                        file_paths[prev_state.file] = cls._get_file_path(
+                            lineprog, prev_state.file, comp_dir
+                        )
+                    sequence.append(
+                        (
+                            prev_state.address,
+                            state.address,
+                            file_paths[prev_state.file],
+                            prev_state.line,
+                        )
+                    )
+                prev_state = None if state.end_sequence else state
+                if state.end_sequence:
+                    yield sequence
+                    sequence = []
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, bytes):
+            return value.decode("utf-8", errors="replace")
+        return value
+
+    @staticmethod
+    def _get_file_path(lineprog, file_index, comp_dir):
+        header = lineprog.header
+        dwarf5 = header["version"] >= 5
+        try:
+            file_entry = header["file_entry"][file_index if dwarf5 else file_index - 1]
+        except IndexError:
+            return None
+        path = DwarfLineIndex._decode(file_entry.name)
+        dir_index = file_entry.dir_index
+        if dwarf5 or dir_index > 0:
+            try:
+                include_dir = header["include_directory"][
+                    dir_index if dwarf5 else dir_index - 1
+                ]
+                path = join(DwarfLineIndex._decode(include_dir), path)
+            except IndexError:
+                pass
+        if comp_dir and not isabs(path):
+            path = join(comp_dir, path)
+        return path
+
+    def lookup(self, addr):
+        index = bisect_right(self._starts, addr) - 1
+        if index < 0:
+            return None
+        start, end, file_path, line = self._ranges[index]
+        if not file_path or not start <= addr < end:
+            return None
+        return (file_path, line)
+
 
 def _run_tool(cmd, env, tool_args):
     sysenv = environ.copy()
@@ -56,6 +174,20 @@ def _get_symbol_locations(env, elf_path, addrs):
     return dict(zip(addrs, [l.strip() for l in locations]))
 
 
+def _get_indexed_symbol_locations(elffile, addrs):
+    try:
+        line_index = DwarfLineIndex.from_elffile(elffile)
+    except (ELFError, KeyError, ValueError, AttributeError):
+        return None
+    if not line_index:
+        return None
+    result = {}
+    for addr in addrs:
+        location = line_index.lookup(int(addr, 16))
+        result[addr] = "%s:%d" % location if location else "??:0"
+    return result
+
+
 def _get_demangled_names(env, mangled_names):
     if not mangled_names:
         return {}
@@ -73,12 +205,57 @@ def _get_demangled_names(env, mangled_names):
     )
 
 
-def _determine_section(sections, symbol_addr):
-    for section, info in sections.items():
-        if not _is_flash_section(info) and not _is_ram_section(info):
+def _load_sizedata_cache(env):
+    cache_path = join(env.subst("$BUILD_DIR"), "sizedata.cache.json")
+    if isfile(cache_path):
+        try:
+            data = fs.load_json(cache_path)
+            if data.get("version") == SIZEDATA_CACHE_VERSION:
+                return data
+        except Exception:  # pylint: disable=broad-except
+            pass
+    return dict(version=SIZEDATA_CACHE_VERSION, elf_hash=None, locations={})
+
+
+def _save_sizedata_cache(env, data):
+    with open(
+        join(env.subst("$BUILD_DIR"), "sizedata.cache.json"), mode="w", encoding="utf8"
+    ) as fp:
+        json.dump(data, fp)
+
+
+def _build_section_intervals(sections):
+    """Split the address space into non-overlapping intervals.
+
+    Each interval is owned by the first flash/RAM section (in ELF order)
+    covering it, so a symbol address is classified with a binary search.
+    """
+    candidates = [
+        (name, info["start_addr"], info["start_addr"] + info["size"])
+        for name, info in sections.items()
+        if info["size"] and (_is_flash_section(info) or _is_ram_section(info))
+    ]
+    bounds = sorted(set(b for _, start, end in candidates for b in (start, end)))
+    intervals = []
+    for start, end in zip(bounds, bounds[1:]):
+        owner = next(
+            (name for name, s_start, s_end in candidates if s_start <= start < s_end),
+            None,
+        )
+        if not owner:
+            continue
+        if intervals and intervals[-1][2] == owner and intervals[-1][1] == start:
+            intervals[-1] = (intervals[-1][0], end, owner)
             continue
-        if symbol_addr in range(info["start_addr"], info["start_addr"] + info["size"]):
-            return section
+        intervals.append((start, end, owner))
+    return ([item[0] for item in intervals], intervals)
+
+
+def _determine_section(section_intervals, symbol_addr):
+    starts, intervals = section_intervals
+    index = bisect_right(starts, symbol_addr) - 1
+    if index >= 0 and symbol_addr < intervals[index][1]:
+        return intervals[index][2]
     return "unknown"
 
 
@@ -128,6 +305,7 @@ def _collect_symbols_info(env, elffile, elf_path, sections):
     sysenv = environ.copy()
     sysenv["PATH"] = str(env["ENV"]["PATH"])
 
+    section_intervals = _build_section_intervals(sections)
     symbol_addrs = []
     mangled_names = []
     for s in symbol_section.iter_symbols():
@@ -145,7 +323,7 @@ def _collect_symbols_info(env, elffile, elf_path, sections):
             "name": s.name,
             "type": symbol_type,
             "size": symbol_size,
-            "section": _determine_section(sections, symbol_addr),
+            "section": _determine_section(section_intervals, symbol_addr),
         }
 
         if s.name.startswith("_Z"):
@@ -154,8 +332,30 @@ def _collect_symbols_info(env, elffile, elf_path, sections):
         symbol_addrs.append(hex(symbol_addr))
         symbols.append(symbol)
 
-    symbol_locations = _get_symbol_locations(env, elf_path, symbol_addrs)
-    demangled_names = _get_demangled_names(env, mangled_names)
+    # resolved locations are valid only for the same ELF file,
+    # demangled names are reused between builds
+    cache = _load_sizedata_cache(env)
+    elf_hash = fs.calculate_file_hashsum("sha1", elf_path)
+    if cache["elf_hash"] == elf_hash:
+        symbol_locations = cache["locations"]
+    else:
+        symbol_locations = _get_indexed_symbol_locations(elffile, symbol_addrs)
+        if symbol_locations is None:
+            symbol_locations = _get_symbol_locations(env, elf_path, symbol_addrs)
+        cache.update(dict(elf_hash=elf_hash, locations=symbol_locations))
+    demangled_names = cache.get("demangled_names", {})
+    demangled_names.update(
+        _get_demangled_names(
+            env, [name for name in set(mangled_names) if name not in demangled_names]
+        )
+    )
+    cache["demangled_names"] = {
+        name: demangled_names[name]
+        for name in set(mangled_names)
+        if name in demangled_names
+    }
+    _save_sizedata_cache(env, cache)
+
     for symbol in symbols:
         if symbol["name"].startswith("_Z"):
             symbol["demangled_name"] = demangled_names.get(symbol["name"])
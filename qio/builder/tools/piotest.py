@@ -12,12 +12,123 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
+import hashlib
+import json
 import os
 
+from SCons.Node import FS  # pylint: disable=import-error
+from SCons.Script import DefaultEnvironment  # pylint: disable=import-error
+from SCons.Script import GetBuildFailures  # pylint: disable=import-error
+
+from qio import fs
 from qio.builder.tools import piobuild
+from qio.compat import hashlib_encode_data
+from qio.exception import InvalidJSONFile
+from qio.test.impact import (
+    TestFingerprint,
+    get_fingerprint_path,
+    get_fingerprints_dir,
+)
 from qio.test.result import TestSuite
 from qio.test.runners.factory import TestRunnerFactory
 
+# compiler configuration of the objects that are shared between test suites
+TEST_SHARED_BUILD_FLAGS = (
+    "$CC $CXX $AS $_CPPDEFFLAGS $_CPPINCFLAGS "
+    "$CCFLAGS $CFLAGS $CXXFLAGS $ASFLAGS $ASPPFLAGS"
+)
+
+
+class TestSharedObjects:
+    """Objects which do not depend on a test suite (the project sources and
+    the libraries) grouped by a hash of their compiler configuration.
+
+    A build of a test suite saves the built objects to a manifest, the suites
+    built concurrently in the separate build dirs link them from the manifest
+    of the env build dir (see `PIOTEST_SHARED_BUILD_DIR`) instead of
+    compiling them again.
+    """
+
+    VERSION = 1
+
+    def __init__(self, build_dir, prebuilt_dir=None):
+        self.path = os.path.join(build_dir, "manifest.json")
+        self._items = self._load(self.path)
+        self._prebuilt = {}
+        if prebuilt_dir and os.path.abspath(prebuilt_dir) != os.path.abspath(build_dir):
+            self._prebuilt = self._load(os.path.join(prebuilt_dir, "manifest.json"))
+        self._modified = False
+
+    @classmethod
+    def _load(cls, path):
+        if not os.path.isfile(path):
+            return {}
+        try:
+            data = fs.load_json(path)
+        except InvalidJSONFile:
+            return {}
+        if data.get("version") != cls.VERSION:
+            return {}
+        return data.get("items", {})
+
+    def get_prebuilt(self, key, build_hash):
+        item = self._prebuilt.get(key)
+        if not item or item["hash"] != build_hash:
+            return None
+        if not all(os.path.isfile(path) for path in item["files"]):
+            return None
+        return item["files"]
+
+    def add(self, key, build_hash, nodes):
+        self._items[key] = dict(
+            hash=build_hash, files=[node.get_abspath() for node in nodes]
+        )
+        self._modified = True
+
+    def save(self):
+        if GetBuildFailures():
+            # the other suites must not link the objects of a failed build
+            if os.path.isfile(self.path):
+                os.remove(self.path)
+            return
+        if not self._modified:
+            return
+        items = {
+            key: item
+            for key, item in self._items.items()
+            if all(os.path.isfile(path) for path in item["files"])
+        }
+        if not os.path.isdir(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path))
+        with open(self.path, mode="w", encoding="utf8") as fp:
+            json.dump(dict(version=self.VERSION, items=items), fp)
+        self._modified = False
+
+
+_TEST_SHARED_OBJECTS = []
+
+
+def GetTestSharedObjects(env):
+    if not _TEST_SHARED_OBJECTS:
+        _TEST_SHARED_OBJECTS.append(
+            TestSharedObjects(
+                env.subst("$BUILD_TEST_SHARED_DIR"),
+                os.environ.get("PIOTEST_SHARED_BUILD_DIR"),
+            )
+        )
+        atexit.register(_TEST_SHARED_OBJECTS[0].save)
+    return _TEST_SHARED_OBJECTS[0]
+
+
+def GetTestSharedBuildHash(env):
+    flags = env.subst(TEST_SHARED_BUILD_FLAGS)
+    # a Unity config is generated to the build dir of each suite, the suites
+    # built concurrently (`pio test --jobs`) get the same config in separate dirs
+    if env.get("UNITY_CONFIG_DIR"):
+        flags = flags.replace(env.subst("$UNITY_CONFIG_DIR"), "$UNITY_CONFIG_DIR")
+    return hashlib.sha1(hashlib_encode_data(flags)).hexdigest()[:10]
+
 
 def ConfigureTestTarget(env):
     env.Append(
@@ -25,6 +136,8 @@ def ConfigureTestTarget(env):
         PIOTEST_SRC_FILTER=[f"+<*.{ext}>" for ext in piobuild.SRC_BUILD_EXT],
     )
     env.Prepend(CPPPATH=["$PROJECT_TEST_DIR"])
+    # include dirs of the running suite, see `BuildTestSharedSources()`
+    env.Replace(PIOTEST_SUITE_CPPPATH=[])
 
     if "PIOTEST_RUNNING_NAME" in env:
         test_name = env["PIOTEST_RUNNING_NAME"]
@@ -39,11 +152,15 @@ def ConfigureTestTarget(env):
                     for ext in piobuild.SRC_BUILD_EXT
                 ],
                 CPPPATH=[os.path.join("$PROJECT_TEST_DIR", test_name)],
+                PIOTEST_SUITE_CPPPATH=[os.path.join("$PROJECT_TEST_DIR", test_name)],
             )
 
         env.Prepend(
             PIOTEST_SRC_FILTER=[f"+<$PIOTEST_RUNNING_NAME{os.path.sep}>"],
             CPPPATH=[os.path.join("$PROJECT_TEST_DIR", "$PIOTEST_RUNNING_NAME")],
+            PIOTEST_SUITE_CPPPATH=[
+                os.path.join("$PROJECT_TEST_DIR", "$PIOTEST_RUNNING_NAME")
+            ],
         )
 
     test_runner = TestRunnerFactory.new(
@@ -53,8 +170,108 @@ def ConfigureTestTarget(env):
     test_runner.configure_build_env(env)
 
 
+def _contains_headers(path):
+    for _, __, filenames in os.walk(path):
+        for name in filenames:
+            if name.rsplit(".", 1)[-1] in piobuild.SRC_HEADER_EXT:
+                return True
+    return False
+
+
+def BuildTestSharedSources(env, src_dir, src_filter=None):
+    """Build the project sources once for the suites with the same compiler
+    configuration. The include dirs of the running suite are dropped unless
+    they contain headers which may override the project ones."""
+    srcenv = env.Clone()
+    suite_cpppath = [
+        path
+        for path in env.get("PIOTEST_SUITE_CPPPATH", [])
+        if not _contains_headers(env.subst(path))
+    ]
+    srcenv.Replace(
+        CPPPATH=[path for path in env.get("CPPPATH", []) if path not in suite_cpppath]
+    )
+    build_hash = srcenv.GetTestSharedBuildHash()
+    shared_objects = env.GetTestSharedObjects()
+    key = "src:%s" % build_hash
+    prebuilt = shared_objects.get_prebuilt(key, build_hash)
+    if prebuilt:
+        objects = [env.File(path) for path in prebuilt]
+    else:
+        variant_dir = os.path.join("$BUILD_TEST_SHARED_DIR", build_hash, "src")
+        objects = [
+            srcenv.Object(node) if isinstance(node, FS.File) else node
+            for node in srcenv.CollectBuildFiles(variant_dir, src_dir, src_filter)
+        ]
+        shared_objects.add(key, build_hash, env.Flatten(objects))
+    DefaultEnvironment().Append(PIOBUILDFILES=objects)
+
+
+def BuildTestSharedLibrary(env, lib_path, variant_dir, nodes):
+    env.ProcessUnFlags(env.get("BUILD_UNFLAGS"))
+    build_hash = env.GetTestSharedBuildHash()
+    shared_objects = env.GetTestSharedObjects()
+    key = "lib:%s" % lib_path
+    prebuilt = shared_objects.get_prebuilt(key, build_hash)
+    if prebuilt:
+        return [env.File(path) for path in prebuilt]
+    library = env.BuildLibrary(variant_dir, None, nodes=nodes)
+    shared_objects.add(key, build_hash, env.Flatten([library]))
+    return library
+
+
+def SaveTestFingerprint(env, project):
+    """Save the inputs of the running suite found by LDF, they are used by
+    `pio test --changed-since` to select the affected suites"""
+    if "PIOTEST_RUNNING_NAME" not in env:
+        return
+    fingerprint = TestFingerprint()
+    graph_cache = project.get_include_graph_cache()
+    # pylint: disable=protected-access
+    for path in project._processed_search_files + env.GetProjectConfig()._parsed:
+        fingerprint.add_file(path, graph_cache.get_file_digest(os.path.abspath(path)))
+    for path in env.GetExtraScripts("pre") + env.GetExtraScripts("post"):
+        fingerprint.add_file(path)
+    dirs = [
+        project.include_dir,
+        os.path.join(env.subst("$PROJECT_TEST_DIR"), env["PIOTEST_RUNNING_NAME"]),
+    ]
+    # LDF does not follow the sources which are built for a test, a new or
+    # removed file changes a program too
+    if env.GetProjectOption("test_build_src"):
+        dirs.append(project.src_dir)
+
+    def _collect_lib_dirs(lb):
+        for deplb in lb.depbuilders:
+            if deplb.path not in dirs:
+                dirs.append(deplb.path)
+                _collect_lib_dirs(deplb)
+
+    _collect_lib_dirs(project)
+    for path in dirs:
+        if path:
+            fingerprint.add_dir(path)
+
+    def _save():
+        if not GetBuildFailures():
+            fingerprint.save(
+                get_fingerprint_path(
+                    get_fingerprints_dir(env.subst("$PROJECT_WORKSPACE_DIR")),
+                    env["PIOENV"],
+                    env["PIOTEST_RUNNING_NAME"],
+                )
+            )
+
+    atexit.register(_save)
+
+
 def generate(env):
     env.AddMethod(ConfigureTestTarget)
+    env.AddMethod(SaveTestFingerprint)
+    env.AddMethod(GetTestSharedObjects)
+    env.AddMethod(GetTestSharedBuildHash)
+    env.AddMethod(BuildTestSharedSources)
+    env.AddMethod(BuildTestSharedLibrary)
 
 
 def exists(_):
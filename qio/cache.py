@@ -12,32 +12,57 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import codecs
 import hashlib
 import os
+import sqlite3
+from collections import OrderedDict
 from time import time
 
 from qio import app, fs
 from qio.compat import hashlib_encode_data
-from qio.package.lockfile import LockFile
 from qio.project.helpers import get_project_cache_dir
 
 
 class ContentCache:
-    def __init__(self, namespace=None):
+    """Key/value cache with an expiration time backed by SQLite.
+
+    Items are indexed by expiration and access time, so expired items are
+    removed with a single indexed query and the least recently used items
+    are evicted when the cache exceeds `MAX_SIZE`. A total size is kept in
+    the `meta` table and an access time is updated not more often than
+    `ACCESS_RESOLUTION`, so a cache hit is a read-only query. SQLite
+    transactions make `get`/`set` atomic between processes without a global
+    lock file.
+    """
+
+    DB_NAME = "db.sqlite3"
+    MAX_SIZE = 50 * 1024 * 1024  # in bytes
+    CONNECT_TIMEOUT = 10  # in seconds
+    ACCESS_RESOLUTION = 3600  # in seconds
+    MEMORY_MAX_ITEMS = 256
+
+    # in-process read-through LRU layer, {(cache_dir, key): (expire, data)}
+    _MEMORY_ITEMS = OrderedDict()
+
+    def __init__(self, namespace=None, memory_layer=False):
         self.cache_dir = os.path.join(get_project_cache_dir(), namespace or "content")
-        self._db_path = os.path.join(self.cache_dir, "db.data")
-        self._lockfile = None
+        self.memory_layer = memory_layer
+        self._db_path = os.path.join(self.cache_dir, self.DB_NAME)
+        self._conn = None
+        # remove a legacy file-based storage
+        if os.path.isfile(os.path.join(self.cache_dir, "db.data")):
+            fs.rmtree(self.cache_dir)
         if not os.path.isdir(self.cache_dir):
             os.makedirs(self.cache_dir)
 
     def __enter__(self):
-        # cleanup obsolete items
-        self.delete()
         return self
 
     def __exit__(self, type_, value, traceback):
-        pass
+        self.close()
+
+    def __del__(self):
+        self.close()
 
     @staticmethod
     def key_from_args(*args):
@@ -47,113 +72,208 @@ class ContentCache:
                 h.update(hashlib_encode_data(arg))
         return h.hexdigest()
 
-    def get_cache_path(self, key):
-        assert "/" not in key and "\\" not in key
-        key = str(key)
-        assert len(key) > 3
-        return os.path.join(self.cache_dir, key)
+    @staticmethod
+    def parse_valid_time(valid):
+        tdmap = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+        assert valid.endswith(tuple(tdmap))
+        return tdmap[valid[-1]] * int(valid[:-1])
+
+    def _get_connection(self):
+        if self._conn:
+            return self._conn
+        self._conn = sqlite3.connect(
+            self._db_path, timeout=self.CONNECT_TIMEOUT, isolation_level=None
+        )
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.DatabaseError:  # not supported by a file system
+            pass
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expire INTEGER NOT NULL,
+                accessed INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS items_expire ON items (expire);
+            CREATE INDEX IF NOT EXISTS items_accessed ON items (accessed);
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+        # a total size of the items created by the previous versions
+        if not self._conn.execute("SELECT 1 FROM meta WHERE name = 'size'").fetchone():
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (name, value) "
+                "SELECT 'size', COALESCE(SUM(size), 0) FROM items"
+            )
+        return self._conn
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    def _memory_key(self, key):
+        return (self.cache_dir, key)
+
+    def _memory_get(self, key, now):
+        memory_key = self._memory_key(key)
+        item = self._MEMORY_ITEMS.get(memory_key)
+        if not item:
+            return None
+        if now >= item[0]:
+            del self._MEMORY_ITEMS[memory_key]
+            return None
+        self._MEMORY_ITEMS.move_to_end(memory_key)
+        return item[1]
+
+    def _memory_set(self, key, expire, data):
+        memory_key = self._memory_key(key)
+        self._MEMORY_ITEMS[memory_key] = (expire, data)
+        self._MEMORY_ITEMS.move_to_end(memory_key)
+        if len(self._MEMORY_ITEMS) <= self.MEMORY_MAX_ITEMS:
+            return
+        now = int(time())
+        for item_key, item in list(self._MEMORY_ITEMS.items()):
+            if now >= item[0]:
+                del self._MEMORY_ITEMS[item_key]
+        while len(self._MEMORY_ITEMS) > self.MEMORY_MAX_ITEMS:
+            self._MEMORY_ITEMS.popitem(last=False)
 
     def get(self, key):
-        cache_path = self.get_cache_path(key)
-        if not os.path.isfile(cache_path):
+        key = str(key)
+        now = int(time())
+        if self.memory_layer:
+            data = self._memory_get(key, now)
+            if data is not None:
+                return data
+        try:
+            conn = self._get_connection()
+            row = conn.execute(
+                "SELECT data, expire, accessed FROM items WHERE key = ? AND expire > ?",
+                (key, now),
+            ).fetchone()
+            if not row:
+                return None
+            if now - row[2] >= self.ACCESS_RESOLUTION:
+                conn.execute("UPDATE items SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
             return None
-        with codecs.open(cache_path, "rb", encoding="utf8") as fp:
-            return fp.read()
+        if self.memory_layer:
+            self._memory_set(key, row[1], row[0])
+        return row[0]
 
     def set(self, key, data, valid):
+        key = str(key)
+        self._MEMORY_ITEMS.pop(self._memory_key(key), None)
         if not app.get_setting("enable_cache"):
             return False
-        cache_path = self.get_cache_path(key)
-        if os.path.isfile(cache_path):
-            self.delete(key)
         if not data:
+            self.delete(key)
             return False
-        tdmap = {"s": 1, "m": 60, "h": 3600, "d": 86400}
-        assert valid.endswith(tuple(tdmap))
-        expire_time = int(time() + tdmap[valid[-1]] * int(valid[:-1]))
-
-        if not self._lock_dbindex():
+        now = int(time())
+        expire = now + self.parse_valid_time(valid)
+        try:
+            size = len(hashlib_encode_data(data))
+            conn = self._get_connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                total_size = self._get_total_size(conn) + size
+                total_size -= self._delete_items(conn, [key])
+                conn.execute(
+                    "INSERT INTO items (key, data, size, expire, accessed) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, data, size, expire, now),
+                )
+                self._evict(conn, now, total_size)
+        except (sqlite3.Error, UnicodeError):
             return False
+        if self.memory_layer:
+            self._memory_set(key, expire, data)
+        return True
 
-        if not os.path.isdir(os.path.dirname(cache_path)):
-            os.makedirs(os.path.dirname(cache_path))
-        try:
-            with codecs.open(cache_path, mode="wb", encoding="utf8") as fp:
-                fp.write(data)
-            with open(self._db_path, mode="a", encoding="utf8") as fp:
-                fp.write("%s=%s\n" % (str(expire_time), os.path.basename(cache_path)))
-        except UnicodeError:
-            if os.path.isfile(cache_path):
-                try:
-                    os.remove(cache_path)
-                except OSError:
-                    pass
-
-        return self._unlock_dbindex()
+    @staticmethod
+    def _get_total_size(conn):
+        row = conn.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _set_total_size(conn, size):
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES ('size', ?)",
+            (max(0, size),),
+        )
+
+    @staticmethod
+    def _delete_items(conn, keys):
+        """Returns a size of the deleted items"""
+        size = 0
+        for key in keys:
+            row = conn.execute(
+                "SELECT size FROM items WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                conn.execute("DELETE FROM items WHERE key = ?", (key,))
+                size += row[0]
+        return size
+
+    @staticmethod
+    def _delete_expired_items(conn, now):
+        """Returns a size of the deleted items"""
+        size = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM items WHERE expire <= ?", (now,)
+        ).fetchone()[0]
+        if size:
+            conn.execute("DELETE FROM items WHERE expire <= ?", (now,))
+        return size
+
+    def _evict(self, conn, now, total_size):
+        total_size -= self._delete_expired_items(conn, now)
+        if total_size > self.MAX_SIZE:
+            # remove the least recently used items
+            for key, size in conn.execute(
+                "SELECT key, size FROM items ORDER BY accessed ASC"
+            ).fetchall():
+                if total_size <= self.MAX_SIZE:
+                    break
+                conn.execute("DELETE FROM items WHERE key = ?", (key,))
+                total_size -= size
+        self._set_total_size(conn, total_size)
 
     def delete(self, keys=None):
         """Keys=None, delete expired items"""
-        if not os.path.isfile(self._db_path):
-            return None
-        if not keys:
-            keys = []
-        if not isinstance(keys, list):
+        if keys is not None and not isinstance(keys, list):
             keys = [keys]
-        paths_for_delete = [self.get_cache_path(k) for k in keys]
-        found = False
-        newlines = []
-        with open(self._db_path, encoding="utf8") as fp:
-            for line in fp.readlines():
-                line = line.strip()
-                if "=" not in line:
-                    continue
-                expire, fname = line.split("=")
-                path = os.path.join(self.cache_dir, fname)
-                try:
-                    if (
-                        time() < int(expire)
-                        and os.path.isfile(path)
-                        and path not in paths_for_delete
-                    ):
-                        newlines.append(line)
-                        continue
-                except ValueError:
-                    pass
-                found = True
-                if os.path.isfile(path):
-                    try:
-                        os.remove(path)
-                        if not os.listdir(os.path.dirname(path)):
-                            fs.rmtree(os.path.dirname(path))
-                    except OSError:
-                        pass
-
-        if found and self._lock_dbindex():
-            with open(self._db_path, mode="w", encoding="utf8") as fp:
-                fp.write("\n".join(newlines) + "\n")
-            self._unlock_dbindex()
-
+        for key in keys or []:
+            self._MEMORY_ITEMS.pop(self._memory_key(str(key)), None)
+        try:
+            conn = self._get_connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                total_size = self._get_total_size(conn)
+                if keys:
+                    total_size -= self._delete_items(conn, [str(k) for k in keys])
+                else:
+                    total_size -= self._delete_expired_items(conn, int(time()))
+                self._set_total_size(conn, total_size)
+        except sqlite3.Error:
+            return False
         return True
 
     def clean(self):
+        self.close()
+        for key in list(self._MEMORY_ITEMS):
+            if key[0] == self.cache_dir:
+                del self._MEMORY_ITEMS[key]
         if not os.path.isdir(self.cache_dir):
             return
         fs.rmtree(self.cache_dir)
 
-    def _lock_dbindex(self):
-        self._lockfile = LockFile(self.cache_dir)
-        try:
-            self._lockfile.acquire()
-        except:  # pylint: disable=bare-except
-            return False
-
-        return True
-
-    def _unlock_dbindex(self):
-        if self._lockfile:
-            self._lockfile.release()
-        return True
-
 
 #
 # Helpers
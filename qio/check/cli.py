@@ -63,6 +63,13 @@ from qio.project.helpers import find_project_dir_above, get_project_dir
     type=click.Choice(DefectItem.SEVERITY_LABELS.values()),
 )
 @click.option("--skip-packages", is_flag=True)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Check N source files at once (cppcheck, PVS-Studio)",
+)
 def cli(
     environment,
     project_dir,
@@ -75,6 +82,7 @@ def cli(
     json_output,
     fail_on_defect,
     skip_packages,
+    jobs,
 ):
     app.set_session_var("custom_project_conf", project_conf)
 
@@ -119,6 +127,7 @@ def cli(
                 else severity or config.get("env:" + envname, "check_severity"),
                 skip_packages=skip_packages or env_options.get("check_skip_packages"),
                 platform_packages=env_options.get("platform_packages"),
+                jobs=jobs,
             )
 
             for tool in config.get("env:" + envname, "check_tool"):
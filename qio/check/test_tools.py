@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from qio.check.tools.base import CheckResultsCache, CheckToolBase
+from qio.check.tools.clangtidy import ClangtidyCheckTool
+from qio.check.tools.cppcheck import CppcheckCheckTool
+
+
+class DummyCheckTool(CheckToolBase):  # pylint: disable=abstract-method
+    def __init__(self, cache_path, options):
+        self.cache_path = cache_path
+        self.checked = []
+        self.processed = []
+        self._lock = threading.Lock()
+        super().__init__(None, None, "native", options)
+
+    def _load_cpp_data(self, project_dir):
+        pass
+
+    def get_results_cache_path(self):
+        return self.cache_path
+
+    def get_file_cache_key(self, language, src_file):
+        return self.compute_file_cache_key(language, src_file)
+
+    def check_file(self, language, src_file):
+        # the first files are checked longer
+        time.sleep(0.05 / (1 + len(self.checked)))
+        with self._lock:
+            self.checked.append(src_file)
+        return dict(cmd=["dummy", src_file], returncode=0, out=src_file, err="")
+
+    def process_file_result(self, result):
+        self.processed.append(result["out"])
+
+
+@pytest.fixture
+def src_files(tmp_path):
+    result = []
+    for index in range(6):
+        path = tmp_path / ("file%d.c" % index)
+        path.write_text("int value%d;\n" % index)
+        result.append(str(path))
+    return result
+
+
+def test_results_cache(tmp_path):
+    cache_path = str(tmp_path / "check" / "dummy.json")
+    cache = CheckResultsCache(cache_path)
+    assert cache.get("main.c", "key") is None
+    cache.set("main.c", "key", dict(returncode=0))
+    cache.save()
+
+    cache = CheckResultsCache(cache_path)
+    assert cache.get("main.c", "key") == dict(returncode=0)
+    assert cache.get("main.c", "other-key") is None
+    assert cache.get("other.c", "key") is None
+
+    # an incompatible cache file is ignored
+    with open(cache_path, mode="w", encoding="utf8") as fp:
+        json.dump(dict(version=0, items={}), fp)
+    assert CheckResultsCache(cache_path).get("main.c", "key") is None
+
+
+def test_check_files_in_parallel(tmp_path, src_files):
+    # pylint: disable=redefined-outer-name
+    cache_path = str(tmp_path / "check" / "dummy.json")
+    tool = DummyCheckTool(cache_path, dict(jobs=4))
+    tool.check_files([("c", path) for path in src_files])
+    assert sorted(tool.checked) == src_files
+    # the results are processed in the original order of files
+    assert tool.processed == src_files
+
+    # the unchanged files are not checked again
+    with open(src_files[2], mode="a", encoding="utf8") as fp:
+        fp.write("int changed;\n")
+    tool = DummyCheckTool(cache_path, dict(jobs=4))
+    tool.check_files([("c", path) for path in src_files])
+    assert tool.checked == [src_files[2]]
+    assert tool.processed == src_files
+
+
+def test_cppcheck_headers_digest(tmp_path):
+    project_header = tmp_path / "include" / "config.h"
+    project_header.parent.mkdir()
+    project_header.write_text("#define A 1\n")
+    lib_header = tmp_path / "lib" / "foo" / "src" / "utils" / "foo.h"
+    lib_header.parent.mkdir(parents=True)
+    lib_header.write_text("#define FOO 1\n")
+    headers = [str(project_header)]
+    include_dirs = [str(tmp_path / "include"), str(tmp_path / "lib" / "foo" / "src")]
+
+    digest = CppcheckCheckTool.compute_headers_digest(headers, include_dirs)
+    assert digest == CppcheckCheckTool.compute_headers_digest(headers, include_dirs)
+    # a changed header of a library
+    lib_header.write_text("#define FOO 22\n")
+    new_digest = CppcheckCheckTool.compute_headers_digest(headers, include_dirs)
+    assert new_digest != digest
+    # a changed project header with the same size and modification time
+    st = os.stat(project_header)
+    project_header.write_text("#define A 2\n")
+    os.utime(project_header, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert CppcheckCheckTool.compute_headers_digest(headers, include_dirs) != new_digest
+
+
+@pytest.fixture
+def clangtidy(tmp_path, monkeypatch):
+    monkeypatch.setattr(CheckToolBase, "_load_cpp_data", lambda *_: None)
+    monkeypatch.setattr(CheckToolBase, "get_tool_dir", lambda *_: str(tmp_path))
+    tool = ClangtidyCheckTool(None, None, "native", dict(platform_packages=None))
+    tool.cpp_defines = ["PROJECT"]
+    tool.toolchain_defines = {"c": ["C_TOOLCHAIN"], "c++": ["CXX_TOOLCHAIN"]}
+    tool.cpp_includes = [str(tmp_path / "include")]
+    yield tool
+    tool.clean_up()
+
+
+def test_clangtidy_compilation_db(clangtidy):
+    # pylint: disable=redefined-outer-name
+    db_dir = clangtidy.generate_compilation_db(
+        {"c": ["main.c"], "c++": ["app.cpp"], "headers": ["app.h"]}
+    )
+    with open(os.path.join(db_dir, "compile_commands.json"), encoding="utf8") as fp:
+        items = {item["file"]: item["arguments"] for item in json.load(fp)}
+    include_flag = "-I%s" % clangtidy.cpp_includes[0]
+    assert items["main.c"][:5] == ["cc", "-x", "c", "-DPROJECT", "-DC_TOOLCHAIN"]
+    assert items["main.c"][-3:] == [include_flag, "-c", "main.c"]
+    assert items["app.cpp"][:5] == ["c++", "-x", "c++", "-DPROJECT", "-DCXX_TOOLCHAIN"]
+    # headers are checked as C++ headers
+    assert items["app.h"][:3] == ["c++", "-x", "c++-header"]
+    assert items["app.h"][-2:] == ["-c", "app.h"]
+    assert clangtidy.configure_command(db_dir, ["main.c"])[-4:] == [
+        "-p",
+        db_dir,
+        "--checks=*",
+        "main.c",
+    ]
+
+
+def test_clangtidy_shards():
+    files = ["file%d.c" % i for i in range(10)]
+    assert ClangtidyCheckTool.split_into_shards(files, 1) == [files]
+    shards = ClangtidyCheckTool.split_into_shards(files, 2)
+    assert len(shards) == 8
+    assert sorted(f for shard in shards for f in shard) == sorted(files)
+    assert ClangtidyCheckTool.split_into_shards(files[:3], 4) == [
+        [files[0]],
+        [files[1]],
+        [files[2]],
+    ]
+
+
+def test_clangtidy_reported_defects(clangtidy):
+    # pylint: disable=redefined-outer-name
+    defects = []
+    clangtidy._on_defect_callback = defects.append  # pylint: disable=protected-access
+    line = "%s:%d:5: warning: unused variable 'x' [clang-diagnostic-unused-variable]"
+    for _ in range(2):
+        clangtidy.on_tool_output(line % ("include/app.h", 10))
+        clangtidy.on_tool_output(line % ("include/app.h", 11))
+    assert [d.line for d in defects] == [10, 11]
@@ -13,19 +13,64 @@
 # limitations under the License.
 
 import glob
+import hashlib
+import json
 import os
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 
-from qio import fs, proc
+from qio import exception, fs, proc
 from qio.check.defect import DefectItem
 from qio.package.manager.core import get_core_package_dir
 from qio.package.meta import PackageSpec
 from qio.project.helpers import load_build_metadata
+from qio.toolchain import get_compiler_defines
 
 
-class CheckToolBase:  # pylint: disable=too-many-instance-attributes
+class CheckResultsCache:
+    """Results of the checked files keyed by a state of a file and its options"""
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self._items = {}
+        self._lock = threading.Lock()
+        self._modified = False
+        if not os.path.isfile(path):
+            return
+        try:
+            data = fs.load_json(path)
+        except exception.InvalidJSONFile:
+            return
+        if isinstance(data, dict) and data.get("version") == self.VERSION:
+            self._items = data.get("items") or {}
+
+    def get(self, src_file, key):
+        item = self._items.get(src_file)
+        if item and item.get("key") == key:
+            return item["result"]
+        return None
+
+    def set(self, src_file, key, result):
+        with self._lock:
+            self._items[src_file] = dict(key=key, result=result)
+            self._modified = True
+
+    def save(self):
+        if not self._modified:
+            return
+        if not os.path.isdir(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path))
+        with open(self.path, mode="w", encoding="utf8") as fp:
+            json.dump(dict(version=self.VERSION, items=self._items), fp)
+        self._modified = False
+
+
+class CheckToolBase:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     def __init__(self, project_dir, config, envname, options):
         self.config = config
         self.envname = envname
@@ -34,7 +79,7 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
         self.cxx_flags = []
         self.cpp_includes = []
         self.cpp_defines = []
-        self.toolchain_defines = []
+        self.toolchain_defines = {}
         self._tmp_files = []
         self.cc_path = None
         self.cxx_path = None
@@ -87,31 +132,14 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
         return result
 
     def _get_toolchain_defines(self):
-        def _extract_defines(language, includes_file):
-            build_flags = self.cxx_flags if language == "c++" else self.cc_flags
-            defines = []
-            cmd = "echo | %s -x %s %s %s -dM -E -" % (
+        return {
+            lang: get_compiler_defines(
                 self.cc_path,
-                language,
-                " ".join(
-                    [f for f in build_flags if f.startswith(("-m", "-f", "-std"))]
-                ),
-                includes_file,
+                lang,
+                self.cxx_flags if lang == "c++" else self.cc_flags,
             )
-            result = proc.exec_command(cmd, shell=True)
-            for line in result["out"].split("\n"):
-                tokens = line.strip().split(" ", 2)
-                if not tokens or tokens[0] != "#define":
-                    continue
-                if len(tokens) > 2:
-                    defines.append("%s=%s" % (tokens[1], tokens[2]))
-                else:
-                    defines.append(tokens[1])
-
-            return defines
-
-        incflags_file = self._long_includes_hook(self.cpp_includes)
-        return {lang: _extract_defines(lang, incflags_file) for lang in ("c", "c++")}
+            for lang in ("c", "c++")
+        }
 
     def _create_tmp_file(self, data):
         with tempfile.NamedTemporaryFile("w", delete=False) as fp:
@@ -142,7 +170,7 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
     def get_defects(self):
         return self._defects
 
-    def configure_command(self):
+    def configure_command(self, *args):
         raise NotImplementedError
 
     def on_tool_output(self, line):
@@ -226,6 +254,114 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
 
         return result
 
+    def get_results_cache_path(self):
+        return os.path.join(
+            self.config.get("platformio", "workspace_dir"),
+            "check",
+            self.envname,
+            "%s.json" % self.__class__.__name__.replace("CheckTool", "").lower(),
+        )
+
+    def compute_file_cache_key(self, language, src_file, *extra):
+        data = [
+            self.__class__.__name__,
+            language,
+            fs.calculate_file_hashsum("sha1", src_file),
+            self.cxx_flags if language == "c++" else self.cc_flags,
+            self.cpp_defines,
+            self.toolchain_defines.get(language),
+            self.cpp_includes,
+            self.options.get("flags"),
+            self.options.get("skip_packages"),
+        ]
+        data.extend(extra)
+        return hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf8")).hexdigest()
+
+    @staticmethod
+    def get_file_stamp(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [path, st.st_mtime, st.st_size]
+
+    def get_file_cache_key(self, language, src_file):  # pylint: disable=unused-argument
+        """A key of the cached file results, ``None`` disables caching"""
+        return None
+
+    def run_check_cmd(self, cmd):
+        """Run a check command in a worker, the output is processed later"""
+        result = proc.exec_command(cmd)
+        return dict(
+            cmd=cmd,
+            returncode=result["returncode"],
+            out=result["out"] or "",
+            err=result["err"] or "",
+        )
+
+    def process_check_cmd_result(self, result):
+        if self.options.get("verbose"):
+            click.echo(" ".join(result["cmd"]))
+        for output in (result["out"], result["err"]):
+            for line in output.splitlines():
+                self.on_tool_output(line)
+
+        if not self.is_check_successful(result):
+            click.echo(
+                "\nError: Failed to execute check command! Exited with code %d."
+                % result["returncode"]
+            )
+            if self.options.get("verbose"):
+                click.echo(result["out"])
+                click.echo(result["err"])
+            self._bad_input = True
+
+    def check_file(self, language, src_file):
+        """Check a single file in a worker thread.
+
+        It must not change the state of the tool, the returned result is
+        passed to the ``process_file_result`` in the original order of files.
+        """
+        cmd = self.configure_command(language, src_file)
+        if not cmd:
+            return dict(cmd=None, returncode=None, out="", err="")
+        return self.run_check_cmd(cmd)
+
+    def process_file_result(self, result):
+        if not result["cmd"]:
+            self._bad_input = True
+            return
+        self.process_check_cmd_result(result)
+
+    def is_file_result_cacheable(self, result):
+        return self.is_check_successful(result)
+
+    def check_files(self, files):
+        """Check the ``(language, src_file)`` items using a pool of workers"""
+        cache = CheckResultsCache(self.get_results_cache_path())
+
+        def _check_file(item):
+            language, src_file = item
+            # the results are cached only by the tools that override the key
+            key = self.get_file_cache_key(  # pylint: disable=assignment-from-none
+                language, src_file
+            )
+            result = cache.get(src_file, key) if key else None
+            if result is None:
+                result = self.check_file(language, src_file)
+                if key and self.is_file_result_cacheable(result):
+                    cache.set(src_file, key, result)
+            return result
+
+        jobs = max(1, self.options.get("jobs") or 1)
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                # results are streamed in order while the next files are checked
+                for result in executor.map(_check_file, files):
+                    self.process_file_result(result)
+        finally:
+            cache.save()
+
     def check(self, on_defect_callback=None):
         self._on_defect_callback = on_defect_callback
         cmd = self.configure_command()
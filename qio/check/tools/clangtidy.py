@@ -12,14 +12,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+import os
 import re
-from os.path import join
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
+import click
+
+from qio import fs
 from qio.check.defect import DefectItem
 from qio.check.tools.base import CheckToolBase
 
 
 class ClangtidyCheckTool(CheckToolBase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tool_path = os.path.join(self.get_tool_dir("tool-clangtidy"), "clang-tidy")
+        self._tmp_dirs = []
+        self._reported_defects = set()
+
     def tool_output_filter(self, line):  # pylint: disable=arguments-differ
         if not self.options.get("verbose") and "[clang-diagnostic-error]" in line:
             return ""
@@ -33,7 +45,8 @@ class ClangtidyCheckTool(CheckToolBase):
 
         return ""
 
-    def parse_defect(self, raw_line):  # pylint: disable=arguments-differ
+    @staticmethod
+    def _parse_defect(raw_line):
         match = re.match(r"^(.*):(\d+):(\d+):\s+([^:]+):\s(.+)\[([^]]+)\]$", raw_line)
         if not match:
             return raw_line
@@ -54,35 +67,107 @@ class ClangtidyCheckTool(CheckToolBase):
         # so 0 and 1 are only acceptable values
         return cmd_result["returncode"] < 2
 
-    def configure_command(self):
-        tool_path = join(self.get_tool_dir("tool-clangtidy"), "clang-tidy")
+    def parse_defect(self, raw_line):  # pylint: disable=arguments-differ
+        defect = self._parse_defect(raw_line)
+        if not isinstance(defect, DefectItem):
+            return defect
+        # a header included by many translation units reports the same defect
+        key = (
+            os.path.normcase(os.path.abspath(defect.file)),
+            defect.line,
+            defect.column,
+            defect.id,
+            defect.message,
+        )
+        if key in self._reported_defects:
+            return None
+        self._reported_defects.add(key)
+        return defect
+
+    def _get_includes(self):
+        includes = []
+        for inc in self.cpp_includes:
+            if self.options.get("skip_packages") and inc.lower().startswith(
+                self.config.get("platformio", "packages_dir").lower()
+            ):
+                continue
+            includes.append(inc)
+        return includes
+
+    def generate_compilation_db(self, project_files):
+        includes = self._get_includes()
+        items = []
+        for scope, files in project_files.items():
+            language = "c" if scope == "c" else "c++"
+            args = ["cc" if language == "c" else "c++", "-x", language]
+            if scope == "headers":
+                args = ["c++", "-x", "c++-header"]
+            args.extend(
+                "-D%s" % d for d in self.cpp_defines + self.toolchain_defines[language]
+            )
+            args.extend("-I%s" % inc for inc in includes)
+            for src_file in files:
+                items.append(
+                    dict(
+                        directory=os.getcwd(),
+                        file=src_file,
+                        arguments=args + ["-c", src_file],
+                    )
+                )
+
+        db_dir = tempfile.mkdtemp(prefix="piocheck")
+        self._tmp_dirs.append(db_dir)
+        with open(
+            os.path.join(db_dir, "compile_commands.json"), mode="w", encoding="utf8"
+        ) as fp:
+            json.dump(items, fp, indent=2)
+        return db_dir
+
+    @staticmethod
+    def split_into_shards(files, jobs):
+        # more shards than workers balance translation units of different cost
+        shards_nums = min(len(files), jobs * 4 if jobs > 1 else 1)
+        return [files[i::shards_nums] for i in range(shards_nums)]
 
-        cmd = [tool_path, "--quiet"]
+    def configure_command(self, db_dir, src_files):  # pylint: disable=arguments-differ
+        cmd = [self.tool_path, "--quiet", "-p", db_dir]
         flags = self.get_flags("clangtidy")
         if not (
             self.is_flag_set("--checks", flags) or self.is_flag_set("--config", flags)
         ):
             cmd.append("--checks=*")
 
-        project_files = self.get_project_target_files(self.options["patterns"])
+        cmd.extend(flags + src_files)
+
+        return cmd
+
+    def clean_up(self):
+        super().clean_up()
+        for path in self._tmp_dirs:
+            if os.path.isdir(path):
+                fs.rmtree(path)
 
+    def check(self, on_defect_callback=None):
+        self._on_defect_callback = on_defect_callback
+        self._reported_defects = set()
+
+        project_files = self.get_project_target_files(self.options["patterns"])
         src_files = []
         for items in project_files.values():
             src_files.extend(items)
-
-        cmd.extend(flags + src_files + ["--"])
-        cmd.extend(
-            ["-D%s" % d for d in self.cpp_defines + self.toolchain_defines["c++"]]
-        )
-
-        includes = []
-        for inc in self.cpp_includes:
-            if self.options.get("skip_packages") and inc.lower().startswith(
-                self.config.get("platformio", "packages_dir").lower()
+        if not src_files:
+            click.echo("Error: Nothing to check.")
+            return True
+
+        db_dir = self.generate_compilation_db(project_files)
+        jobs = max(1, self.options.get("jobs") or 1)
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for result in executor.map(
+                lambda shard: self.run_check_cmd(self.configure_command(db_dir, shard)),
+                self.split_into_shards(src_files, jobs),
             ):
-                continue
-            includes.append(inc)
+                self.process_check_cmd_result(result)
 
-        cmd.extend(["-I%s" % inc for inc in includes])
+        self.clean_up()
 
-        return cmd
+        return self._bad_input
@@ -12,16 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import os
 
 import click
 
-from qio import proc
+from qio import fs, proc
 from qio.check.defect import DefectItem
 from qio.check.tools.base import CheckToolBase
 
 
-class CppcheckCheckTool(CheckToolBase):
+class CppcheckCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-attributes
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._field_delimiter = "<&PIO&>"
@@ -36,6 +37,9 @@ class CppcheckCheckTool(CheckToolBase):
             "cwe",
             "id",
         ]
+        self.tool_path = os.path.join(self.get_tool_dir("tool-cppcheck"), "cppcheck")
+        self._includes_file = None
+        self._headers_digest = None
 
     def tool_output_filter(self, line):  # pylint: disable=arguments-differ
         if (
@@ -103,10 +107,8 @@ class CppcheckCheckTool(CheckToolBase):
         return DefectItem(**args)
 
     def configure_command(self, language, src_file):  # pylint: disable=arguments-differ
-        tool_path = os.path.join(self.get_tool_dir("tool-cppcheck"), "cppcheck")
-
         cmd = [
-            tool_path,
+            self.tool_path,
             "--addon-python=%s" % proc.get_pythonexe_path(),
             "--error-exitcode=3",
             "--verbose" if self.options.get("verbose") else "--quiet",
@@ -157,7 +159,9 @@ class CppcheckCheckTool(CheckToolBase):
             "--include=" + inc
             for inc in self.get_forced_includes(build_flags, self.cpp_includes)
         )
-        cmd.append("--includes-file=%s" % self._generate_inc_file())
+        cmd.append(
+            "--includes-file=%s" % (self._includes_file or self._generate_inc_file())
+        )
         cmd.append('"%s"' % src_file)
 
         return cmd
@@ -240,6 +244,40 @@ class CppcheckCheckTool(CheckToolBase):
             standard, cpp_standards_map.get(standard, standard)
         )
 
+    def get_file_cache_key(self, language, src_file):
+        build_flags = self.cxx_flags if language == "c++" else self.cc_flags
+        return self.compute_file_cache_key(
+            language,
+            src_file,
+            self.get_file_stamp(self.tool_path),
+            # included headers affect the results of a source file
+            self._headers_digest,
+            [
+                self.get_file_stamp(path)
+                for path in self.get_forced_includes(build_flags, self.cpp_includes)
+            ],
+        )
+
+    @staticmethod
+    def compute_headers_digest(headers, include_dirs):
+        """A digest of the checked headers and of the files in include dirs.
+
+        The content of the checked project headers is hashed, the files of
+        the include dirs (libraries, frameworks, toolchain) are tracked by
+        their stamps only.
+        """
+        digest = hashlib.sha1()
+        for path in sorted(headers):
+            digest.update(path.encode("utf8"))
+            digest.update(fs.calculate_file_hashsum("sha1", path).encode("utf8"))
+        for include_dir in include_dirs:
+            for root, dirnames, filenames in os.walk(include_dir):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    stamp = CheckToolBase.get_file_stamp(os.path.join(root, name))
+                    digest.update(repr(stamp).encode("utf8"))
+        return digest.hexdigest()
+
     def check(self, on_defect_callback=None):
         self._on_defect_callback = on_defect_callback
 
@@ -249,18 +287,18 @@ class CppcheckCheckTool(CheckToolBase):
             click.echo("Error: Nothing to check.")
             return True
 
-        for scope, files in project_files.items():
-            if scope not in src_files_scope:
-                continue
-            for src_file in files:
-                cmd = self.configure_command(scope, src_file)
-                if not cmd:
-                    self._bad_input = True
-                    continue
-                if self.options.get("verbose"):
-                    click.echo(" ".join(cmd))
-
-                self.execute_check_cmd(cmd)
+        self._includes_file = self._generate_inc_file()
+        self._headers_digest = self.compute_headers_digest(
+            project_files["headers"], self.cpp_includes
+        )
+        self.check_files(
+            [
+                (scope, src_file)
+                for scope, files in project_files.items()
+                if scope in src_files_scope
+                for src_file in files
+            ]
+        )
 
         self.clean_up()
 
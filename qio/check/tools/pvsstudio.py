@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import os
 import shutil
 import tempfile
@@ -19,7 +20,7 @@ from xml.etree.ElementTree import fromstring
 
 import click
 
-from qio import proc
+from qio import fs, proc
 from qio.check.defect import DefectItem
 from qio.check.tools.base import CheckToolBase
 from qio.compat import IS_WINDOWS
@@ -29,8 +30,6 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._tmp_dir = tempfile.mkdtemp(prefix="piocheck")
-        self._tmp_preprocessed_file = self._generate_tmp_file_path() + ".i"
-        self._tmp_output_file = self._generate_tmp_file_path() + ".pvs"
         self._tmp_cfg_file = self._generate_tmp_file_path() + ".cfg"
         self._tmp_cmd_file = self._generate_tmp_file_path() + ".cmd"
         self.tool_path = os.path.join(
@@ -95,16 +94,11 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
         )
 
         result = proc.exec_command(cmd)
-        if result["returncode"] != 0:
-            click.echo(result["err"])
-            self._bad_input = True
-
-        return result["err"]
+        return dict(returncode=result["returncode"], err=result["err"] or "")
 
-    def parse_defects(self, output_file):
+    def parse_defects(self, report):
         defects = []
 
-        report = self._demangle_report(output_file)
         if not report:
             self._bad_input = True
             return []
@@ -144,12 +138,13 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
 
         return defects
 
-    def configure_command(self, src_file):  # pylint: disable=arguments-differ
-        if os.path.isfile(self._tmp_output_file):
-            os.remove(self._tmp_output_file)
+    def configure_command(  # pylint: disable=arguments-differ
+        self, src_file, preprocessed_file, output_file
+    ):
+        if os.path.isfile(output_file):
+            os.remove(output_file)
 
-        if not os.path.isfile(self._tmp_preprocessed_file):
-            click.echo("Error: Missing preprocessed file for '%s'" % src_file)
+        if not os.path.isfile(preprocessed_file):
             return ""
 
         cmd = [
@@ -165,9 +160,9 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
             "--source-file",
             src_file,
             "--i-file",
-            self._tmp_preprocessed_file,
+            preprocessed_file,
             "--output-file",
-            self._tmp_output_file,
+            output_file,
         ]
 
         flags = self.get_flags("pvs-studio")
@@ -181,9 +176,15 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
         # pylint: disable=protected-access
         return os.path.join(self._tmp_dir, next(tempfile._get_candidate_names()))
 
-    def _prepare_preprocessed_file(self, src_file):
-        if os.path.isfile(self._tmp_preprocessed_file):
-            os.remove(self._tmp_preprocessed_file)
+    def _get_tmp_file_path(self, src_file, suffix):
+        return os.path.join(
+            self._tmp_dir,
+            hashlib.sha1(src_file.encode("utf8")).hexdigest()[:16] + suffix,
+        )
+
+    def _prepare_preprocessed_file(self, src_file, preprocessed_file):
+        if os.path.isfile(preprocessed_file):
+            os.remove(preprocessed_file)
 
         flags = self.cxx_flags
         compiler = self.cxx_path
@@ -196,7 +197,7 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
             '"%s"' % src_file,
             "-E",
             "-o",
-            '"%s"' % self._tmp_preprocessed_file,
+            '"%s"' % preprocessed_file,
         ]
         cmd.extend([f for f in flags if f])
         cmd.extend(['"-D%s"' % d.replace('"', '\\"') for d in self.cpp_defines])
@@ -207,11 +208,76 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
             cmd.insert(1, "-xc++")
 
         result = proc.exec_command(" ".join(cmd), shell=True)
-        if result["returncode"] != 0 or result["err"]:
+        return dict(
+            cmd=" ".join(cmd), returncode=result["returncode"], err=result["err"] or ""
+        )
+
+    @staticmethod
+    def _is_preprocessing_successful(result):
+        return result["returncode"] == 0 and not result["err"]
+
+    def get_file_cache_key(self, language, src_file):
+        # the preprocessed file already contains all included headers
+        preprocessed_file = self._get_tmp_file_path(src_file, ".i")
+        result = self._prepare_preprocessed_file(src_file, preprocessed_file)
+        if not self._is_preprocessing_successful(result):
+            if os.path.isfile(preprocessed_file):
+                os.remove(preprocessed_file)
+            return None
+        return self.compute_file_cache_key(
+            language,
+            src_file,
+            self.get_file_stamp(self.tool_path),
+            fs.calculate_file_hashsum("sha1", preprocessed_file),
+        )
+
+    def check_file(self, language, src_file):
+        preprocessed_file = self._get_tmp_file_path(src_file, ".i")
+        output_file = self._get_tmp_file_path(src_file, ".pvs")
+        preprocessing = None
+        if not os.path.isfile(preprocessed_file):
+            preprocessing = self._prepare_preprocessed_file(src_file, preprocessed_file)
+        cmd = self.configure_command(src_file, preprocessed_file, output_file)
+        if not cmd:
+            result = dict(cmd=None, returncode=None, out="", err="")
+        else:
+            result = self.run_check_cmd(cmd)
+        result.update(file=src_file, preprocessing=preprocessing, report=None)
+        if result["returncode"] == 0:
+            result["report"] = self._demangle_report(output_file)
+        for path in (preprocessed_file, output_file):
+            if os.path.isfile(path):
+                os.remove(path)
+        return result
+
+    def is_file_result_cacheable(self, result):
+        return (
+            self.is_check_successful(result)
+            and not result["preprocessing"]
+            and result["report"]["returncode"] == 0
+        )
+
+    def process_file_result(self, result):
+        preprocessing = result["preprocessing"]
+        if preprocessing and not self._is_preprocessing_successful(preprocessing):
             if self.options.get("verbose"):
-                click.echo(" ".join(cmd))
-            click.echo(result["err"])
+                click.echo(preprocessing["cmd"])
+            click.echo(preprocessing["err"])
+            self._bad_input = True
+
+        if not result["cmd"]:
+            click.echo("Error: Missing preprocessed file for '%s'" % result["file"])
             self._bad_input = True
+            return
+
+        self.process_check_cmd_result(result)
+        if result["returncode"] != 0:
+            return
+
+        if result["report"]["returncode"] != 0:
+            click.echo(result["report"]["err"])
+            self._bad_input = True
+        self._process_defects(self.parse_defects(result["report"]["err"]))
 
     def clean_up(self):
         super().clean_up()
@@ -226,25 +292,16 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
 
     def check(self, on_defect_callback=None):
         self._on_defect_callback = on_defect_callback
-        for scope, files in self.get_project_target_files(
-            self.options["patterns"]
-        ).items():
-            if scope not in ("c", "c++"):
-                continue
-            for src_file in files:
-                self._prepare_preprocessed_file(src_file)
-                cmd = self.configure_command(src_file)
-                if self.options.get("verbose"):
-                    click.echo(" ".join(cmd))
-                if not cmd:
-                    self._bad_input = True
-                    continue
-
-                result = self.execute_check_cmd(cmd)
-                if result["returncode"] != 0:
-                    continue
-
-                self._process_defects(self.parse_defects(self._tmp_output_file))
+        self.check_files(
+            [
+                (scope, src_file)
+                for scope, files in self.get_project_target_files(
+                    self.options["patterns"]
+                ).items()
+                if scope in ("c", "c++")
+                for src_file in files
+            ]
+        )
 
         self.clean_up()
 
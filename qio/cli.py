@@ -13,10 +13,16 @@
 # limitations under the License.
 
 import importlib
+import itertools
+import json
 from pathlib import Path
 
 import click
 
+from qio.clicommands import COMMANDS
+
+COMMANDS_REGISTRY_PATH = Path(__file__).parent / "clicommands.py"
+
 
 class PlatformioCLI(click.MultiCommand):
 
@@ -28,9 +34,15 @@ class PlatformioCLI(click.MultiCommand):
         self._pio_cmd_aliases = dict(package="pkg")
 
     def _find_pio_commands(self):
+        # a static registry, see `generate_commands_registry()`
+        return COMMANDS
+
+    def discover_commands(self):
         def _to_module_path(p):
             return (
-                "platformio." + ".".join(p.relative_to(self._pio_root_path).parts)[:-3]
+                __package__
+                + "."
+                + ".".join(p.relative_to(self._pio_root_path).parts)[:-3]
             )
 
         result = {}
@@ -43,7 +55,7 @@ class PlatformioCLI(click.MultiCommand):
 
         # find legacy commands
         for p in (self._pio_root_path / "commands").iterdir():
-            if p.name.startswith("_"):
+            if p.name.startswith(("_", "test_")):
                 continue
             if (p / "command.py").is_file():
                 result[p.name] = _to_module_path(p / "command.py")
@@ -64,6 +76,13 @@ class PlatformioCLI(click.MultiCommand):
             ]
         )
 
+    @staticmethod
+    def in_worker():
+        # a worker process of `pio run --parallel-envs`, the parent process
+        # runs maintenance and telemetry hooks and prints a summary
+        args = PlatformioCLI.leftover_args
+        return bool(args) and "--worker" in args
+
     def invoke(self, ctx):
         PlatformioCLI.leftover_args = ctx.args
         if hasattr(ctx, "protected_args"):
@@ -75,6 +94,9 @@ class PlatformioCLI(click.MultiCommand):
 
     def get_command(self, ctx, cmd_name):
         commands = self._find_pio_commands()
+        if cmd_name not in commands:
+            # a command was added after the registry has been generated
+            commands = self.discover_commands()
         if cmd_name not in commands:
             return self._handle_obsolate_command(ctx, cmd_name)
         module = importlib.import_module(commands[cmd_name])
@@ -94,3 +116,23 @@ class PlatformioCLI(click.MultiCommand):
             return cli
 
         raise click.UsageError('No such command "%s"' % cmd_name, ctx)
+
+
+def generate_commands_registry(path=COMMANDS_REGISTRY_PATH):
+    commands = PlatformioCLI(name="pio").discover_commands()
+    with open(__file__, encoding="utf8") as fp:
+        license_header = list(
+            itertools.takewhile(lambda line: line.startswith("#"), fp)
+        )
+    with open(path, mode="w", encoding="utf8") as fp:
+        fp.writelines(license_header)
+        fp.write("\n# Generated by `python -m qio.cli`, do not edit manually\n\n")
+        fp.write("COMMANDS = {\n")
+        for name, module in sorted(commands.items()):
+            fp.write("    %s: %s,\n" % (json.dumps(name), json.dumps(module)))
+        fp.write("}\n")
+    return commands
+
+
+if __name__ == "__main__":
+    generate_commands_registry()
@@ -0,0 +1,39 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Generated by `python -m qio.cli`, do not edit manually
+
+COMMANDS = {
+    "access": "qio.registry.access.cli",
+    "account": "qio.account.cli",
+    "boards": "qio.commands.boards",
+    "check": "qio.check.cli",
+    "ci": "qio.commands.ci",
+    "debug": "qio.debug.cli",
+    "device": "qio.device.cli",
+    "home": "qio.home.cli",
+    "lib": "qio.commands.lib",
+    "org": "qio.account.org.cli",
+    "pkg": "qio.package.cli",
+    "platform": "qio.commands.platform",
+    "project": "qio.project.cli",
+    "remote": "qio.remote.cli",
+    "run": "qio.run.cli",
+    "settings": "qio.commands.settings",
+    "system": "qio.system.cli",
+    "team": "qio.account.team.cli",
+    "test": "qio.test.cli",
+    "update": "qio.commands.update",
+    "upgrade": "qio.commands.upgrade",
+}
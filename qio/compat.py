@@ -21,14 +21,6 @@ import sys
 
 from qio.exception import UserSideException
 
-if sys.version_info >= (3, 7):
-    from asyncio import create_task as aio_create_task
-    from asyncio import get_running_loop as aio_get_running_loop
-else:
-    from asyncio import ensure_future as aio_create_task
-    from asyncio import get_event_loop as aio_get_running_loop
-
-
 PY2 = sys.version_info[0] == 2  # DO NOT REMOVE IT. ESP8266/ESP32 depend on it
 IS_CYGWIN = sys.platform.startswith("cygwin")
 IS_WINDOWS = WINDOWS = sys.platform.startswith("win")
@@ -37,6 +29,23 @@ MISSING = object()
 string_types = (str,)
 
 
+def aio_create_task(coro):
+    # asyncio is imported on demand, most of the commands do not need it
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    if sys.version_info >= (3, 7):
+        return asyncio.create_task(coro)
+    return asyncio.ensure_future(coro)
+
+
+def aio_get_running_loop():
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    if sys.version_info >= (3, 7):
+        return asyncio.get_running_loop()
+    return asyncio.get_event_loop()
+
+
 def is_bytes(x):
     return isinstance(x, (bytes, memoryview, bytearray))
 
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import fnmatch
 import glob
 import hashlib
 import io
@@ -153,7 +154,147 @@ def path_endswith_ext(path, extensions):
     return False
 
 
-def match_src_files(src_dir, src_filter=None, src_exts=None, followlinks=True):
+class SourceTreeIndex:
+    """In-memory index of a source tree built with a single directory walk
+
+    Glob patterns of a source filter are evaluated against the index
+    following `glob.glob(recursive=True)` rules. The index remembers mtime
+    of each directory and is rebuilt when any of them was changed.
+    """
+
+    MAGIC_RE = re.compile(r"[*?[]")
+
+    def __init__(self, root, followlinks=True):
+        self.root = root
+        self.followlinks = followlinks
+        self._tree = None
+        self._dir_mtimes = {}
+
+    def _scan_dir(self, path, parents):
+        node = dict(dirs={}, files=[], islink=os.path.islink(path))
+        try:
+            self._dir_mtimes[path] = os.stat(path).st_mtime
+            entries = list(os.scandir(path))
+        except OSError:
+            return node
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                node["files"].append(entry.name)
+                continue
+            realpath = os.path.realpath(entry.path)
+            if realpath in parents:  # recursive symlink
+                node["files"].append(entry.name)
+                continue
+            node["dirs"][entry.name] = self._scan_dir(
+                entry.path, parents | set([realpath])
+            )
+        return node
+
+    def is_actual(self):
+        if self._tree is None:
+            return False
+        for path, mtime in self._dir_mtimes.items():
+            try:
+                if os.stat(path).st_mtime != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def refresh(self):
+        if self.is_actual():
+            return self
+        self._dir_mtimes = {}
+        self._tree = self._scan_dir(self.root, set([os.path.realpath(self.root)]))
+        return self
+
+    def find_node(self, relpath):
+        node = self._tree
+        for name in relpath.split(os.sep) if relpath else []:
+            if name not in node["dirs"]:
+                return None
+            node = node["dirs"][name]
+        return node
+
+    def glob(self, pattern):
+        """Returns a list of (relpath, node) items, node is None for a file"""
+        return list(self._glob(self._tree, "", pattern.split(os.sep)))
+
+    def _glob(self, node, relpath, parts):
+        part, rest = parts[0], parts[1:]
+        if part == "**":
+            for subpath, subnode in self._iter_visible_dirs(node, relpath):
+                if rest:
+                    yield from self._glob(subnode, subpath, rest)
+                else:
+                    yield (subpath, subnode)
+            return
+        if not part:  # trailing separator, matches a directory only
+            if not rest:
+                yield (relpath, node)
+            return
+        if self.MAGIC_RE.search(part):
+            names = list(node["dirs"]) + ([] if rest else node["files"])
+            if not part.startswith("."):
+                names = [name for name in names if not name.startswith(".")]
+            for name in fnmatch.filter(names, part):
+                yield from self._glob_child(node, relpath, name, name, rest)
+            return
+        name = part
+        if name not in node["dirs"] and name not in node["files"]:
+            # a case-insensitive file system
+            if not os.path.lexists(os.path.join(self.root, relpath, part)):
+                return
+            name = next(
+                (
+                    n
+                    for n in list(node["dirs"]) + node["files"]
+                    if os.path.normcase(n) == os.path.normcase(part)
+                    or n.lower() == part.lower()
+                ),
+                None,
+            )
+            if not name:
+                return
+        yield from self._glob_child(node, relpath, name, part, rest)
+
+    def _glob_child(self, node, relpath, name, title, rest):
+        subpath = os.path.join(relpath, title) if relpath else title
+        if name in node["dirs"]:
+            if rest:
+                yield from self._glob(node["dirs"][name], subpath, rest)
+            else:
+                yield (subpath, node["dirs"][name])
+        elif not rest:
+            yield (subpath, None)
+
+    def _iter_visible_dirs(self, node, relpath):
+        yield (relpath, node)
+        for name, subnode in node["dirs"].items():
+            if name.startswith("."):
+                continue
+            yield from self._iter_visible_dirs(
+                subnode, os.path.join(relpath, name) if relpath else name
+            )
+
+    def iter_files(self, node, relpath):
+        for name in node["files"]:
+            yield os.path.join(relpath, name) if relpath else name
+        for name, subnode in node["dirs"].items():
+            subpath = os.path.join(relpath, name) if relpath else name
+            if not self.followlinks and subnode["islink"]:
+                yield subpath
+                continue
+            yield from self.iter_files(subnode, subpath)
+
+
+def match_src_files(
+    src_dir, src_filter=None, src_exts=None, followlinks=True, src_index=None
+):
     def _add_candidate(items, item, src_dir):
         if not src_exts or path_endswith_ext(item, src_exts):
             items.add(os.path.relpath(item, src_dir))
@@ -174,15 +315,37 @@ def match_src_files(src_dir, src_filter=None, src_exts=None, followlinks=True):
                     _add_candidate(candidates, os.path.join(root, f), src_dir)
         return candidates
 
+    def _find_indexed_candidates(pattern):
+        candidates = set()
+        for relpath, node in src_index.glob(pattern):
+            items = [relpath] if node is None else src_index.iter_files(node, relpath)
+            for item in items:
+                if not src_exts or path_endswith_ext(item, src_exts):
+                    candidates.add(item)
+        return candidates
+
+    def _is_indexable(pattern):
+        return not os.path.isabs(pattern) and not any(
+            p in (".", "..") for p in pattern.split(os.sep)
+        )
+
     src_filter = src_filter or ""
     if isinstance(src_filter, (list, tuple)):
         src_filter = " ".join(src_filter)
 
+    if os.path.isdir(src_dir):
+        src_index = (src_index or SourceTreeIndex(src_dir, followlinks)).refresh()
+    else:
+        src_index = None
+
     result = set()
     # correct fs directory separator
     src_filter = src_filter.replace("/", os.sep).replace("\\", os.sep)
     for (action, pattern) in re.findall(r"(\+|\-)<([^>]+)>", src_filter):
-        candidates = _find_candidates(pattern)
+        if src_index and _is_indexable(pattern):
+            candidates = _find_indexed_candidates(pattern)
+        else:
+            candidates = _find_candidates(pattern)
         if action == "+":
             result |= candidates
         else:
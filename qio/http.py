@@ -152,7 +152,7 @@ class HTTPClient:
         cache_key = ContentCache.key_from_args(
             method, path, kwargs.get("params"), kwargs.get("data")
         )
-        with ContentCache("http") as cc:
+        with ContentCache("http", memory_layer=True) as cc:
             result = cc.get(cache_key)
             if result is not None:
                 return json.loads(result)
@@ -14,27 +14,24 @@
 
 import os
 import shutil
+import sys
 from time import time
 
 import click
-import semantic_version
 
-from qio import __version__, app, exception, fs, telemetry
-from qio.cache import cleanup_content_cache
+from qio import __version__, app, exception, fs, proc, telemetry
 from qio.cli import PlatformioCLI
-from qio.commands.platform import platform_update as cmd_platform_update
-from qio.commands.upgrade import get_latest_version
-from qio.http import HTTPClientError, InternetIsOffline, ensure_internet_on
-from qio.package.manager.core import update_core_packages
-from qio.package.manager.tool import ToolPackageManager
-from qio.package.meta import PackageSpec
-from qio.package.version import pepver_to_semver
-from qio.system.prune import calculate_unnecessary_system_data
+
+# The modules below pull in HTTP client, package managers and platforms, they
+# are imported by the rarely executed code paths not to slow down CLI startup
+# pylint: disable=import-outside-toplevel
 
 
 def on_platformio_start(ctx, caller):
     app.set_session_var("command_ctx", ctx)
     set_caller(caller)
+    if PlatformioCLI.in_worker():
+        return
     telemetry.on_command()
 
     if PlatformioCLI.in_silence():
@@ -43,22 +40,11 @@ def on_platformio_start(ctx, caller):
 
 
 def on_platformio_end(ctx, result):  # pylint: disable=unused-argument
-    if PlatformioCLI.in_silence():
+    if PlatformioCLI.in_silence() or PlatformioCLI.in_worker():
         return
 
-    try:
-        check_platformio_upgrade()
-        check_prune_system()
-    except (
-        HTTPClientError,
-        InternetIsOffline,
-        exception.GetLatestVersionError,
-    ):
-        click.secho(
-            "Failed to check for PlatformIO upgrades. "
-            "Please check your Internet connection.",
-            fg="red",
-        )
+    print_maintenance_notices()
+    schedule_maintenance_jobs()
 
 
 def on_platformio_exception(e):
@@ -80,6 +66,10 @@ def set_caller(caller=None):
 
 class Upgrader:
     def __init__(self, from_version, to_version):
+        import semantic_version
+
+        from qio.package.version import pepver_to_semver
+
         self.from_version = pepver_to_semver(from_version)
         self.to_version = pepver_to_semver(to_version)
 
@@ -102,11 +92,16 @@ class Upgrader:
 
     @staticmethod
     def _update_dev_platforms(ctx):
+        from qio.commands.platform import platform_update as cmd_platform_update
+
         ctx.invoke(cmd_platform_update)
         return True
 
     @staticmethod
     def _update_pkg_metadata(_):
+        from qio.package.manager.tool import ToolPackageManager
+        from qio.package.meta import PackageSpec
+
         pm = ToolPackageManager()
         for pkg in pm.get_installed():
             if not pkg.metadata or pkg.metadata.spec.external or pkg.metadata.spec.id:
@@ -130,6 +125,10 @@ def after_upgrade(ctx):
     if last_version == __version__:
         return
 
+    from qio.cache import cleanup_content_cache
+    from qio.package.manager.core import update_core_packages
+    from qio.package.version import pepver_to_semver
+
     if last_version == "0.0.0":
         app.set_state_item("last_version", __version__)
     elif pepver_to_semver(last_version) > pepver_to_semver(__version__):
@@ -200,26 +199,112 @@ def after_upgrade(ctx):
     click.echo("")
 
 
-def check_platformio_upgrade():
-    interval = int(app.get_setting("check_platformio_interval")) * 3600 * 24
-    check_state = app.get_state_item("last_check", {})
-    last_checked_time = check_state.get("platformio_upgrade", 0)
-    if (time() - interval) < last_checked_time:
-        return
+def get_maintenance_jobs():
+    # {name: (interval in seconds, job, notice printer)}
+    return {
+        "platformio_upgrade": (
+            int(app.get_setting("check_platformio_interval")) * 3600 * 24,
+            check_platformio_upgrade,
+            print_platformio_upgrade_notice,
+        ),
+        "prune_system": (
+            30 * 3600 * 24,  # 1 time per month
+            check_prune_system,
+            print_prune_system_notice,
+        ),
+    }
+
+
+def schedule_maintenance_jobs():
+    """Start the due jobs in a detached worker, the command does not wait for it.
+
+    The core packages are updated by the command itself, a next command could
+    use them while the worker replaces them.
+    """
+    jobs = []
+    with app.State(lock=True) as state:
+        check_state = state.get("last_check", {})
+        for name, (interval, _, _) in get_maintenance_jobs().items():
+            last_checked_time = check_state.get(name, 0)
+            if (time() - interval) < last_checked_time:
+                continue
+            check_state[name] = int(time())
+            state["last_check"] = check_state
+            # skip the first run
+            if last_checked_time:
+                jobs.append(name)
+    if "platformio_upgrade" in jobs:
+        update_platformio_core_packages()
+    if jobs:
+        start_maintenance_worker(jobs)
+    return jobs
+
+
+def start_maintenance_worker(jobs):
+    return proc.start_detached_process([sys.executable, "-m", __name__] + jobs)
+
+
+def run_maintenance_jobs(names):
+    jobs = get_maintenance_jobs()
+    for name in names:
+        if name not in jobs:
+            continue
+        try:
+            jobs[name][1]()
+        except Exception:  # pylint: disable=broad-except
+            # an off-line mode or a broken package, try again next time
+            pass
+
+
+def add_maintenance_notice(name, data):
+    with app.State(lock=True) as state:
+        notices = state.get("maintenance_notices", {})
+        notices[name] = data
+        state["maintenance_notices"] = notices
+
+
+def print_maintenance_notices():
+    with app.State(lock=True) as state:
+        notices = state.get("maintenance_notices", {})
+        if notices:
+            del state["maintenance_notices"]
+    jobs = get_maintenance_jobs()
+    for name, data in notices.items():
+        if name in jobs:
+            jobs[name][2](data)
 
-    check_state["platformio_upgrade"] = int(time())
-    app.set_state_item("last_check", check_state)
-    if not last_checked_time:
-        return
 
-    ensure_internet_on(raise_exception=True)
+def check_platformio_upgrade():
+    from qio.commands.upgrade import get_latest_version
+    from qio.http import ensure_internet_on
+    from qio.package.version import pepver_to_semver
 
-    # Update PlatformIO Core packages
-    update_core_packages()
+    ensure_internet_on(raise_exception=True)
 
     latest_version = get_latest_version()
     if pepver_to_semver(latest_version) <= pepver_to_semver(__version__):
         return
+    add_maintenance_notice("platformio_upgrade", dict(version=latest_version))
+
+
+def update_platformio_core_packages():
+    from qio.http import ensure_internet_on
+    from qio.package.manager.core import update_core_packages
+
+    try:
+        if ensure_internet_on():
+            update_core_packages()
+    except Exception:  # pylint: disable=broad-except
+        # an off-line mode or a broken package, try again next time
+        pass
+
+
+def print_platformio_upgrade_notice(data):
+    from qio.package.version import pepver_to_semver
+
+    # PlatformIO could be upgraded after the check
+    if pepver_to_semver(data["version"]) <= pepver_to_semver(__version__):
+        return
 
     terminal_width = shutil.get_terminal_size().columns
 
@@ -227,7 +312,7 @@ def check_platformio_upgrade():
     click.echo("*" * terminal_width)
     click.secho(
         "There is a new version %s of PlatformIO available.\n"
-        "Please upgrade it via `" % latest_version,
+        "Please upgrade it via `" % data["version"],
         fg="yellow",
         nl=False,
     )
@@ -246,17 +331,7 @@ def check_platformio_upgrade():
 
 
 def check_prune_system():
-    interval = 30 * 3600 * 24  # 1 time per month
-    check_state = app.get_state_item("last_check", {})
-    last_checked_time = check_state.get("prune_system", 0)
-    if (time() - interval) < last_checked_time:
-        return
-
-    check_state["prune_system"] = int(time())
-    app.set_state_item("last_check", check_state)
-
-    if not last_checked_time:
-        return
+    from qio.system.prune import calculate_unnecessary_system_data
 
     threshold_mb = int(app.get_setting("check_prune_system_threshold") or 0)
     if threshold_mb <= 0:
@@ -265,7 +340,10 @@ def check_prune_system():
     unnecessary_size = calculate_unnecessary_system_data()
     if (unnecessary_size / 1024) < threshold_mb:
         return
+    add_maintenance_notice("prune_system", dict(size=unnecessary_size))
+
 
+def print_prune_system_notice(data):
     terminal_width = shutil.get_terminal_size().columns
     click.echo()
     click.echo("*" * terminal_width)
@@ -273,6 +351,10 @@ def check_prune_system():
         "We found %s of unnecessary PlatformIO system data (temporary files, "
         "unnecessary packages, etc.).\nUse `pio system prune --dry-run` to list "
         "them or `pio system prune` to save disk space."
-        % fs.humanize_file_size(unnecessary_size),
+        % fs.humanize_file_size(data["size"]),
         fg="yellow",
     )
+
+
+if __name__ == "__main__":
+    run_maintenance_jobs(sys.argv[1:])
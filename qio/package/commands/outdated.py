@@ -18,6 +18,7 @@ import click
 from tabulate import tabulate
 
 from qio import fs
+from qio.package.manager._update import check_outdated_packages
 from qio.package.manager.library import LibraryPackageManager
 from qio.package.manager.platform import PlatformPackageManager
 from qio.package.meta import PackageSpec
@@ -154,18 +155,21 @@ def fetch_outdated_candidates(project_dir, environments, with_progress=False):
         for item in find_library_candidates(config, environments):
             _add_candidate(item)
 
-    result = []
     if not with_progress:
-        for candidate in candidates:
-            if candidate.is_outdated():
-                result.append(candidate)
-        return result
-
-    with click.progressbar(candidates, label="Checking") as pb:
-        for candidate in pb:
-            if candidate.is_outdated():
-                result.append(candidate)
-    return result
+        check_outdated_candidates(candidates)
+    else:
+        with click.progressbar(length=len(candidates), label="Checking") as pb:
+            check_outdated_candidates(candidates, on_checked=pb.update)
+    return [candidate for candidate in candidates if candidate.is_outdated()]
+
+
+def check_outdated_candidates(candidates, on_checked=None):
+    results = check_outdated_packages(
+        [(candidate.pm, candidate.pkg, candidate.spec) for candidate in candidates],
+        on_checked=on_checked,
+    )
+    for candidate, outdated in zip(candidates, results):
+        candidate.outdated = outdated
 
 
 def find_platform_candidates(config, environments):
@@ -199,6 +199,7 @@ def _update_project_env_libraries(project_env, options):
     )
     if options.get("silent"):
         lm.set_log_level(logging.WARN)
+    candidates = []
     for library in config.get(f"env:{project_env}", "lib_deps"):
         spec = PackageSpec(library)
         # skip built-in dependencies
@@ -206,13 +207,18 @@ def _update_project_env_libraries(project_env, options):
             continue
         cur_pkg = lm.get_package(spec)
         if cur_pkg:
-            new_pkg = lm.update(
-                cur_pkg,
-                to_spec=spec,
-                skip_dependencies=options.get("skip_dependencies"),
-            )
-            if cur_pkg != new_pkg:
-                already_up_to_date = False
+            candidates.append((cur_pkg, spec))
+    # check registry and VCS for all libraries at once
+    if len(candidates) > 1:
+        lm.prefetch_outdated(candidates)
+    for cur_pkg, spec in candidates:
+        new_pkg = lm.update(
+            cur_pkg,
+            to_spec=spec,
+            skip_dependencies=options.get("skip_dependencies"),
+        )
+        if cur_pkg != new_pkg:
+            already_up_to_date = False
     return not already_up_to_date
 
 
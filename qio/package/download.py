@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import io
+import re
 from email.utils import parsedate
 from os.path import getsize, join
 from time import mktime
@@ -26,15 +28,32 @@ from qio.package.exception import PackageException
 
 
 class FileDownloader:
-    def __init__(self, url, dest_dir=None):
+    def __init__(self, url, dest_dir=None, resume_size=0):
         self._http_session = HTTPSession()
         self._http_response = None
+        self._hasher = None
+        self._tee_stream = None
         # make connection
         self._http_response = self._http_session.get(
             url,
             stream=True,
+            headers={"Range": "bytes=%d-" % resume_size, "Accept-Encoding": "identity"}
+            if resume_size
+            else None,
         )
-        if self._http_response.status_code != 200:
+        if resume_size and (
+            self._http_response.status_code == 416
+            or (
+                self._http_response.status_code == 206
+                and self._get_content_range_start() != resume_size
+            )
+        ):
+            # a requested range is not satisfiable or a server has ignored
+            # an offset, start from scratch
+            self._http_response.close()
+            self._http_response = self._http_session.get(url, stream=True)
+        self._resume_size = resume_size if self._http_response.status_code == 206 else 0
+        if self._http_response.status_code not in (200, 206):
             raise PackageException(
                 "Got the unrecognized status code '{0}' when downloaded {1}".format(
                     self._http_response.status_code, url
@@ -55,6 +74,12 @@ class FileDownloader:
         if dest_dir:
             self.set_destination(join(dest_dir, self._fname))
 
+    def _get_content_range_start(self):
+        match = re.match(
+            r"bytes\s+(\d+)-", self._http_response.headers.get("content-range", "")
+        )
+        return int(match.group(1)) if match else None
+
     def set_destination(self, destination):
         self._destination = destination
 
@@ -67,21 +92,52 @@ class FileDownloader:
     def get_size(self):
         if "content-length" not in self._http_response.headers:
             return -1
-        return int(self._http_response.headers["content-length"])
+        return self._resume_size + int(self._http_response.headers["content-length"])
+
+    def is_resumed(self):
+        return self._resume_size > 0
 
-    def start(self, with_progress=True, silent=False):
+    @staticmethod
+    def get_hash_algorithm(checksum):
+        return {32: "md5", 40: "sha1", 64: "sha256"}.get(len(checksum or ""))
+
+    def set_tee_stream(self, stream):
+        """Duplicate downloaded data to the stream, used for on the fly unpacking"""
+        self._tee_stream = stream
+
+    def _write_chunk(self, fp, chunk):
+        fp.write(chunk)
+        if self._hasher:
+            self._hasher.update(chunk)
+        if self._tee_stream:
+            self._tee_stream.write(chunk)
+
+    def start(  # pylint: disable=too-many-branches
+        self, with_progress=True, silent=False, hash_algo=None
+    ):
         label = "Downloading"
         file_size = self.get_size()
+        if file_size != -1:
+            file_size -= self._resume_size
         itercontent = self._http_response.iter_content(
             chunk_size=io.DEFAULT_BUFFER_SIZE
         )
+        if hash_algo:
+            self._hasher = hashlib.new(hash_algo)
+            if self.is_resumed():
+                with io.open(self._destination, "rb", buffering=0) as fp:
+                    while True:
+                        chunk = fp.read(io.DEFAULT_BUFFER_SIZE)
+                        if not chunk:
+                            break
+                        self._hasher.update(chunk)
         try:
-            with open(self._destination, "wb") as fp:
+            with open(self._destination, "ab" if self.is_resumed() else "wb") as fp:
                 if file_size == -1 or not with_progress or silent:
                     if not silent:
                         click.echo(f"{label}...")
                     for chunk in itercontent:
-                        fp.write(chunk)
+                        self._write_chunk(fp, chunk)
 
                 elif not is_terminal():
                     click.echo(f"{label} 0%", nl=False)
@@ -89,7 +145,7 @@ class FileDownloader:
                     printed_percents = 0
                     downloaded_size = 0
                     for chunk in itercontent:
-                        fp.write(chunk)
+                        self._write_chunk(fp, chunk)
                         downloaded_size += len(chunk)
                         if (downloaded_size / file_size * 100) >= (
                             printed_percents + print_percent_step
@@ -109,7 +165,7 @@ class FileDownloader:
                     ) as pb:
                         for chunk in pb:
                             pb.update(len(chunk))
-                            fp.write(chunk)
+                            self._write_chunk(fp, chunk)
         finally:
             self._http_response.close()
             self._http_session.close()
@@ -131,21 +187,16 @@ class FileDownloader:
         if not checksum:
             return True
 
-        checksum_len = len(checksum)
-        hash_algo = None
-        if checksum_len == 32:
-            hash_algo = "md5"
-        elif checksum_len == 40:
-            hash_algo = "sha1"
-        elif checksum_len == 64:
-            hash_algo = "sha256"
-
+        hash_algo = self.get_hash_algorithm(checksum)
         if not hash_algo:
             raise PackageException(
                 "Could not determine checksum algorithm by %s" % checksum
             )
 
-        dl_checksum = fs.calculate_file_hashsum(hash_algo, self._destination)
+        if self._hasher and self._hasher.name == hash_algo:
+            dl_checksum = self._hasher.hexdigest()
+        else:
+            dl_checksum = fs.calculate_file_hashsum(hash_algo, self._destination)
         if checksum.lower() != dl_checksum.lower():
             raise PackageException(
                 "The checksum '{0}' of the downloaded file '{1}' "
@@ -13,21 +13,41 @@
 # limitations under the License.
 
 import hashlib
+import io
 import logging
 import os
-import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 
 from qio import app, compat, util
 from qio.package.download import FileDownloader
+from qio.package.exception import PackageException
 from qio.package.lockfile import LockFile
+from qio.package.unpack import FileUnpacker
+
+
+class ProgressStream:
+    """Read-only stream which reports the number of the read bytes"""
+
+    def __init__(self, stream, callback):
+        self._stream = stream
+        self._callback = callback
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        if data:
+            self._callback(len(data))
+        return data
 
 
 class PackageManagerDownloadMixin:
 
     DOWNLOAD_CACHE_EXPIRE = 86400 * 30  # keep package in a local cache for 1 month
+    DOWNLOAD_JOBS = 4  # max number of concurrent downloads
+    STREAMING_UNPACK_EXTENSIONS = (".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
 
     def compute_download_path(self, *args):
         request_hash = hashlib.new("sha1")
@@ -54,48 +74,168 @@ class PackageManagerDownloadMixin:
                 dl_path = os.path.join(self.get_download_dir(), fname)
                 if os.path.isfile(dl_path):
                     os.remove(dl_path)
+        # remove abandoned partial downloads
+        for fname in os.listdir(self.get_download_dir()):
+            part_path = os.path.join(self.get_download_dir(), fname)
+            if fname.endswith(".part") and os.path.getmtime(part_path) < (
+                time.time() - self.DOWNLOAD_CACHE_EXPIRE
+            ):
+                os.remove(part_path)
 
-    def download(self, url, checksum=None):
+    def download(self, url, checksum=None, with_progress=None):
         silent = not self.log.isEnabledFor(logging.INFO)
         dl_path = self.compute_download_path(url, checksum or "")
         if os.path.isfile(dl_path):
             self.set_download_utime(dl_path)
             return dl_path
 
-        with_progress = not silent and not app.is_disabled_progressbar()
-        tmp_fd, tmp_path = tempfile.mkstemp(dir=self.get_download_dir())
-        try:
-            with LockFile(dl_path):
+        if with_progress is None:
+            with_progress = not silent and not app.is_disabled_progressbar()
+        # keep a partially downloaded file between attempts to resume it
+        part_path = dl_path + ".part"
+        hash_algo = FileDownloader.get_hash_algorithm(checksum) if checksum else None
+        with LockFile(dl_path):
+            # could be downloaded by a concurrent process in the meantime
+            if os.path.isfile(dl_path):
+                self.set_download_utime(dl_path)
+                return dl_path
+            try:
+                fd = self._start_download(
+                    url, part_path, with_progress, silent, hash_algo
+                )
+            except IOError as exc:
                 try:
-                    fd = FileDownloader(url)
-                    fd.set_destination(tmp_path)
-                    fd.start(with_progress=with_progress, silent=silent)
-                except IOError as exc:
-                    raise_error = not with_progress
-                    if with_progress:
-                        try:
-                            fd = FileDownloader(url)
-                            fd.set_destination(tmp_path)
-                            fd.start(with_progress=False, silent=silent)
-                        except IOError:
-                            raise_error = True
-                    if raise_error:
-                        self.log.error(
-                            click.style(
-                                "Error: Please read https://bit.ly/package-manager-ioerror",
-                                fg="red",
-                            )
+                    fd = self._start_download(url, part_path, False, silent, hash_algo)
+                except IOError:
+                    self.log.error(
+                        click.style(
+                            "Error: Please read https://bit.ly/package-manager-ioerror",
+                            fg="red",
                         )
-                        raise exc
+                    )
+                    raise exc from None
             if checksum:
-                fd.verify(checksum)
-            os.close(tmp_fd)
-            os.rename(tmp_path, dl_path)
-        finally:
-            if os.path.isfile(tmp_path):
-                os.close(tmp_fd)
-                os.remove(tmp_path)
+                try:
+                    fd.verify(checksum)
+                except PackageException as exc:
+                    os.remove(part_path)
+                    raise exc
+            os.replace(part_path, dl_path)
 
         assert os.path.isfile(dl_path)
         self.set_download_utime(dl_path)
         return dl_path
+
+    def is_streaming_unpack_allowed(self, url, checksum=None):
+        return (
+            checksum
+            and url.split("?")[0].lower().endswith(self.STREAMING_UNPACK_EXTENSIONS)
+            and not os.path.isfile(self.compute_download_path(url, checksum))
+        )
+
+    def download_and_unpack(  # pylint: disable=too-many-locals
+        self, url, checksum, dst_dir, with_progress=None
+    ):
+        """Unpack a TAR archive while it is being downloaded.
+
+        Downloaded data is passed to the hasher, to the streaming unpacker
+        and to the download cache at the same time. The caller must discard
+        `dst_dir` when the checksum does not match.
+        """
+        silent = not self.log.isEnabledFor(logging.INFO)
+        if with_progress is None:
+            with_progress = not silent and not app.is_disabled_progressbar()
+        dl_path = self.compute_download_path(url, checksum)
+        part_path = dl_path + ".part"
+        with LockFile(dl_path):
+            if os.path.isfile(part_path):
+                os.remove(part_path)  # a stream can not be resumed
+            fd = FileDownloader(url)
+            fd.set_destination(part_path)
+            read_fd, write_fd = os.pipe()
+            errors = []
+
+            def _download():
+                try:
+                    with os.fdopen(write_fd, "wb") as pipe:
+                        fd.set_tee_stream(pipe)
+                        # a progress is driven by the unpacker, see below
+                        fd.start(
+                            with_progress=False,
+                            silent=True,
+                            hash_algo=FileDownloader.get_hash_algorithm(checksum),
+                        )
+                except Exception as exc:  # pylint: disable=broad-except
+                    errors.append(exc)
+
+            thread = threading.Thread(target=_download)
+            thread.start()
+            unpack_error = None
+            try:
+                with os.fdopen(read_fd, "rb") as pipe:
+                    file_size = fd.get_size()
+                    if with_progress and file_size != -1:
+                        with click.progressbar(
+                            length=file_size, label="Downloading & Unpacking"
+                        ) as pb:
+                            self._unpack_stream(
+                                ProgressStream(pipe, pb.update), dst_dir
+                            )
+                    else:
+                        if not silent:
+                            click.echo("Downloading & Unpacking...")
+                        self._unpack_stream(pipe, dst_dir)
+            except Exception as exc:  # pylint: disable=broad-except
+                unpack_error = exc
+            finally:
+                # a closed pipe interrupts the download on error
+                thread.join()
+            if errors or unpack_error:
+                raise errors[0] if errors else unpack_error
+            try:
+                fd.verify(checksum)
+            except PackageException as exc:
+                os.remove(part_path)
+                raise exc
+            os.replace(part_path, dl_path)
+        self.set_download_utime(dl_path)
+        return True
+
+    @staticmethod
+    def _unpack_stream(stream, dst_dir):
+        with FileUnpacker(fileobj=stream) as fu:
+            fu.unpack(dst_dir, with_progress=False, silent=True)
+        # drain a tail of the archive (padding, etc)
+        while stream.read(io.DEFAULT_BUFFER_SIZE):
+            pass
+
+    @staticmethod
+    def _start_download(url, part_path, with_progress, silent, hash_algo):
+        fd = FileDownloader(
+            url,
+            resume_size=os.path.getsize(part_path) if os.path.isfile(part_path) else 0,
+        )
+        fd.set_destination(part_path)
+        fd.start(with_progress=with_progress, silent=silent, hash_algo=hash_algo)
+        return fd
+
+    def download_many(self, items):
+        """Download independent archives concurrently.
+
+        Items are `(url, checksum)` pairs, returns a list of local paths
+        in the same order, `None` for a failed download.
+        """
+
+        def _download(item):
+            try:
+                return self.download(*item, with_progress=False)
+            except Exception as exc:  # pylint: disable=broad-except
+                self.log.debug("Could not download %s: %s", item[0], exc)
+            return None
+
+        if not items:
+            return []
+        with ThreadPoolExecutor(
+            max_workers=min(self.DOWNLOAD_JOBS, len(items))
+        ) as executor:
+            return list(executor.map(_download, items))
@@ -174,21 +174,27 @@ class PackageManagerInstallMixin:
 
         tmp_dir = tempfile.mkdtemp(prefix="pkg-installing-", dir=self.get_tmp_dir())
         vcs = None
+        # the same package archive has been installed before
+        store_key = (
+            checksum
+            if checksum
+            and uri.startswith(("http://", "https://"))
+            and self.get_store().is_reflink_supported(tmp_dir)
+            else None
+        )
         try:
-            if uri.startswith("file://"):
-                _uri = uri[7:]
-                if os.path.isfile(_uri):
-                    self.unpack(_uri, tmp_dir)
-                else:
-                    fs.rmtree(tmp_dir)
-                    shutil.copytree(_uri, tmp_dir, symlinks=True)
-            elif uri.startswith(("http://", "https://")):
-                dl_path = self.download(uri, checksum)
-                assert os.path.isfile(dl_path)
-                self.unpack(dl_path, tmp_dir)
+            materialized = store_key and self.get_store().materialize_tree(
+                store_key, tmp_dir
+            )
+            if materialized:
+                self.log.debug(
+                    click.style("Using package files from the store", fg="yellow")
+                )
             else:
-                vcs = VCSClientFactory.new(tmp_dir, uri)
-                assert vcs.export()
+                if store_key:  # remove partially materialized files
+                    fs.rmtree(tmp_dir)
+                    os.makedirs(tmp_dir)
+                vcs = self._fetch_uri(uri, checksum, tmp_dir)
 
             root_dir = self.find_pkg_root(tmp_dir, spec)
             pkg_item = PackageItem(
@@ -198,7 +204,10 @@ class PackageManagerInstallMixin:
                 ),
             )
             pkg_item.dump_meta()
-            return self._install_tmp_pkg(pkg_item)
+            pkg = self._install_tmp_pkg(pkg_item)
+            if store_key:
+                self.add_pkg_to_store(pkg, store_key, materialized)
+            return pkg
         finally:
             if os.path.isdir(tmp_dir):
                 try:
@@ -206,6 +215,41 @@ class PackageManagerInstallMixin:
                 except:  # pylint: disable=bare-except
                     pass
 
+    def _fetch_uri(self, uri, checksum, tmp_dir):
+        """Place package files to ``tmp_dir``, returns a VCS client if used"""
+        if uri.startswith("file://"):
+            _uri = uri[7:]
+            if os.path.isfile(_uri):
+                self.unpack(_uri, tmp_dir)
+            else:
+                fs.rmtree(tmp_dir)
+                shutil.copytree(_uri, tmp_dir, symlinks=True)
+        elif uri.startswith(("http://", "https://")):
+            if self.is_streaming_unpack_allowed(uri, checksum):
+                self.download_and_unpack(uri, checksum, tmp_dir)
+            else:
+                dl_path = self.download(uri, checksum)
+                assert os.path.isfile(dl_path)
+                self.unpack(dl_path, tmp_dir)
+        else:
+            vcs = VCSClientFactory.new(tmp_dir, uri)
+            assert vcs.export()
+            return vcs
+        return None
+
+    def add_pkg_to_store(self, pkg, key=None, materialized=False):
+        try:
+            if materialized:
+                # the files are the clones of the known tree objects
+                self.get_store().add_ref(key, pkg.path)
+            else:
+                self.get_store().add_tree(pkg.path, key)
+        except OSError as exc:
+            # the installed package is valid, only files are not deduplicated
+            self.log.debug(
+                click.style("Could not add package to the store: %s" % exc, fg="yellow")
+            )
+
     def _install_tmp_pkg(self, tmp_pkg):
         assert isinstance(tmp_pkg, PackageItem)
         # validate package version and declared requirements
@@ -268,7 +312,7 @@ class PackageManagerInstallMixin:
             shutil.copytree(dst_pkg.path, pkg_dir, symlinks=True)
             # move new source to the destination location
             _cleanup_dir(dst_pkg.path)
-            shutil.copytree(tmp_pkg.path, dst_pkg.path, symlinks=True)
+            shutil.move(tmp_pkg.path, dst_pkg.path)
             return PackageItem(dst_pkg.path)
 
         if action == "detach-new":
@@ -285,10 +329,11 @@ class PackageManagerInstallMixin:
                 )
             pkg_dir = os.path.join(self.package_dir, target_dirname)
             _cleanup_dir(pkg_dir)
-            shutil.copytree(tmp_pkg.path, pkg_dir, symlinks=True)
+            shutil.move(tmp_pkg.path, pkg_dir)
             return PackageItem(pkg_dir)
 
         # otherwise, overwrite existing
         _cleanup_dir(dst_pkg.path)
-        shutil.copytree(tmp_pkg.path, dst_pkg.path, symlinks=True)
+        # a temporary dir is discarded after installation, rename it when possible
+        shutil.move(tmp_pkg.path, dst_pkg.path)
         return PackageItem(dst_pkg.path)
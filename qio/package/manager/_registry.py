@@ -25,6 +25,30 @@ from qio.registry.mirror import RegistryFileMirrorIterator
 
 class PackageManagerRegistryMixin:
     def install_from_registry(self, spec, search_qualifiers=None):
+        package, pkgfile = self.find_registry_pkgfile(spec, search_qualifiers)
+
+        for url, checksum in RegistryFileMirrorIterator(pkgfile["download_url"]):
+            try:
+                return self.install_from_uri(
+                    url,
+                    PackageSpec(
+                        owner=package["owner"]["username"],
+                        id=package["id"],
+                        name=package["name"],
+                    ),
+                    checksum or pkgfile["checksum"]["sha256"],
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                self.log.warning(
+                    click.style("Warning! Package Mirror: %s" % exc, fg="yellow")
+                )
+                self.log.warning(
+                    click.style("Looking for another mirror...", fg="yellow")
+                )
+
+        return None
+
+    def find_registry_pkgfile(self, spec, search_qualifiers=None):
         if spec.owner and spec.name and not search_qualifiers:
             package = self.fetch_registry_package(spec)
             if not package:
@@ -44,27 +68,30 @@ class PackageManagerRegistryMixin:
         pkgfile = self.pick_compatible_pkg_file(version["files"]) if version else None
         if not pkgfile:
             raise UnknownPackageError(spec.humanize())
+        return package, pkgfile
 
-        for url, checksum in RegistryFileMirrorIterator(pkgfile["download_url"]):
+    def prefetch_registry_packages(self, specs):
+        """Download archives of not installed packages concurrently.
+
+        The following `install()` calls pick them from the download cache.
+        """
+        items = []
+        for spec in specs:
+            spec = self.ensure_spec(spec)
+            if spec.external or self.get_package(spec):
+                continue
             try:
-                return self.install_from_uri(
-                    url,
-                    PackageSpec(
-                        owner=package["owner"]["username"],
-                        id=package["id"],
-                        name=package["name"],
-                    ),
-                    checksum or pkgfile["checksum"]["sha256"],
+                _, pkgfile = self.find_registry_pkgfile(spec)
+                url, checksum = next(
+                    iter(RegistryFileMirrorIterator(pkgfile["download_url"]))
                 )
             except Exception as exc:  # pylint: disable=broad-except
-                self.log.warning(
-                    click.style("Warning! Package Mirror: %s" % exc, fg="yellow")
-                )
-                self.log.warning(
-                    click.style("Looking for another mirror...", fg="yellow")
-                )
-
-        return None
+                self.log.debug("Could not prefetch %s: %s", spec.humanize(), exc)
+                continue
+            items.append((url, checksum or pkgfile["checksum"]["sha256"]))
+        if len(items) > 1:
+            self.log.info("Downloading %d packages..." % len(items))
+            self.download_many(items)
 
     def get_registry_client_instance(self):
         if not self._registry_client:
@@ -13,15 +13,81 @@
 # limitations under the License.
 
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import click
 
+from qio import util
 from qio.package.exception import UnknownPackageError
 from qio.package.meta import PackageItem, PackageOutdatedResult, PackageSpec
 from qio.package.vcsclient import VCSBaseException, VCSClientFactory
 
+OUTDATED_CHECK_JOBS = 8
+
+
+def get_outdated_check_key(pm, pkg, spec=None):
+    """The same package installed in different storages is checked once"""
+    if spec and not isinstance(spec, PackageSpec):
+        spec = PackageSpec(spec)
+    return (
+        pm.pkg_type,
+        repr(pm.compatibility),
+        os.path.basename(pkg.path),
+        repr(pkg.metadata.spec),
+        str(pkg.metadata.version),
+        repr(spec),
+    )
+
+
+def _check_outdated(pm, pkg, spec):
+    # the pool bounds the registry requests to `jobs` concurrent ones, the
+    # process-wide HTTP throttle would serialize them to 2 requests per second
+    with util.throttle.suspended():
+        return pm.outdated(pkg, spec)
+
+
+def check_outdated_packages(items, on_checked=None, jobs=OUTDATED_CHECK_JOBS):
+    """Check ``(pm, pkg, spec)`` items using a bounded pool of workers.
+
+    Returns a list of ``PackageOutdatedResult`` in the order of items, the
+    ``on_checked(number)`` callback is called when items are checked. The
+    registry is queried by up to ``jobs`` concurrent requests, they are not
+    spaced out by the HTTP client throttle.
+    """
+    groups = {}
+    for index, (pm, pkg, spec) in enumerate(items):
+        groups.setdefault(get_outdated_check_key(pm, pkg, spec), []).append(index)
+
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for indexes in groups.values():
+            pm, pkg, spec = items[indexes[0]]
+            futures[executor.submit(_check_outdated, pm, pkg, spec)] = indexes
+        for future in as_completed(futures):
+            for index in futures[future]:
+                results[index] = future.result()
+            if on_checked:
+                on_checked(len(futures[future]))
+    return results
+
 
 class PackageManagerUpdateMixin:
+
+    _PREFETCHED_OUTDATED = None
+
+    def prefetch_outdated(self, items):
+        """Check ``(pkg, spec)`` items concurrently for the next ``update()`` calls"""
+        results = check_outdated_packages([(self, pkg, spec) for pkg, spec in items])
+        self._PREFETCHED_OUTDATED = {
+            self._get_prefetched_outdated_key(pkg, spec): result
+            for (pkg, spec), result in zip(items, results)
+        }
+
+    def _get_prefetched_outdated_key(self, pkg, spec=None):
+        spec = self.ensure_spec(spec) if spec else None
+        return (pkg.path, repr(spec))
+
     def outdated(self, pkg, spec=None):
         assert isinstance(pkg, PackageItem)
         assert pkg.metadata
@@ -93,7 +159,13 @@ class PackageManagerUpdateMixin:
         if not pkg or not pkg.metadata:
             raise UnknownPackageError(from_spec)
 
-        outdated = self.outdated(pkg, to_spec)
+        outdated = None
+        if self._PREFETCHED_OUTDATED:
+            outdated = self._PREFETCHED_OUTDATED.pop(
+                self._get_prefetched_outdated_key(pkg, to_spec), None
+            )
+        if not outdated:
+            outdated = self.outdated(pkg, to_spec)
         if not outdated.is_outdated(allow_incompatible=False):
             self.log.debug(
                 click.style(
@@ -39,6 +39,7 @@ from qio.package.meta import (
     PackageSpec,
     PackageType,
 )
+from qio.package.store import PackageStore
 from qio.proc import get_pythonexe_path
 from qio.project.helpers import get_project_cache_dir
 
@@ -69,6 +70,7 @@ class BasePackageManager(  # pylint: disable=too-many-public-methods,too-many-in
         self._lockfile = None
         self._download_dir = None
         self._tmp_dir = None
+        self._store = None
         self._registry_client = None
 
     def __repr__(self):
@@ -150,6 +152,11 @@ class BasePackageManager(  # pylint: disable=too-many-public-methods,too-many-in
             )
         return self._tmp_dir
 
+    def get_store(self):
+        if not self._store:
+            self._store = PackageStore()
+        return self._store
+
     def find_pkg_root(self, path, spec):  # pylint: disable=unused-argument
         if self.manifest_exists(path):
             return path
@@ -12,21 +12,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import os
 
-from qio import util
+from qio import exception, fs, util
 from qio.http import HTTPClientError, InternetIsOffline
 from qio.package.exception import UnknownPackageError
 from qio.package.manager.base import BasePackageManager
 from qio.package.manager.core import get_installed_core_packages
 from qio.package.manager.tool import ToolPackageManager
 from qio.package.meta import PackageType
+from qio.platform.board import PlatformBoardConfig
 from qio.platform.exception import IncompatiblePlatform, UnknownBoard
 from qio.platform.factory import PlatformFactory
 from qio.project.config import ProjectConfig
 
 
 class PlatformPackageManager(BasePackageManager):  # pylint: disable=too-many-ancestors
+    BOARDS_INDEX_NAME = ".pioboards.json"
+    BOARDS_INDEX_VERSION = 3
+
     def __init__(self, package_dir=None):
         self.config = ProjectConfig.get_instance()
         super().__init__(
@@ -62,6 +67,7 @@ class PlatformPackageManager(BasePackageManager):  # pylint: disable=too-many-an
             p.install_required_packages(force=force)
         if not already_installed:
             p.on_installed()
+        self.build_boards_index(pkg)
         return pkg
 
     def uninstall(  # pylint: disable=arguments-differ
@@ -102,16 +108,127 @@ class PlatformPackageManager(BasePackageManager):  # pylint: disable=too-many-an
             p.configure_project_packages(project_env)
         if not skip_dependencies:
             p.update_packages()
+        self.build_boards_index(pkg)
         return pkg
 
-    @util.memoized(expire="5s")
+    def get_boards_index_path(self, pkg):
+        return os.path.join(pkg.path, self.BOARDS_INDEX_NAME)
+
+    def _get_boards_index_stamp(self, pkg):
+        def _get_dir_stamp(path):
+            # an edited board manifest does not change mtime of its directory
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            mtimes = [st.st_mtime]
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".json"):
+                            mtimes.append(entry.stat().st_mtime)
+            except OSError:
+                return None
+            return [len(mtimes), max(mtimes)]
+
+        def _get_file_stamp(path):
+            try:
+                return os.stat(path).st_mtime
+            except OSError:
+                return None
+
+        return [
+            str(pkg.metadata.version) if pkg.metadata else None,
+            _get_file_stamp(os.path.join(pkg.path, "platform.json")),
+            _get_file_stamp(os.path.join(pkg.path, "platform.py")),
+            _get_dir_stamp(os.path.join(pkg.path, "boards")),
+        ]
+
+    def build_boards_index(self, pkg):
+        """Dump brief data of the platform's own boards to a compact index file.
+
+        The boards of the project and core boards dirs are not indexed, they
+        are merged by ``get_installed_boards`` when the index is read.
+        """
+        stamp = self._get_boards_index_stamp(pkg)
+        # a dedicated instance, its boards cache holds the own boards only
+        p = PlatformFactory.new(pkg)
+        p.with_custom_boards = False
+        data = dict(
+            version=self.BOARDS_INDEX_VERSION,
+            stamp=stamp,
+            platform=p.name,
+            boards=[config.get_brief_data() for config in p.get_boards().values()],
+        )
+        try:
+            with open(self.get_boards_index_path(pkg), mode="w", encoding="utf8") as fp:
+                json.dump(data, fp, separators=(",", ":"))
+        except IOError:
+            pass
+        return data
+
+    def load_boards_index(self, pkg):
+        """The platform name and brief data of its own boards, the index is
+        rebuilt when stale"""
+        index_path = self.get_boards_index_path(pkg)
+        if os.path.isfile(index_path):
+            try:
+                data = fs.load_json(index_path)
+            except exception.InvalidJSONFile:
+                data = None
+            if (
+                isinstance(data, dict)
+                and data.get("version") == self.BOARDS_INDEX_VERSION
+                and data.get("stamp") == self._get_boards_index_stamp(pkg)
+            ):
+                return data
+        return self.build_boards_index(pkg)
+
     def get_installed_boards(self):
+        return self._get_installed_boards(
+            self.config.get("platformio", "boards_dir"),
+            os.path.join(self.config.get("platformio", "core_dir"), "boards"),
+        )
+
+    @util.memoized(expire="5s")
+    def _get_installed_boards(self, *custom_boards_dirs):
+        custom_configs = []
+        for boards_dir in custom_boards_dirs:
+            if not os.path.isdir(boards_dir):
+                continue
+            custom_configs.extend(
+                PlatformBoardConfig(os.path.join(boards_dir, item))
+                for item in sorted(os.listdir(boards_dir))
+                if item.endswith(".json")
+            )
         boards = []
+        known_boards = set()
         for pkg in self.get_installed():
-            p = PlatformFactory.new(pkg)
-            for config in p.get_boards().values():
-                board = config.get_brief_data()
-                if board not in boards:
+            index = self.load_boards_index(pkg)
+            platform_boards = {}
+            # the custom boards override the platform boards with the same ID,
+            # they are loaded by the platform to apply its customizations
+            custom_ids = [
+                config.id
+                for config in custom_configs
+                if config.is_compatible(index["platform"])
+            ]
+            if custom_ids:
+                p = PlatformFactory.new(pkg)
+                for board_id in custom_ids:
+                    if board_id in platform_boards:
+                        continue
+                    try:
+                        config = p.get_boards(board_id)
+                    except UnknownBoard:
+                        continue
+                    platform_boards[board_id] = config.get_brief_data()
+            for board in index["boards"]:
+                platform_boards.setdefault(board["id"], board)
+            for board in platform_boards.values():
+                key = json.dumps(board, sort_keys=True)
+                if key not in known_boards:
+                    known_boards.add(key)
                     boards.append(board)
         return boards
 
@@ -457,7 +457,11 @@ class PackageMetaData:
 
     @staticmethod
     def load(path):
-        data = fs.load_json(path)
+        return PackageMetaData.from_dict(fs.load_json(path))
+
+    @staticmethod
+    def from_dict(data):
+        data = dict(data)
         if data["spec"]:
             # legacy support for Core<5.3 packages
             if "url" in data["spec"]:
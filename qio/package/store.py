@@ -0,0 +1,296 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import sys
+import time
+
+from qio import fs
+from qio.compat import IS_WINDOWS
+from qio.package.lockfile import LockFile
+from qio.package.meta import PackageItem
+from qio.project.config import ProjectConfig
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FICLONE = 0x40049409  # Linux ioctl, clone a file using copy-on-write
+
+
+class PackageStore:
+    """Content-addressed storage of package files shared between package dirs.
+
+    Every regular file of an installed package is kept once in
+    ``objects/<aa>/<digest>`` and materialized into the package dirs as a
+    reflink (copy-on-write clone), so editing a package file never changes the
+    store and the package dirs do not take extra space. The store is used only
+    where a file system of the package dirs supports reflinks, a plain copy
+    would store every file twice. The objects are read-only. An installed
+    package tree is described by a manifest in ``trees/<archive checksum>.json``
+    that allows to install the same package again without downloading and
+    unpacking it, the package dirs using a tree are registered in
+    ``refs/<archive checksum>/``.
+    """
+
+    VERSION = 3
+    HASH_ALGORITHM = "sha256"
+    # an object is not collected while it may be in use by another installation
+    GC_GRACE_PERIOD = 3600  # 1 hour
+
+    # {(store_dir, device of a package dir): bool}
+    _REFLINK_SUPPORT = {}
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir or ProjectConfig.get_instance().get(
+            "platformio", "store_dir"
+        )
+        self.objects_dir = os.path.join(self.store_dir, "objects")
+        self.trees_dir = os.path.join(self.store_dir, "trees")
+        self.refs_dir = os.path.join(self.store_dir, "refs")
+
+    def __repr__(self):
+        return "%s <store_dir=%s>" % (self.__class__.__name__, self.store_dir)
+
+    def get_object_path(self, digest, executable=False):
+        return os.path.join(
+            self.objects_dir, digest[:2], digest[2:] + ("-x" if executable else "")
+        )
+
+    def get_tree_path(self, key):
+        assert re.match(r"^[\da-f]+$", key, re.I), key
+        return os.path.join(self.trees_dir, "%s.json" % key.lower())
+
+    def get_refs_dir(self, key):
+        assert re.match(r"^[\da-f]+$", key, re.I), key
+        return os.path.join(self.refs_dir, key.lower())
+
+    def load_tree(self, key):
+        if not key:
+            return None
+        try:
+            data = fs.load_json(self.get_tree_path(key))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return None
+        return data
+
+    def save_tree(self, key, tree):
+        path = self.get_tree_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, mode="w", encoding="utf8") as fp:
+            json.dump(tree, fp)
+        os.replace(tmp_path, path)
+
+    def add_ref(self, key, pkg_dir):
+        """Register a package dir that was installed from the ``key`` tree"""
+        pkg_dir = os.path.abspath(pkg_dir)
+        refs_dir = self.get_refs_dir(key)
+        os.makedirs(refs_dir, exist_ok=True)
+        name = hashlib.sha1(pkg_dir.encode()).hexdigest()
+        with open(os.path.join(refs_dir, name), mode="w", encoding="utf8") as fp:
+            fp.write(pkg_dir)
+
+    def is_reflink_supported(self, dst_dir):
+        """Whether the store objects can be cloned to ``dst_dir``"""
+        try:
+            cache_key = (self.store_dir, os.stat(dst_dir).st_dev)
+        except OSError:
+            return False
+        if cache_key not in self._REFLINK_SUPPORT:
+            self._REFLINK_SUPPORT[cache_key] = self._probe_reflink(dst_dir)
+        return self._REFLINK_SUPPORT[cache_key]
+
+    def _probe_reflink(self, dst_dir):
+        if not sys.platform.startswith("linux") or not fcntl:
+            return False
+        name = ".reflink-probe-%d" % os.getpid()
+        src = os.path.join(self.store_dir, name)
+        dst = os.path.join(dst_dir, name)
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            with open(src, mode="wb") as fp:
+                fp.write(b"probe")
+            return self._reflink(src, dst)
+        except OSError:
+            return False
+        finally:
+            for path in (src, dst):
+                if os.path.isfile(path):
+                    os.remove(path)
+
+    @staticmethod
+    def _reflink(src, dst):
+        try:
+            with open(src, "rb") as src_fp, open(dst, "wb") as dst_fp:
+                fcntl.ioctl(dst_fp.fileno(), FICLONE, src_fp.fileno())
+        except (OSError, AttributeError):
+            if os.path.isfile(dst):
+                os.remove(dst)
+            return False
+        return True
+
+    def clone_file(self, src, dst, mode=None):
+        """Place ``src`` content to a new ``dst`` file sharing storage if possible"""
+        cloned = self._reflink(src, dst)
+        if not cloned:
+            shutil.copyfile(src, dst)
+        os.chmod(dst, mode if mode is not None else stat.S_IMODE(os.stat(src).st_mode))
+        return cloned
+
+    def _replace_with_clone(self, src, dst, mode):
+        tmp_path = "%s.%d.piostore" % (dst, os.getpid())
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            self.clone_file(src, tmp_path, mode)
+            os.replace(tmp_path, dst)
+        finally:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+
+    def is_valid_object(self, digest, executable, size):
+        """A cheap check, the read-only objects are changed only by a user"""
+        try:
+            return os.path.getsize(self.get_object_path(digest, executable)) == size
+        except OSError:
+            return False
+
+    def add_file(self, path):
+        """Copy a file content to the store unless an object exists"""
+        st = os.stat(path)
+        executable = bool(st.st_mode & stat.S_IXUSR)
+        digest = fs.calculate_file_hashsum(self.HASH_ALGORITHM, path)
+        if self.is_valid_object(digest, executable, st.st_size):
+            return [digest, executable, st.st_size]
+        obj_path = self.get_object_path(digest, executable)
+        os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+        if IS_WINDOWS and os.path.isfile(obj_path):  # a read-only corrupted object
+            os.chmod(obj_path, stat.S_IWUSR | stat.S_IRUSR)
+        self._replace_with_clone(path, obj_path, 0o555 if executable else 0o444)
+        return [digest, executable, st.st_size]
+
+    def add_tree(self, root, key=None):
+        """Copy regular files of a package to the store.
+
+        The ``root`` package dir is registered as a user of the tree.
+        """
+        tree = dict(version=self.VERSION, dirs=[], files=[], symlinks=[])
+        for cur_dir, dirnames, filenames in os.walk(root):
+            reldir = os.path.relpath(cur_dir, root)
+            for name in list(dirnames):
+                if os.path.islink(os.path.join(cur_dir, name)):
+                    dirnames.remove(name)
+                    filenames.append(name)
+                else:
+                    tree["dirs"].append(self._to_relpath(reldir, name))
+            for name in filenames:
+                path = os.path.join(cur_dir, name)
+                relpath = self._to_relpath(reldir, name)
+                if os.path.islink(path):
+                    tree["symlinks"].append([relpath, os.readlink(path)])
+                elif name != PackageItem.METAFILE_NAME and os.path.isfile(path):
+                    tree["files"].append([relpath] + self.add_file(path))
+        if key:
+            self.save_tree(key, tree)
+            self.add_ref(key, root)
+        return tree
+
+    @staticmethod
+    def _to_relpath(reldir, name):
+        if reldir == ".":
+            return name
+        return "/".join(reldir.split(os.sep) + [name])
+
+    def materialize_tree(self, key, dst_dir):
+        """Create package files from the store, returns False if content is missing"""
+        tree = self.load_tree(key)
+        if not tree:
+            return False
+        for _, digest, executable, size in tree["files"]:
+            if not self.is_valid_object(digest, executable, size):
+                return False
+        try:
+            for relpath in tree["dirs"]:
+                os.makedirs(os.path.join(dst_dir, relpath), exist_ok=True)
+            for relpath, digest, executable, _ in tree["files"]:
+                self.clone_file(
+                    self.get_object_path(digest, executable),
+                    os.path.join(dst_dir, relpath),
+                    0o755 if executable else 0o644,
+                )
+            for relpath, target in tree["symlinks"]:
+                os.symlink(target, os.path.join(dst_dir, relpath))
+        except OSError:
+            return False
+        return True
+
+    def _is_tree_used(self, key, expire_time):
+        refs_dir = self.get_refs_dir(key)
+        if os.path.isdir(refs_dir):
+            for name in os.listdir(refs_dir):
+                with open(os.path.join(refs_dir, name), encoding="utf8") as fp:
+                    if os.path.isdir(fp.read()):
+                        return True
+        # a tree that was saved recently may be in use by another installation
+        return os.path.getmtime(self.get_tree_path(key)) > expire_time
+
+    def collect_garbage(self, dry_run=False):
+        """Remove trees that are not used by any package dir and their objects.
+
+        Returns the amount of reclaimed space in bytes.
+        """
+        if not os.path.isdir(self.store_dir):
+            return 0
+        reclaimed_space = 0
+        expire_time = time.time() - self.GC_GRACE_PERIOD
+        with LockFile(self.store_dir):
+            used_objects = set()
+            names = os.listdir(self.trees_dir) if os.path.isdir(self.trees_dir) else []
+            for name in names:
+                key = name.split(".")[0]
+                tree = self.load_tree(key)
+                if tree and self._is_tree_used(key, expire_time):
+                    used_objects.update(
+                        self.get_object_path(digest, executable)
+                        for _, digest, executable, _ in tree["files"]
+                    )
+                    continue
+                if not dry_run:
+                    os.remove(os.path.join(self.trees_dir, name))
+                    if os.path.isdir(self.get_refs_dir(key)):
+                        fs.rmtree(self.get_refs_dir(key))
+            for cur_dir, _, filenames in os.walk(self.objects_dir):
+                for name in filenames:
+                    path = os.path.join(cur_dir, name)
+                    if path in used_objects:
+                        continue
+                    st = os.lstat(path)
+                    # an object is added before its tree is saved
+                    if st.st_ctime > expire_time:
+                        continue
+                    reclaimed_space += st.st_size
+                    if not dry_run:
+                        if IS_WINDOWS:
+                            os.chmod(path, stat.S_IWUSR | stat.S_IRUSR)
+                        os.remove(path)
+        return reclaimed_space
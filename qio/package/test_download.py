@@ -0,0 +1,65 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from qio.package.download import FileDownloader
+
+CONTENT = bytes(range(256)) * 64
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # pylint: disable=invalid-name
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.server.mode != "ignore":
+            start = int(range_header[6:].split("-")[0])
+        data = CONTENT[start:]
+        if range_header and self.server.mode == "wrong-offset":
+            # a partial response which does not start at the requested offset
+            start = 0
+            data = CONTENT
+        self.send_response(
+            206 if range_header and self.server.mode != "ignore" else 200
+        )
+        if self.server.mode != "ignore" and range_header:
+            self.send_header(
+                "Content-Range",
+                "bytes %d-%d/%d" % (start, len(CONTENT) - 1, len(CONTENT)),
+            )
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), RangeHandler)
+    httpd.mode = None
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize(
+    "mode,resumed",
+    [("honor", True), ("ignore", False), ("wrong-offset", False)],
+)
+def test_resume_download(server, tmp_path, mode, resumed):
+    # pylint: disable=redefined-outer-name
+    server.mode = mode
+    part_path = tmp_path / "package.tar.gz.part"
+    part_path.write_bytes(CONTENT[:1000])
+    fd = FileDownloader(
+        "http://127.0.0.1:%d/package.tar.gz" % server.server_port,
+        resume_size=1000,
+    )
+    fd.set_destination(str(part_path))
+    assert fd.is_resumed() == resumed
+    assert fd.get_size() == len(CONTENT)
+    fd.start(with_progress=False, silent=True, hash_algo="sha1")
+    assert part_path.read_bytes() == CONTENT
@@ -1,7 +1,12 @@
 # pylint: disable=unused-argument
 
+import functools
+import json
 import os
+import threading
 import time
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
 
 import pytest
 import semantic_version
@@ -10,13 +15,23 @@ from qio import fs, util
 from qio.compat import PY2
 from qio.package.exception import (
     MissingPackageManifestError,
+    PackageException,
     UnknownPackageError,
 )
+from qio.package.manager._update import check_outdated_packages
 from qio.package.manager.library import LibraryPackageManager
 from qio.package.manager.platform import PlatformPackageManager
 from qio.package.manager.tool import ToolPackageManager
-from qio.package.meta import PackageSpec
+from qio.package.meta import (
+    PackageItem,
+    PackageMetaData,
+    PackageOutdatedResult,
+    PackageSpec,
+    PackageType,
+)
 from qio.package.pack import PackagePacker
+from qio.package.store import PackageStore
+from qio.project.config import ProjectConfig
 
 
 def test_download(isolated_pio_core):
@@ -474,3 +489,225 @@ def test_update_without_metadata(isolated_pio_core, tmpdir_factory):
     new_pkg = lm.update(pkg, silent=True)
     assert len(lm.get_installed()) == 3
     assert new_pkg.metadata.spec.owner == "ottowinter"
+
+
+def test_package_store(isolated_pio_core, tmpdir_factory, monkeypatch):
+    # pylint: disable=too-many-locals
+    tmp_dir = tmpdir_factory.mktemp("tmp")
+    src_dir = tmp_dir.join("archive-src").mkdir()
+    src_dir.mkdir("src").join("main.cpp").write("#include <stdio.h>")
+    src_dir.join("library.json").write('{"name": "store-lib", "version": "1.0.0"}')
+    tarball_path = PackagePacker(str(src_dir)).pack(str(tmp_dir))
+    checksum = fs.calculate_file_hashsum("sha256", tarball_path)
+    httpd = HTTPServer(
+        ("127.0.0.1", 0),
+        functools.partial(SimpleHTTPRequestHandler, directory=str(tmp_dir)),
+    )
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d/%s" % (
+        httpd.server_port,
+        os.path.basename(tarball_path),
+    )
+    # the store is not used without reflinks, the files would be stored twice
+    lm0 = LibraryPackageManager(str(tmpdir_factory.mktemp("storage-0")))
+    monkeypatch.setattr(PackageStore, "is_reflink_supported", lambda *_: False)
+    lm0.install_from_uri(url, PackageSpec("store-lib"), checksum)
+    assert not lm0.get_store().load_tree(checksum)
+    # reflinks fall back to copies on this file system
+    monkeypatch.setattr(PackageStore, "is_reflink_supported", lambda *_: True)
+    lm1 = LibraryPackageManager(str(tmpdir_factory.mktemp("storage-1")))
+    lm2 = LibraryPackageManager(str(tmpdir_factory.mktemp("storage-2")))
+    pkg1 = lm1.install_from_uri(url, PackageSpec("store-lib"), checksum)
+    httpd.shutdown()
+    httpd.server_close()
+    # a known tree is installed without downloading
+    pkg2 = lm2.install_from_uri(url, PackageSpec("store-lib"), checksum)
+    main_path = os.path.join("src", "main.cpp")
+    assert Path(pkg2.path, main_path).read_text(encoding="utf8") == "#include <stdio.h>"
+    # package files do not share storage with the store objects
+    Path(pkg2.path, main_path).write_text("modified", encoding="utf8")
+    assert Path(pkg1.path, main_path).read_text(encoding="utf8") == "#include <stdio.h>"
+    store = lm1.get_store()
+    dst_dir = tmp_dir.join("materialized")
+    assert store.materialize_tree(checksum, str(dst_dir))
+    assert dst_dir.join("src", "main.cpp").read() == "#include <stdio.h>"
+    # a corrupted object is not reused and is repaired by the next installation
+    tree = store.load_tree(checksum)
+    assert ["library.json", "src/main.cpp"] == sorted(item[0] for item in tree["files"])
+    obj_path = next(
+        store.get_object_path(digest, executable)
+        for relpath, digest, executable, _ in tree["files"]
+        if relpath == "src/main.cpp"
+    )
+    os.chmod(obj_path, 0o644)
+    Path(obj_path).write_text("corrupted", encoding="utf8")
+    assert not store.materialize_tree(checksum, str(tmp_dir.join("corrupted")))
+    store.add_tree(pkg1.path, checksum)
+    assert store.materialize_tree(checksum, str(tmp_dir.join("repaired")))
+    # garbage collection keeps the trees of installed packages
+    store.GC_GRACE_PERIOD = 0
+    assert store.collect_garbage(dry_run=True) == 0
+    lm1.uninstall(pkg1)
+    assert store.collect_garbage() == 0
+    lm2.uninstall(pkg2)
+    assert store.collect_garbage() > 0
+    assert not store.materialize_tree(checksum, str(tmp_dir.join("missing")))
+
+
+def test_install_streaming_unpack(isolated_pio_core, tmpdir_factory, capsys):
+    tmp_dir = tmpdir_factory.mktemp("tmp")
+    src_dir = tmp_dir.join("archive-src").mkdir()
+    src_dir.mkdir("src").join("main.cpp").write("#include <stdio.h>")
+    src_dir.join("library.json").write('{"name": "stream-lib", "version": "1.0.0"}')
+    tarball_path = PackagePacker(str(src_dir)).pack(str(tmp_dir))
+    checksum = fs.calculate_file_hashsum("sha256", tarball_path)
+    httpd = HTTPServer(
+        ("127.0.0.1", 0),
+        functools.partial(SimpleHTTPRequestHandler, directory=str(tmp_dir)),
+    )
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d/%s" % (
+        httpd.server_port,
+        os.path.basename(tarball_path),
+    )
+    try:
+        lm = LibraryPackageManager(str(tmpdir_factory.mktemp("storage")))
+
+        # a checksum mismatch does not leave a partial package
+        bad_checksum = "0" * 64
+        assert lm.is_streaming_unpack_allowed(url, bad_checksum)
+        with pytest.raises(PackageException):
+            lm.install_from_uri(url, PackageSpec("stream-lib"), bad_checksum)
+        assert not lm.get_installed()
+        assert not os.listdir(lm.get_tmp_dir())
+        assert not [
+            name for name in os.listdir(lm.get_download_dir()) if name.endswith(".part")
+        ]
+
+        # a progress is reported by the read bytes
+        dst_dir = tmp_dir.join("unpacked")
+        assert lm.download_and_unpack(url, checksum, str(dst_dir), with_progress=True)
+        assert "Downloading & Unpacking" in capsys.readouterr().out
+        assert dst_dir.join("src", "main.cpp").read() == "#include <stdio.h>"
+        # the downloaded archive is cached
+        dl_path = lm.compute_download_path(url, checksum)
+        assert fs.calculate_file_hashsum("sha256", dl_path) == checksum
+        assert not lm.is_streaming_unpack_allowed(url, checksum)
+        os.remove(dl_path)
+
+        assert lm.is_streaming_unpack_allowed(url, checksum)
+        pkg = lm.install_from_uri(url, PackageSpec("stream-lib"), checksum)
+        assert pkg.metadata.name == "stream-lib"
+        assert Path(pkg.path, "src", "main.cpp").is_file()
+        assert os.path.isfile(dl_path)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_boards_index(isolated_pio_core, tmpdir_factory):
+    def _board_manifest(name, **kwargs):
+        return json.dumps(
+            dict(name=name, url="https://example.com", vendor="Test", **kwargs)
+        )
+
+    storage_dir = tmpdir_factory.mktemp("platforms")
+    platform_dir = storage_dir.mkdir("testplatform")
+    platform_dir.join("platform.json").write(
+        '{"name": "testplatform", "version": "1.0.0", "title": "Test"}'
+    )
+    platform_dir.join("platform.py").write(
+        """
+from qio.public import PlatformBase
+
+
+class TestplatformPlatform(PlatformBase):
+    def get_boards(self, id_=None):
+        result = super().get_boards(id_)
+        for config in [result] if id_ else result.values():
+            config.manifest["debug"] = {"tools": {"stub-probe": {}}}
+        return result
+"""
+    )
+    platform_dir.mkdir("boards").join("board_a.json").write(_board_manifest("Board A"))
+    project_dir = tmpdir_factory.mktemp("project")
+    project_dir.join("platformio.ini").write("[platformio]\nboards_dir = boards\n")
+    project_boards_dir = project_dir.mkdir("boards")
+    project_boards_dir.join("board_a.json").write(_board_manifest("Custom Board A"))
+    project_boards_dir.join("board_b.json").write(_board_manifest("Board B"))
+    project_boards_dir.join("board_c.json").write(
+        _board_manifest("Board C", platform="otherplatform")
+    )
+
+    pm = PlatformPackageManager(str(storage_dir))
+    with fs.cd(str(project_dir)):
+        pm.config = ProjectConfig(str(project_dir.join("platformio.ini")))
+        boards = {board["id"]: board for board in pm.get_installed_boards()}
+    # the project boards override the platform boards
+    assert sorted(boards) == ["board_a", "board_b"]
+    assert boards["board_a"]["name"] == "Custom Board A"
+    assert boards["board_b"]["platform"] == "testplatform"
+    # the platform customizations apply to the custom and indexed boards
+    assert all(
+        board["debug"] == {"tools": {"stub-probe": {}}} for board in boards.values()
+    )
+    # the shared index contains the platform's own boards only
+    index = json.loads(platform_dir.join(pm.BOARDS_INDEX_NAME).read())
+    assert [board["name"] for board in index["boards"]] == ["Board A"]
+    index_mtime = os.path.getmtime(str(platform_dir.join(pm.BOARDS_INDEX_NAME)))
+
+    # a project without custom boards does not rebuild the index
+    other_dir = tmpdir_factory.mktemp("other-project")
+    other_dir.join("platformio.ini").write("")
+    pm = PlatformPackageManager(str(storage_dir))
+    with fs.cd(str(other_dir)):
+        pm.config = ProjectConfig(str(other_dir.join("platformio.ini")))
+        boards = pm.get_installed_boards()
+    assert [board["name"] for board in boards] == ["Board A"]
+    assert boards[0]["debug"] == {"tools": {"stub-probe": {}}}
+    assert os.path.getmtime(str(platform_dir.join(pm.BOARDS_INDEX_NAME))) == index_mtime
+
+
+def test_check_outdated_packages_deduplication(tmpdir_factory):
+    class DummyPackageManager:
+        pkg_type = PackageType.LIBRARY
+        compatibility = None
+
+        def __init__(self):
+            self.checked = []
+
+        def outdated(self, pkg, spec=None):
+            self.checked.append((pkg.path, spec))
+            return PackageOutdatedResult(
+                current=pkg.metadata.version, latest="2.0.0", wanted=spec and "1.5.0"
+            )
+
+    def _new_pkg(storage_dir, version="1.0.0"):
+        spec = PackageSpec("owner/foo")
+        return PackageItem(
+            os.path.join(storage_dir, "foo"),
+            PackageMetaData(PackageType.LIBRARY, "foo", version, spec),
+        )
+
+    pm1 = DummyPackageManager()
+    pm2 = DummyPackageManager()
+    storage_1 = str(tmpdir_factory.mktemp("storage-1"))
+    storage_2 = str(tmpdir_factory.mktemp("storage-2"))
+    items = [
+        (pm1, _new_pkg(storage_1), None),
+        # the same package in another project
+        (pm2, _new_pkg(storage_2), None),
+        (pm2, _new_pkg(storage_2), "^1.0.0"),
+        (pm2, _new_pkg(storage_2, "1.1.0"), None),
+    ]
+    checked_numbers = []
+    results = check_outdated_packages(items, on_checked=checked_numbers.append)
+    assert len(pm1.checked) + len(pm2.checked) == 3
+    assert sum(checked_numbers) == len(items)
+    assert [str(r.current) for r in results] == ["1.0.0", "1.0.0", "1.0.0", "1.1.0"]
+    assert [str(r.wanted) if r.wanted else None for r in results] == [
+        None,
+        None,
+        "1.5.0",
+        None,
+    ]
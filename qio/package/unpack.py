@@ -56,11 +56,18 @@ class BaseArchiver:
 
 
 class TARArchiver(BaseArchiver):
-    def __init__(self, archpath):
-        super().__init__(tarfile_open(archpath))  # pylint: disable=consider-using-with
+    def __init__(self, archpath=None, fileobj=None):
+        # pylint: disable=consider-using-with
+        super().__init__(
+            tarfile_open(fileobj=fileobj, mode="r|*")
+            if fileobj
+            else tarfile_open(archpath)
+        )
+        self._streaming = fileobj is not None
 
     def get_items(self):
-        return self._afo.getmembers()
+        # a stream is read member by member while iterating
+        return self._afo if self._streaming else self._afo.getmembers()
 
     def get_item_filename(self, item):
         return item.name
@@ -130,12 +137,19 @@ class ZIPArchiver(BaseArchiver):
 
 
 class FileUnpacker:
-    def __init__(self, path):
+    def __init__(self, path=None, fileobj=None):
+        """Use `fileobj` to unpack a TAR stream (gz, bz2, xz) on the fly"""
+        assert path or fileobj
         self.path = path
+        self.fileobj = fileobj
         self._archiver = None
 
     def __enter__(self):
-        self._archiver = self.new_archiver(self.path)
+        self._archiver = (
+            TARArchiver(fileobj=self.fileobj)
+            if self.fileobj
+            else self.new_archiver(self.path)
+        )
         return self
 
     def __exit__(self, *args):
@@ -163,7 +177,7 @@ class FileUnpacker:
         assert self._archiver
         if not dest_dir:
             dest_dir = os.getcwd()
-        if not with_progress or silent:
+        if not with_progress or silent or self.fileobj:
             if not silent:
                 click.echo("Unpacking...")
             for item in self._archiver.get_items():
@@ -70,9 +70,16 @@ class PlatformPackagesMixin:
         return self.pm.install(spec or self.get_package_spec(name), force=force)
 
     def install_required_packages(self, force=False):
-        for name, options in self.packages.items():
-            if options.get("optional"):
-                continue
+        names = [
+            name
+            for name, options in self.packages.items()
+            if not options.get("optional")
+        ]
+        if not force:
+            self.pm.prefetch_registry_packages(
+                [self.get_package_spec(name) for name in names]
+            )
+        for name in names:
             self.install_package(name, force=force)
 
     def uninstall_packages(self):
@@ -24,12 +24,16 @@ import click
 from qio import app, fs, proc, telemetry
 from qio.compat import hashlib_encode_data
 from qio.package.manager.core import get_core_package_dir
-from qio.platform.exception import BuildScriptNotFound
+from qio.package.meta import PackageItem, PackageMetaData
+from qio.platform.board import PlatformBoardConfig
+from qio.platform.exception import BuildScriptNotFound, UnknownBoard
+from qio.project.options import ProjectOptions
 
 
 class PlatformRunMixin:
 
     LINE_ERROR_RE = re.compile(r"(^|\s+)error:?\s+", re.I)
+    PROJECT_SNAPSHOT_VERSION = 1
 
     @staticmethod
     def encode_scons_arg(value):
@@ -67,6 +71,10 @@ class PlatformRunMixin:
         if not os.path.isfile(variables["build_script"]):
             raise BuildScriptNotFound(variables["build_script"])
 
+        snapshot_path = self.dump_project_snapshot(variables["pioenv"])
+        if snapshot_path:
+            variables["project_snapshot"] = snapshot_path
+
         result = self._run_scons(variables, targets, jobs)
         assert "returncode" in result
 
@@ -81,6 +89,96 @@ class PlatformRunMixin:
         options["platform"] = {"name": self.name, "version": self.version}
         telemetry.send_run_environment(options, targets)
 
+    def dump_project_snapshot(self, env):
+        """Save the resolved project options, the board manifest and the
+        installed packages to the build dir of the ``env``, a build process
+        restores them instead of parsing the configuration files again"""
+        # resolve the options that are read on start-up of a build process
+        for option in ProjectOptions.values():
+            if option.scope == "platformio":
+                self.config.get("platformio", option.name)
+        self.config.items(env=env)
+
+        boards = {}
+        board = self.config.get("env:" + env, "board", None)
+        if board:
+            try:
+                board_config = self.board_config(board)
+                boards[board] = [
+                    board_config.manifest_path,
+                    os.path.getmtime(board_config.manifest_path),
+                    board_config.manifest,
+                ]
+            except UnknownBoard:
+                pass
+
+        packages_dir = self.pm.package_dir
+        data = dict(
+            version=self.PROJECT_SNAPSHOT_VERSION,
+            config=self.config.to_snapshot(),
+            boards=boards,
+            packages=dict(
+                dir=packages_dir,
+                mtime=os.path.getmtime(packages_dir)
+                if os.path.isdir(packages_dir)
+                else 0,
+                items=[
+                    [pkg.path, pkg.metadata.as_dict()]
+                    for pkg in self.pm.get_installed()
+                ],
+            ),
+        )
+
+        path = os.path.join(
+            self.config.get("platformio", "build_dir"), env, "project.snapshot.json"
+        )
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, mode="w", encoding="utf8") as fp:
+                json.dump(data, fp)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+            return None
+        return path
+
+    @classmethod
+    def load_project_snapshot(cls, path):
+        try:
+            data = fs.load_json(path)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != cls.PROJECT_SNAPSHOT_VERSION:
+            return None
+        return data
+
+    def apply_project_snapshot(self, data):
+        """Pre-fill the board and the installed packages caches using the
+        snapshot items that are still up-to-date"""
+        for board, (manifest_path, mtime, manifest) in data["boards"].items():
+            if (
+                os.path.isfile(manifest_path)
+                and os.path.getmtime(manifest_path) == mtime
+            ):
+                self._BOARDS_CACHE[board] = PlatformBoardConfig(manifest_path, manifest)
+
+        packages = data["packages"]
+        if packages["dir"] != self.pm.package_dir or not os.path.isdir(packages["dir"]):
+            return
+        if os.path.getmtime(packages["dir"]) != packages["mtime"] or not all(
+            os.path.isdir(path) for path, _ in packages["items"]
+        ):
+            return
+        self.pm.memcache_set(
+            "get_installed",
+            [
+                PackageItem(path, PackageMetaData.from_dict(metadata))
+                for path, metadata in packages["items"]
+            ],
+        )
+
     def _run_scons(self, variables, targets, jobs):
         scons_dir = get_core_package_dir("tool-scons")
         args = [
@@ -41,6 +41,8 @@ class PlatformBase(  # pylint: disable=too-many-instance-attributes,too-many-pub
         self._manifest = fs.load_json(manifest_path)
         self._BOARDS_CACHE = {}
         self._custom_packages = None
+        # the project and core boards dirs are skipped by the boards index
+        self.with_custom_boards = True
 
         self.config = ProjectConfig.get_instance()
         self.pm = ToolPackageManager(self.config.get("platformio", "packages_dir"))
@@ -133,18 +135,17 @@ class PlatformBase(  # pylint: disable=too-many-instance-attributes,too-many-pub
     def get_boards(self, id_=None):
         def _append_board(board_id, manifest_path):
             config = PlatformBoardConfig(manifest_path)
-            if "platform" in config and config.get("platform") != self.name:
-                return
-            if "platforms" in config and self.name not in config.get("platforms"):
+            if not config.is_compatible(self.name):
                 return
             config.manifest["platform"] = self.name
             self._BOARDS_CACHE[board_id] = config
 
-        bdirs = [
-            self.config.get("platformio", "boards_dir"),
-            os.path.join(self.config.get("platformio", "core_dir"), "boards"),
-            os.path.join(self.get_dir(), "boards"),
-        ]
+        bdirs = [os.path.join(self.get_dir(), "boards")]
+        if self.with_custom_boards:
+            bdirs = [
+                self.config.get("platformio", "boards_dir"),
+                os.path.join(self.config.get("platformio", "core_dir"), "boards"),
+            ] + bdirs
 
         if id_ is None:
             for boards_dir in bdirs:
@@ -22,12 +22,12 @@ from qio.platform.exception import InvalidBoardManifest
 
 
 class PlatformBoardConfig:
-    def __init__(self, manifest_path):
+    def __init__(self, manifest_path, manifest=None):
         self._id = os.path.basename(manifest_path)[:-5]
         assert os.path.isfile(manifest_path)
         self.manifest_path = manifest_path
         try:
-            self._manifest = fs.load_json(manifest_path)
+            self._manifest = manifest or fs.load_json(manifest_path)
         except ValueError as exc:
             raise InvalidBoardManifest(manifest_path) from exc
         if not set(["name", "url", "vendor"]) <= set(self._manifest):
@@ -74,6 +74,13 @@ class PlatformBoardConfig:
     def manifest(self):
         return self._manifest
 
+    def is_compatible(self, platform_name):
+        if "platform" in self and self.get("platform") != platform_name:
+            return False
+        if "platforms" in self and platform_name not in self.get("platforms"):
+            return False
+        return True
+
     def get_brief_data(self):
         result = {
             "id": self.id,
@@ -140,6 +140,39 @@ def exec_command(*args, **kwargs):
     return result
 
 
+def start_detached_process(args):
+    """Start a process which outlives the current one, do not wait for it"""
+    kwargs = {}
+    if IS_WINDOWS:
+        kwargs["creationflags"] = getattr(subprocess, "DETACHED_PROCESS", 0) | getattr(
+            subprocess, "CREATE_NEW_PROCESS_GROUP", 0
+        )
+    else:
+        # a double fork, an intermediate shell starts the process in background
+        # and exits at once, the process is reparented and does not become
+        # a zombie of the current one
+        args = ["/bin/sh", "-c", '"$@" &', "sh"] + list(args)
+        kwargs["start_new_session"] = True
+    try:
+        # pylint: disable=consider-using-with
+        p = subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            **kwargs,
+        )
+    except OSError:
+        return False
+    if IS_WINDOWS:
+        # a finished process is not reaped on Windows, do not wait for it
+        p.returncode = 0
+    else:
+        p.wait()
+    return True
+
+
 @contextmanager
 def capture_std_streams(stdout, stderr=None):
     _stdout = sys.stdout
@@ -44,6 +44,8 @@ class ProjectConfigBase:
     VARTPL_RE = re.compile(r"\$\{([^\.\}\()]+)\.([^\}]+)\}")
 
     CUSTOM_OPTION_PREFIXES = ("custom_", "board_")
+    # the parser methods which drop the resolved values of a section
+    PARSER_MODIFIERS = ("add_section", "remove_section", "remove_option")
 
     expand_interpolations = True
     warnings = []
@@ -82,6 +84,9 @@ class ProjectConfigBase:
         self.expand_interpolations = expand_interpolations
         self.warnings = []
         self._parsed = []
+        # {key: (value, {section}, {envvar: value})}, see `_resolve()`
+        self._cache = {}
+        self._tracking = []
         self._parser = configparser.ConfigParser(inline_comment_prefixes=("#", ";"))
         if path and os.path.isfile(path):
             self.read(path, parse_extra)
@@ -89,7 +94,16 @@ class ProjectConfigBase:
         self._maintain_renaimed_options()
 
     def __getattr__(self, name):
-        return getattr(self._parser, name)
+        attr = getattr(self._parser, name)
+        if name not in self.PARSER_MODIFIERS:
+            return attr
+
+        def _modify(section, *args, **kwargs):
+            result = attr(section, *args, **kwargs)
+            self._invalidate(section)
+            return result
+
+        return _modify
 
     def read(self, path, parse_extra=True):
         if path in self._parsed:
@@ -99,6 +113,8 @@ class ProjectConfigBase:
             self._parser.read(path, "utf-8")
         except configparser.Error as exc:
             raise exception.InvalidProjectConfError(path, str(exc))
+        finally:
+            self._invalidate()
 
         if not parse_extra:
             return
@@ -154,6 +170,45 @@ class ProjectConfigBase:
     def get_section_scope(section):
         return section.split(":", 1)[0] if ":" in section else section
 
+    def _invalidate(self, section=None):
+        """Drop the resolved values that depend on the ``section``"""
+        if not section:
+            self._cache.clear()
+            return
+        for key in [key for key, item in self._cache.items() if section in item[1]]:
+            del self._cache[key]
+
+    def _resolve(self, key, func, *args):
+        """Memoize a resolved value along with the sections and the environment
+        variables it was resolved from, a nested resolution passes them to the
+        outer one, so a value is invalidated by a change in any of them."""
+        item = self._cache.get(key) if key else None
+        if not item or any(
+            os.environ.get(name) != value for name, value in item[2].items()
+        ):
+            self._tracking.append((set(), {}))
+            try:
+                value = func(*args)
+            finally:
+                sections, envvars = self._tracking.pop()
+            item = (value, sections, envvars)
+            if key:
+                self._cache[key] = item
+        if self._tracking:
+            self._tracking[-1][0].update(item[1])
+            self._tracking[-1][1].update(item[2])
+        return item[0]
+
+    def _track_section(self, section):
+        if self._tracking:
+            self._tracking[-1][0].add(section)
+
+    def _getenv(self, name):
+        value = os.environ.get(name)
+        if self._tracking:
+            self._tracking[-1][1][name] = value
+        return value
+
     def walk_options(self, root_section):
         extends_queue = (
             ["env", root_section] if root_section.startswith("env:") else [root_section]
@@ -162,6 +217,7 @@ class ProjectConfigBase:
         while extends_queue:
             section = extends_queue.pop()
             extends_done.append(section)
+            self._track_section(section)
             if not self._parser.has_section(section):
                 continue
             for option in self._parser.options(section):
@@ -172,14 +228,23 @@ class ProjectConfigBase:
                 )
 
     def options(self, section=None, env=None):
-        result = []
         assert section or env
         if not section:
             section = "env:" + env
+        return list(
+            self._resolve(
+                ("options", section, self.expand_interpolations),
+                self._options,
+                section,
+            )
+        )
 
+    def _options(self, section):
+        self._track_section(section)
         if not self.expand_interpolations:
             return self._parser.options(section)
 
+        result = []
         for _, option in self.walk_options(section):
             if option not in result:
                 result.append(option)
@@ -189,7 +254,10 @@ class ProjectConfigBase:
         for option_meta in ProjectOptions.values():
             if option_meta.scope != scope or option_meta.name in result:
                 continue
-            if option_meta.sysenvvar and option_meta.sysenvvar in os.environ:
+            if (
+                option_meta.sysenvvar
+                and self._getenv(option_meta.sysenvvar) is not None
+            ):
                 result.append(option_meta.name)
 
         return result
@@ -222,6 +290,7 @@ class ProjectConfigBase:
         if "\n" in value and not value.startswith("\n"):
             value = "\n" + value
         self._parser.set(section, option, value)
+        self._invalidate(section)
 
     def resolve_renamed_option(self, section, old_name):
         scope = self.get_section_scope(section)
@@ -264,6 +333,7 @@ class ProjectConfigBase:
         self, section, option, default=MISSING
     ):  # pylint: disable=too-many-branches
         if not self.expand_interpolations:
+            self._track_section(section)
             return self._parser.get(section, option)
 
         option_meta = self.find_option_meta(section, option)
@@ -277,10 +347,10 @@ class ProjectConfigBase:
             return self._expand_interpolations(section, value)
 
         if option_meta.sysenvvar:
-            envvar_value = os.getenv(option_meta.sysenvvar)
+            envvar_value = self._getenv(option_meta.sysenvvar)
             if not envvar_value and option_meta.oldnames:
                 for oldoption in option_meta.oldnames:
-                    envvar_value = os.getenv("PLATFORMIO_" + oldoption.upper())
+                    envvar_value = self._getenv("PLATFORMIO_" + oldoption.upper())
                     if envvar_value:
                         break
             if envvar_value and option_meta.multiple:
@@ -314,7 +384,7 @@ class ProjectConfigBase:
         section, option = match.group(1), match.group(2)
         # handle system environment variables
         if section == "sysenv":
-            return os.getenv(option)
+            return self._getenv(option)
         # handle ${this.*}
         if section == "this":
             section = parent_section
@@ -339,6 +409,16 @@ class ProjectConfigBase:
         return str(value)
 
     def get(self, section, option, default=MISSING):
+        # relative paths of the dir options are resolved against a current dir
+        key = ("get", section, option, default, self.expand_interpolations, os.getcwd())
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+        value = self._resolve(key, self._get, section, option, default)
+        return list(value) if isinstance(value, list) else value
+
+    def _get(self, section, option, default=MISSING):
         value = None
         try:
             value = self.getraw(section, option, default)
@@ -436,10 +516,65 @@ class ProjectConfig(ProjectConfigBase, ProjectConfigDirsMixin):
     def to_json(self):
         return json.dumps(self.as_tuple())
 
+    def to_snapshot(self):
+        """Dump the parsed sections and the values resolved so far, a build
+        process restores them using `from_snapshot()` instead of parsing"""
+        cwd = os.getcwd()
+        resolved = [
+            [key[1], key[2], value, sorted(sections), envvars]
+            for key, (value, sections, envvars) in self._cache.items()
+            if key[0] == "get" and key[3] == MISSING and key[4] and key[5] == cwd
+        ]
+        return dict(
+            path=self.path,
+            cwd=cwd,
+            sources={
+                path: os.path.getmtime(path)
+                for path in self._parsed
+                if os.path.isfile(path)
+            },
+            sections=[
+                (section, self._parser.items(section, raw=True))
+                for section in self._parser.sections()
+            ],
+            warnings=self.warnings,
+            resolved=resolved,
+        )
+
+    @classmethod
+    def from_snapshot(cls, data, register=False):
+        """Returns None if any of the parsed configuration files was modified.
+
+        A ``register``-ed config is shared via `get_instance()` while its file
+        is unchanged.
+        """
+        for path, mtime in data["sources"].items():
+            if not os.path.isfile(path) or os.path.getmtime(path) != mtime:
+                return None
+        config = cls(path="")
+        config.path = data["path"]
+        config.warnings = list(data["warnings"])
+        config._parsed = list(data["sources"])
+        config._parser.read_dict(
+            {section: dict(items) for section, items in data["sections"]}
+        )
+        if data["cwd"] == os.getcwd():
+            for section, option, value, sections, envvars in data["resolved"]:
+                config._cache[("get", section, option, MISSING, True, data["cwd"])] = (
+                    value,
+                    set(sections),
+                    envvars,
+                )
+        if register:
+            mtime = os.path.getmtime(config.path) if os.path.isfile(config.path) else 0
+            ProjectConfig._instances[config.path] = {"mtime": mtime, "config": config}
+        return config
+
     def update(self, data, clear=False):
         assert isinstance(data, list)
         if clear:
             self._parser = configparser.ConfigParser()
+            self._invalidate()
         for section, options in data:
             if not self._parser.has_section(section):
                 self._parser.add_section(section)
@@ -14,6 +14,7 @@
 
 import os
 import subprocess
+import time
 from hashlib import sha1
 
 from click.testing import CliRunner
@@ -89,15 +90,32 @@ def get_default_projects_dir():
     return os.path.join(docs_dir, "PlatformIO", "Projects")
 
 
-def compute_project_checksum(config):
+PROJECT_CHECKSUM_SUFFIXES = (".c", ".cc", ".cpp", ".h", ".hpp", ".s", ".S")
+# a directory modified within this period may still get new entries with the
+# same mtime on file systems with a coarse timestamp resolution
+PROJECT_MANIFEST_RACY_PERIOD = 2  # in seconds
+
+
+def compute_project_checksum(config, manifest=None):
+    """Compute a checksum of the project configuration and file structure.
+
+    ``manifest`` is a state from the previous call (a dict, updated in place).
+    It keeps the mtime and the entries of every scanned directory, so only
+    the directories that have been modified since are scanned again.
+    """
+    if manifest is None:
+        manifest = {}
+    prev_dirs = manifest.get("dirs") or {}
+    dirs = {}
+
     # rebuild when PIO Core version changes
     checksum = sha1(hashlib_encode_data(__version__))
 
     # configuration file state
-    checksum.update(hashlib_encode_data(config.to_json()))
+    config_data = hashlib_encode_data(config.to_json())
+    checksum.update(config_data)
 
     # project file structure
-    check_suffixes = (".c", ".cc", ".cpp", ".h", ".hpp", ".s", ".S")
     for d in (
         config.get("platformio", "include_dir"),
         config.get("platformio", "src_dir"),
@@ -105,12 +123,7 @@ def compute_project_checksum(config):
     ):
         if not os.path.isdir(d):
             continue
-        chunks = []
-        for root, _, files in os.walk(d):
-            for f in files:
-                path = os.path.join(root, f)
-                if path.endswith(check_suffixes):
-                    chunks.append(path)
+        chunks = _scan_project_structure(d, prev_dirs, dirs)
         if not chunks:
             continue
         chunks_to_str = ",".join(sorted(chunks))
@@ -118,9 +131,67 @@ def compute_project_checksum(config):
             chunks_to_str = chunks_to_str.lower()
         checksum.update(hashlib_encode_data(chunks_to_str))
 
+    manifest.clear()
+    manifest.update(
+        version=__version__, config=sha1(config_data).hexdigest(), dirs=dirs
+    )
     return checksum.hexdigest()
 
 
+def _scan_project_structure(root, prev_dirs, dirs):
+    result = []
+    scan_time = time.time()
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        state = [st.st_mtime, st.st_ino]
+        item = prev_dirs.get(path)
+        if not item or item[0] != state:
+            item = _scan_project_dir(path)
+            if item is None:
+                continue
+            if scan_time - st.st_mtime < PROJECT_MANIFEST_RACY_PERIOD:
+                state = None  # do not trust, scan again the next time
+            item = [state] + item
+        dirs[path] = item
+        result.extend(os.path.join(path, name) for name in item[1])
+        stack.extend(os.path.join(path, name) for name in item[2])
+    return result
+
+
+def _scan_project_dir(path):
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    if entry.name.endswith(PROJECT_CHECKSUM_SUFFIXES):
+                        files.append(entry.name)
+                # the same as "os.walk", do not follow symbolic links
+                elif not entry.is_symlink():
+                    subdirs.append(entry.name)
+    except OSError:
+        return None
+    return [sorted(files), sorted(subdirs)]
+
+
+def get_project_manifest_files(manifest):
+    return set(
+        os.path.join(path, name)
+        for path, item in (manifest.get("dirs") or {}).items()
+        for name in item[1]
+    )
+
+
 def load_build_metadata(project_dir, env_or_envs, cache=False, debug=False):
     assert env_or_envs
     env_names = env_or_envs
@@ -215,6 +215,18 @@ ProjectOptions = OrderedDict(
                 default=os.path.join("${platformio.core_dir}", ".cache"),
                 validate=validate_dir,
             ),
+            ConfigPlatformioOption(
+                group="directory",
+                name="store_dir",
+                description=(
+                    "A location of the content-addressed storage where PlatformIO "
+                    "Core keeps a single copy of the files of installed packages "
+                    "and shares them between package folders and core folders"
+                ),
+                sysenvvar="PLATFORMIO_STORE_DIR",
+                default=os.path.join("${platformio.core_dir}", ".store"),
+                validate=validate_dir,
+            ),
             ConfigPlatformioOption(
                 group="directory",
                 name="build_cache_dir",
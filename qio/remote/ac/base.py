@@ -15,15 +15,20 @@
 from twisted.internet import defer  # pylint: disable=import-error
 from twisted.spread import pb  # pylint: disable=import-error
 
+from qio.remote.ringbuffer import RingBuffer
+
 
 class AsyncCommandBase:
 
     MAX_BUFFER_SIZE = 1024 * 1024  # 1Mb
+    # the data collected while the previous `acread` was in flight is sent by
+    # a single response, limited by the max string size of a PB transport
+    MAX_READ_SIZE = 512 * 1024  # 512Kb
 
     def __init__(self, options=None, on_end_callback=None):
         self.options = options or {}
         self.on_end_callback = on_end_callback
-        self._buffer = b""
+        self._buffer = RingBuffer(self.MAX_BUFFER_SIZE)
         self._return_code = None
         self._d = None
         self._paused = False
@@ -37,6 +42,10 @@ class AsyncCommandBase:
     def id(self):
         return id(self)
 
+    @property
+    def dropped_size(self):
+        return self._buffer.dropped_size
+
     def pause(self):
         self._paused = True
         self.stop()
@@ -58,25 +67,20 @@ class AsyncCommandBase:
             self._d = None
             return
         if self._buffer:
-            self._d.callback(self._buffer)
+            self._d.callback(self._buffer.read(self.MAX_READ_SIZE))
         else:
             self._d.callback(None)
 
     def _ac_ondata(self, data):
-        self._buffer += data
-        if len(self._buffer) > self.MAX_BUFFER_SIZE:
-            self._buffer = self._buffer[-1 * self.MAX_BUFFER_SIZE :]
+        self._buffer.write(data)
         if self._paused:
             return
         if self._d and not self._d.called:
-            self._d.callback(self._buffer)
-            self._buffer = b""
+            self._d.callback(self._buffer.read(self.MAX_READ_SIZE))
 
     def ac_read(self):
         if self._buffer:
-            result = self._buffer
-            self._buffer = b""
-            return result
+            return self._buffer.read(self.MAX_READ_SIZE)
         if self._return_code is None:
             self._d = defer.Deferred()
             return self._d
@@ -14,8 +14,8 @@
 
 import json
 import os
+import tempfile
 import zlib
-from io import BytesIO
 
 from qio.remote.ac.base import AsyncCommandBase
 from qio.remote.projectsync import PROJECT_SYNC_STAGE, ProjectSync
@@ -31,36 +31,64 @@ class ProjectSyncAsyncCmd(AsyncCommandBase):
         project_dir = os.path.join(
             self.options["agent_working_dir"], "projects", self.options["id"]
         )
-        self.psync = ProjectSync(project_dir)
+        self.psync = ProjectSync(
+            project_dir, index_path=os.path.join(project_dir, ".psync.json")
+        )
         for name in self.options["items"]:
             self.psync.add_item(os.path.join(project_dir, name), name)
 
     def stop(self):
         self.psync = None
+        if self._upstream:
+            self._upstream.close()
         self._upstream = None
         self._return_code = PROJECT_SYNC_STAGE.COMPLETED.value
 
     def ac_write(self, data):
         stage = PROJECT_SYNC_STAGE.lookupByValue(data.get("stage"))
+        handler = {
+            PROJECT_SYNC_STAGE.DBINDEX: self._on_dbindex,
+            PROJECT_SYNC_STAGE.DELETE: self._on_delete,
+            PROJECT_SYNC_STAGE.PATCH: self._on_patch,
+            PROJECT_SYNC_STAGE.UPLOAD: self._on_upload,
+        }.get(stage)
+        return handler(data) if handler else None
 
-        if stage is PROJECT_SYNC_STAGE.DBINDEX:
-            self.psync.rebuild_dbindex()
+    def _on_dbindex(self, data):
+        self.psync.rebuild_dbindex()
+        # the clients without a delta synchronization support
+        if data.get("version", 1) < ProjectSync.PROTOCOL_VERSION:
             return zlib.compress(json.dumps(self.psync.get_dbindex()).encode())
+        return zlib.compress(
+            json.dumps(
+                dict(
+                    version=ProjectSync.PROTOCOL_VERSION,
+                    files=self.psync.get_files_index(),
+                )
+            ).encode()
+        )
 
-        if stage is PROJECT_SYNC_STAGE.DELETE:
-            return self.psync.delete_dbindex(
-                json.loads(zlib.decompress(data["dbindex"]))
-            )
+    def _on_delete(self, data):
+        if "files" in data:
+            return self.psync.delete_files(json.loads(zlib.decompress(data["files"])))
+        return self.psync.delete_dbindex(json.loads(zlib.decompress(data["dbindex"])))
 
-        if stage is PROJECT_SYNC_STAGE.UPLOAD:
-            if not self._upstream:
-                self._upstream = BytesIO()
-            self._upstream.write(data["chunk"])
-            if self._upstream.tell() == data["total"]:
-                self.psync.decompress_items(self._upstream)
-                self._upstream = None
-                return PROJECT_SYNC_STAGE.EXTRACTED.value
+    def _on_patch(self, data):
+        missed_chunks = self.psync.prepare_patch(
+            json.loads(zlib.decompress(data["recipes"]))
+        )
+        return zlib.compress(json.dumps(missed_chunks).encode())
 
+    def _on_upload(self, data):
+        if not self._upstream:
+            self._upstream = tempfile.TemporaryFile()
+        self._upstream.write(data["chunk"])
+        if self._upstream.tell() != data["total"]:
             return PROJECT_SYNC_STAGE.UPLOAD.value
-
-        return None
+        if self.psync.has_pending_patch():
+            self.psync.apply_patch(self._upstream)
+        else:
+            self.psync.decompress_items(self._upstream)
+        self._upstream.close()
+        self._upstream = None
+        return PROJECT_SYNC_STAGE.EXTRACTED.value
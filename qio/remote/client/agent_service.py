@@ -68,7 +68,13 @@ class RemoteAgentService(RemoteClientBase):
         self.log.debug("Async Close: {id}", id=ac_id)
         if ac_id not in self._acs:
             raise pb.Error("Invalid Async Identifier")
-        return_code = self._acs[ac_id].ac_close()
+        ac = self._acs[ac_id]
+        return_code = ac.ac_close()
+        if ac.dropped_size:
+            self.log.warn(
+                "Async Command: output overflow, {size} bytes are dropped",
+                size=ac.dropped_size,
+            )
         del self._acs[ac_id]
         return return_code
 
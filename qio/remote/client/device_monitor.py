@@ -20,6 +20,7 @@ from twisted.internet import protocol, reactor, task  # pylint: disable=import-e
 from twisted.spread import pb  # pylint: disable=import-error
 
 from qio.remote.client.base import RemoteClientBase
+from qio.remote.ringbuffer import RingBuffer
 
 
 class SMBridgeProtocol(protocol.Protocol):
@@ -73,6 +74,7 @@ class DeviceMonitorClient(  # pylint: disable=too-many-instance-attributes
 ):
 
     MAX_BUFFER_SIZE = 1024 * 1024
+    MAX_WRITE_SIZE = 512 * 1024
 
     def __init__(self, agents, **kwargs):
         RemoteClientBase.__init__(self)
@@ -84,7 +86,7 @@ class DeviceMonitorClient(  # pylint: disable=too-many-instance-attributes
         self._ac_id = None
         self._d_acread = None
         self._d_acwrite = None
-        self._acwrite_buffer = b""
+        self._acwrite_buffer = RingBuffer(self.MAX_BUFFER_SIZE)
 
     def agent_pool_ready(self):
         d = task.deferLater(
@@ -219,18 +221,24 @@ class DeviceMonitorClient(  # pylint: disable=too-many-instance-attributes
             self._d_acwrite.cancel()
             self._d_acwrite = None
 
-        self._acwrite_buffer += data
-        if len(self._acwrite_buffer) > self.MAX_BUFFER_SIZE:
-            self._acwrite_buffer = self._acwrite_buffer[-1 * self.MAX_BUFFER_SIZE :]
+        dropped_size = self._acwrite_buffer.dropped_size
+        self._acwrite_buffer.write(data)
+        if self._acwrite_buffer.dropped_size > dropped_size:
+            self.log.warn(
+                "Device Monitor: input overflow, {size} bytes are dropped",
+                size=self._acwrite_buffer.dropped_size - dropped_size,
+            )
         if (self._d_acwrite and not self._d_acwrite.called) or not self._acwrite_buffer:
             return
 
-        data = self._acwrite_buffer
-        self._acwrite_buffer = b""
+        # a PB string is limited, the rest is sent when this write is done
+        data = self._acwrite_buffer.read(self.MAX_WRITE_SIZE)
         try:
-            d = self.agentpool.callRemote("acwrite", self._agent_id, self._ac_id, data)
-            d.addCallback(self.cb_acwrite_result)
-            d.addErrback(self.cb_global_error)
+            self._d_acwrite = self.agentpool.callRemote(
+                "acwrite", self._agent_id, self._ac_id, data
+            )
+            self._d_acwrite.addCallback(self.cb_acwrite_result)
+            self._d_acwrite.addErrback(self.cb_global_error)
         except (AttributeError, pb.DeadReferenceError):
             self.disconnect(exit_code=1)
 
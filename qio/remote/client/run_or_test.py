@@ -15,6 +15,7 @@
 import hashlib
 import json
 import os
+import tempfile
 import zlib
 from io import BytesIO
 
@@ -68,6 +69,9 @@ class RunOrTestClient(AsyncClientBase):
             cfg = ProjectConfig.get_instance(
                 os.path.join(self.options["project_dir"], "platformio.ini")
             )
+            psync.index_path = os.path.join(
+                cfg.get("platformio", "workspace_dir"), "remote", "psync.json"
+            )
             psync.add_item(cfg.path, "platformio.ini")
             psync.add_item(cfg.get("platformio", "shared_dir"), "shared")
             psync.add_item(cfg.get("platformio", "boards_dir"), "boards")
@@ -156,7 +160,10 @@ class RunOrTestClient(AsyncClientBase):
                     "acwrite",
                     agent_id,
                     ac_id,
-                    dict(stage=PROJECT_SYNC_STAGE.DBINDEX.value),
+                    dict(
+                        stage=PROJECT_SYNC_STAGE.DBINDEX.value,
+                        version=ProjectSync.PROTOCOL_VERSION,
+                    ),
                 )
                 d.addCallback(self.cb_psync_dbindex_result, agent_id, ac_id)
                 d.addErrback(self.cb_global_error)
@@ -164,7 +171,12 @@ class RunOrTestClient(AsyncClientBase):
                 self.disconnect(exit_code=1)
 
     def cb_psync_dbindex_result(self, result, agent_id, ac_id):
-        result = set(json.loads(zlib.decompress(result)))
+        result = json.loads(zlib.decompress(result))
+        if isinstance(result, dict):
+            return self.psync_delta(agent_id, ac_id, result["files"])
+
+        # legacy agent, re-upload modified files as a whole
+        result = set(result)
         dbindex = set(self.psync.get_dbindex())
         delete = list(result - dbindex)
         delta = list(dbindex - result)
@@ -202,6 +214,76 @@ class RunOrTestClient(AsyncClientBase):
         assert result
         self.psync_upload(agent_id, ac_id, dbindex)
 
+    def psync_delta(self, agent_id, ac_id, remote_files):
+        delete, changed = self.psync.get_delta(remote_files)
+
+        self.log.debug(
+            "PSync: delta stats, total={total}, delete={delete}, changed={changed}",
+            total=len(self.psync.get_files_index()),
+            delete=len(delete),
+            changed=len(changed),
+        )
+
+        if not delete and not changed:
+            return self.psync_finalize(agent_id, ac_id)
+        if not delete:
+            return self.psync_patch(agent_id, ac_id, changed)
+
+        try:
+            d = self.agentpool.callRemote(
+                "acwrite",
+                agent_id,
+                ac_id,
+                dict(
+                    stage=PROJECT_SYNC_STAGE.DELETE.value,
+                    files=zlib.compress(json.dumps(delete).encode()),
+                ),
+            )
+            d.addCallback(self.cb_psync_delete_files_result, agent_id, ac_id, changed)
+            d.addErrback(self.cb_global_error)
+        except (AttributeError, pb.DeadReferenceError):
+            self.disconnect(exit_code=1)
+
+        return None
+
+    def cb_psync_delete_files_result(self, result, agent_id, ac_id, changed):
+        assert result
+        if changed:
+            self.psync_patch(agent_id, ac_id, changed)
+        else:
+            self.psync_finalize(agent_id, ac_id)
+
+    def psync_patch(self, agent_id, ac_id, changed):
+        try:
+            d = self.agentpool.callRemote(
+                "acwrite",
+                agent_id,
+                ac_id,
+                dict(
+                    stage=PROJECT_SYNC_STAGE.PATCH.value,
+                    recipes=zlib.compress(
+                        json.dumps(self.psync.get_recipes(changed)).encode()
+                    ),
+                ),
+            )
+            d.addCallback(self.cb_psync_patch_result, agent_id, ac_id)
+            d.addErrback(self.cb_global_error)
+        except (AttributeError, pb.DeadReferenceError):
+            self.disconnect(exit_code=1)
+
+    def cb_psync_patch_result(self, result, agent_id, ac_id):
+        missed_chunks = json.loads(zlib.decompress(result))
+        # pylint: disable=consider-using-with
+        fileobj = tempfile.TemporaryFile()
+        self.psync.write_chunks_pack(fileobj, missed_chunks)
+        self.log.debug(
+            "PSync: upload chunks, count={count}, size={size}",
+            count=len(missed_chunks),
+            size=fileobj.tell(),
+        )
+        fileobj.seek(0)
+        self.psync_upload_chunk(agent_id, ac_id, [], fileobj)
+
     def psync_upload(self, agent_id, ac_id, dbindex):
         assert dbindex
         fileobj = BytesIO()
@@ -247,6 +329,7 @@ class RunOrTestClient(AsyncClientBase):
         self.log.debug("PSync: upload chunk result {r}", r=str(result))
         assert result & (PROJECT_SYNC_STAGE.UPLOAD | PROJECT_SYNC_STAGE.EXTRACTED)
         if result is PROJECT_SYNC_STAGE.EXTRACTED:
+            fileobj.close()
             if dbindex:
                 self.psync_upload(agent_id, ac_id, dbindex)
             else:
@@ -0,0 +1,37 @@
+from twisted.internet import defer  # pylint: disable=import-error
+
+from qio.remote.client.device_monitor import DeviceMonitorClient
+
+
+class DummyAgentPool:
+    def __init__(self):
+        self.writes = []
+
+    def callRemote(self, name, agent_id, ac_id, data):  # pylint: disable=invalid-name
+        assert (name, agent_id, ac_id) == ("acwrite", "agent", "ac")
+        d = defer.Deferred()
+        self.writes.append((data, d))
+        return d
+
+
+def test_acwrite_data(monkeypatch, capsys):
+    monkeypatch.setattr(DeviceMonitorClient, "MAX_BUFFER_SIZE", 8)
+    monkeypatch.setattr(DeviceMonitorClient, "MAX_WRITE_SIZE", 4)
+    cdm = DeviceMonitorClient(["agent"])
+    cdm.agentpool = DummyAgentPool()
+    cdm._agent_id = "agent"  # pylint: disable=protected-access
+    cdm._ac_id = "ac"  # pylint: disable=protected-access
+
+    cdm.acwrite_data(b"abc")
+    # the data is buffered while a previous write is in flight
+    cdm.acwrite_data(b"world")
+    cdm.acwrite_data(b"0123456")
+    assert [data for data, _ in cdm.agentpool.writes] == [b"abc"]
+    assert "4 bytes are dropped" in capsys.readouterr().out
+
+    # the rest is sent in writes limited by MAX_WRITE_SIZE
+    cdm.agentpool.writes[0][1].callback(3)
+    cdm.agentpool.writes[1][1].callback(4)
+    cdm.agentpool.writes[2][1].callback(4)
+    assert [data for data, _ in cdm.agentpool.writes] == [b"abc", b"d012", b"3456"]
+    assert isinstance(cdm.agentpool.writes[1][0], bytes)
@@ -12,15 +12,35 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
 import os
+import stat
+import struct
 import tarfile
+import tempfile
+import zlib
 from binascii import crc32
-from os.path import getmtime, getsize, isdir, isfile, join
+from os.path import isdir, isfile, join
 
 from twisted.python import constants  # pylint: disable=import-error
 
+from qio import exception, fs
 from qio.compat import hashlib_encode_data
 
+# Content-defined chunking, a boundary is placed where the gear rolling hash
+# of the last 32 bytes matches the mask, so an insertion or a removal in a
+# file shifts only the neighbouring chunks. The hash is computed byte by byte
+# (~7Mb/s), the smaller files are a single chunk hashed at the native speed
+CHUNK_MIN_SIZE = 2 * 1024
+CHUNK_MAX_SIZE = 64 * 1024
+CHUNK_BOUNDARY_MASK = 0xFFF80000  # 13 high bits, ~8Kb average chunk
+CHUNK_READ_SIZE = 1024 * 1024
+CHUNKED_FILE_MIN_SIZE = 256 * 1024
+_GEAR_TABLE = [
+    int.from_bytes(hashlib.sha1(bytes([i])).digest()[:4], "big") for i in range(256)
+]
+
 
 class PROJECT_SYNC_STAGE(constants.Flags):
     INIT = constants.FlagConstant()
@@ -29,15 +49,83 @@ class PROJECT_SYNC_STAGE(constants.Flags):
     UPLOAD = constants.FlagConstant()
     EXTRACTED = constants.FlagConstant()
     COMPLETED = constants.FlagConstant()
+    PATCH = constants.FlagConstant()
+
+
+def find_chunk_boundary(data, start, end):
+    if end - start <= CHUNK_MIN_SIZE:
+        return end
+    end = min(end, start + CHUNK_MAX_SIZE)
+    gear = _GEAR_TABLE
+    mask = CHUNK_BOUNDARY_MASK
+    h = 0
+    # the hash depends only on the last 32 bytes, warm it up before a check
+    for byte in data[start + CHUNK_MIN_SIZE - 32 : start + CHUNK_MIN_SIZE]:
+        h = ((h << 1) + gear[byte]) & 0xFFFFFFFF
+    pos = start + CHUNK_MIN_SIZE
+    # iterating over a slice is faster than indexing of the data
+    for byte in data[pos:end]:
+        h = ((h << 1) + gear[byte]) & 0xFFFFFFFF
+        pos += 1
+        if not h & mask:
+            return pos
+    return end
+
+
+def iter_content_chunks(fp):
+    data = b""
+    offset = 0
+    eof = False
+    while True:
+        if not eof and len(data) - offset < CHUNK_MAX_SIZE:
+            block = fp.read(CHUNK_READ_SIZE)
+            eof = not block
+            data = data[offset:] + block
+            offset = 0
+        if offset >= len(data):
+            break
+        end = find_chunk_boundary(data, offset, len(data))
+        yield data[offset:end]
+        offset = end
 
 
-class ProjectSync:
-    def __init__(self, path):
+def compute_file_signature(path):
+    """Return a file digest and a list of ``[digest, size]`` of its chunks"""
+    file_digest = hashlib.sha1()
+    chunks = []
+    with open(path, "rb") as fp:
+        if os.fstat(fp.fileno()).st_size < CHUNKED_FILE_MIN_SIZE:
+            data = fp.read()
+            file_digest.update(data)
+            if data:
+                chunks.append([file_digest.hexdigest(), len(data)])
+            return file_digest.hexdigest(), chunks
+        for chunk in iter_content_chunks(fp):
+            file_digest.update(chunk)
+            chunks.append([hashlib.sha1(chunk).hexdigest(), len(chunk)])
+    return file_digest.hexdigest(), chunks
+
+
+class ProjectSync:  # pylint: disable=too-many-instance-attributes
+
+    # a delta synchronization using the content-defined chunks
+    PROTOCOL_VERSION = 2
+    INDEX_VERSION = 2
+    PACK_RECORD = struct.Struct(">20sI")
+
+    def __init__(self, path, index_path=None):
         self.path = path
         if not isdir(self.path):
             os.makedirs(self.path)
+        self.index_path = index_path
         self.items = []
         self._db = {}
+        # {posix relpath: (path, stat)}
+        self._files = {}
+        # {posix relpath: [size, mtime_ns, digest, chunks]}, persisted between runs
+        self._signatures = None
+        self._files_index = None
+        self._recipes = None
 
     def add_item(self, path, relpath, cb_filter=None):
         self.items.append((path, relpath, cb_filter))
@@ -47,6 +135,8 @@ class ProjectSync:
 
     def rebuild_dbindex(self):
         self._db = {}
+        self._files = {}
+        self._files_index = None
         for (path, relpath, cb_filter) in self.items:
             if cb_filter and not cb_filter(path):
                 continue
@@ -62,9 +152,11 @@ class ProjectSync:
     def _insert_to_db(self, path, relpath):
         if not isfile(path):
             return
-        index_hash = "%s-%s-%s" % (relpath, getmtime(path), getsize(path))
+        st = os.stat(path)
+        index_hash = "%s-%s-%s" % (relpath, st.st_mtime, st.st_size)
         index = crc32(hashlib_encode_data(index_hash))
         self._db[index] = (path, relpath)
+        self._files[relpath.replace(os.sep, "/")] = (path, st)
 
     def get_dbindex(self):
         return list(self._db.keys())
@@ -105,7 +197,7 @@ class ProjectSync:
                     continue
                 path, relpath = self._db[index]
                 tgz.add(path, relpath)
-                total_size += getsize(path)
+                total_size += os.path.getsize(path)
                 if total_size > max_size:
                     break
         return compressed
@@ -115,3 +207,234 @@ class ProjectSync:
         with tarfile.open(fileobj=fileobj, mode="r:gz") as tgz:
             tgz.extractall(self.path)
         return True
+
+    #
+    # Delta synchronization
+    #
+
+    def load_index(self):
+        if self._signatures is not None:
+            return self._signatures
+        self._signatures = {}
+        if not self.index_path or not isfile(self.index_path):
+            return self._signatures
+        try:
+            data = fs.load_json(self.index_path)
+        except (OSError, exception.InvalidJSONFile):
+            return self._signatures
+        if isinstance(data, dict) and data.get("version") == self.INDEX_VERSION:
+            self._signatures = data["files"]
+        return self._signatures
+
+    def save_index(self):
+        if not self.index_path or self._signatures is None:
+            return
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = "%s.%d.tmp" % (self.index_path, os.getpid())
+        with open(tmp_path, mode="w", encoding="utf8") as fp:
+            json.dump(dict(version=self.INDEX_VERSION, files=self._signatures), fp)
+        os.replace(tmp_path, self.index_path)
+
+    def get_file_signature(self, relpath):
+        path, st = self._files[relpath]
+        signatures = self.load_index()
+        item = signatures.get(relpath)
+        if not item or item[0] != st.st_size or item[1] != st.st_mtime_ns:
+            digest, chunks = compute_file_signature(path)
+            item = [st.st_size, st.st_mtime_ns, digest, chunks]
+            signatures[relpath] = item
+        return item
+
+    def get_files_index(self):
+        """Return ``{relpath: [size, mtime_ns, digest]}`` of the synchronized files.
+
+        Only the new or modified files are hashed, the signatures of the others
+        are taken from the persisted index.
+        """
+        if self._files_index is not None:
+            return self._files_index
+        signatures = self.load_index()
+        self._files_index = {}
+        for relpath in self._files:
+            size, mtime, digest, _ = self.get_file_signature(relpath)
+            self._files_index[relpath] = [size, mtime, digest]
+        for relpath in set(signatures) - set(self._files):
+            del signatures[relpath]
+        self.save_index()
+        return self._files_index
+
+    def get_delta(self, remote_files):
+        """Return the ``(deleted, changed)`` relpaths against a remote files index.
+
+        The files are compared by a content digest, the remote copy may have a
+        coarser mtime resolution. A patch sets mtime of the changed files.
+        """
+        local_files = self.get_files_index()
+        deleted = [relpath for relpath in remote_files if relpath not in local_files]
+        changed = [
+            relpath
+            for relpath, item in local_files.items()
+            if relpath not in remote_files or remote_files[relpath][2] != item[2]
+        ]
+        return deleted, changed
+
+    def delete_files(self, relpaths):
+        signatures = self.load_index()
+        for relpath in relpaths:
+            if relpath not in self._files:
+                continue
+            path = self._files[relpath][0]
+            if isfile(path):
+                os.remove(path)
+            del self._files[relpath]
+            signatures.pop(relpath, None)
+        self._files_index = None
+        self.delete_empty_folders()
+        self.save_index()
+        return True
+
+    def _get_chunk_locations(self):
+        result = {}
+        for relpath, (path, _) in self._files.items():
+            offset = 0
+            for chunk_digest, size in self.get_file_signature(relpath)[3]:
+                result[chunk_digest] = (path, offset, size)
+                offset += size
+        return result
+
+    def get_recipes(self, relpaths):
+        result = {}
+        for relpath in relpaths:
+            _, st = self._files[relpath]
+            _, mtime, digest, chunks = self.get_file_signature(relpath)
+            result[relpath] = dict(
+                mtime=mtime,
+                digest=digest,
+                chunks=chunks,
+                executable=bool(st.st_mode & stat.S_IXUSR),
+            )
+        return result
+
+    def write_chunks_pack(self, fileobj, chunk_digests):
+        """Write zlib-compressed ``[digest][size][data]`` records to ``fileobj``"""
+        locations = self._get_chunk_locations()
+        compressor = zlib.compressobj()
+        fp = None
+        try:
+            for chunk_digest in sorted(chunk_digests, key=locations.get):
+                path, offset, size = locations[chunk_digest]
+                if not fp or fp.name != path:
+                    if fp:
+                        fp.close()
+                    fp = open(path, "rb")  # pylint: disable=consider-using-with
+                fp.seek(offset)
+                fileobj.write(
+                    compressor.compress(
+                        self.PACK_RECORD.pack(bytes.fromhex(chunk_digest), size)
+                        + fp.read(size)
+                    )
+                )
+        finally:
+            if fp:
+                fp.close()
+        fileobj.write(compressor.flush())
+
+    def prepare_patch(self, recipes):
+        """Remember the files to be (re)created, return the missing chunks"""
+        self.get_files_index()
+        for relpath in recipes:
+            self._get_dst_path(relpath)
+        self._recipes = recipes
+        locations = self._get_chunk_locations()
+        return sorted(
+            set(
+                chunk_digest
+                for recipe in recipes.values()
+                for chunk_digest, _ in recipe["chunks"]
+                if chunk_digest not in locations
+            )
+        )
+
+    def has_pending_patch(self):
+        return self._recipes is not None
+
+    def _get_dst_path(self, relpath):
+        path = os.path.normpath(join(self.path, *relpath.split("/")))
+        if not path.startswith(os.path.join(os.path.normpath(self.path), "")):
+            raise ValueError("Invalid synchronized file path %s" % relpath)
+        return path
+
+    def apply_patch(self, fileobj):
+        """Assemble the pending files from the local chunks and a received pack"""
+        assert self._recipes is not None
+        fileobj.seek(0)
+        with tempfile.TemporaryFile() as pack:
+            decompressor = zlib.decompressobj()
+            for block in iter(lambda: fileobj.read(CHUNK_READ_SIZE), b""):
+                pack.write(decompressor.decompress(block))
+            pack.write(decompressor.flush())
+            pack.seek(0)
+            locations = self._get_chunk_locations()
+            while True:
+                header = pack.read(self.PACK_RECORD.size)
+                if not header:
+                    break
+                raw_digest, size = self.PACK_RECORD.unpack(header)
+                locations[raw_digest.hex()] = (pack, pack.tell(), size)
+                pack.seek(size, os.SEEK_CUR)
+            self._assemble_files(locations)
+        self._recipes = None
+        self._files_index = None
+        self.save_index()
+        return True
+
+    def _assemble_files(self, locations):
+        signatures = self.load_index()
+        assembled = []
+        try:
+            # the chunks are read from the current files, replace them at the end
+            for relpath, recipe in self._recipes.items():
+                path = self._get_dst_path(relpath)
+                if signatures.get(relpath, [None] * 3)[2] == recipe["digest"]:
+                    assembled.append((relpath, None, path, recipe))
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = "%s.%d.psync" % (path, os.getpid())
+                assembled.append((relpath, tmp_path, path, recipe))
+                self._write_file_from_chunks(tmp_path, recipe, locations)
+            for relpath, tmp_path, path, recipe in assembled:
+                if tmp_path:
+                    os.replace(tmp_path, path)
+                    if recipe["executable"]:
+                        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+                os.utime(path, ns=(recipe["mtime"], recipe["mtime"]))
+                st = os.stat(path)
+                self._files[relpath] = (path, st)
+                signatures[relpath] = [
+                    st.st_size,
+                    st.st_mtime_ns,
+                    recipe["digest"],
+                    recipe["chunks"],
+                ]
+        finally:
+            for _, tmp_path, _, _ in assembled:
+                if tmp_path and isfile(tmp_path):
+                    os.remove(tmp_path)
+
+    @staticmethod
+    def _write_file_from_chunks(path, recipe, locations):
+        file_digest = hashlib.sha1()
+        with open(path, "wb") as dst:
+            for chunk_digest, size in recipe["chunks"]:
+                src, offset, size = locations[chunk_digest]
+                if isinstance(src, str):
+                    with open(src, "rb") as fp:
+                        fp.seek(offset)
+                        data = fp.read(size)
+                else:
+                    src.seek(offset)
+                    data = src.read(size)
+                file_digest.update(data)
+                dst.write(data)
+        if file_digest.hexdigest() != recipe["digest"]:
+            raise ValueError("Could not assemble synchronized file %s" % path)
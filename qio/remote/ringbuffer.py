@@ -0,0 +1,91 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import deque
+
+
+class RingBuffer:
+    """Bounded FIFO of bytes which keeps the newest data on overflow.
+
+    The written chunks are stored as is, without concatenation. When the
+    capacity is exceeded, the oldest chunks are dropped or trimmed using a
+    ``memoryview``, and the amount of lost data is counted in ``dropped_size``.
+    """
+
+    def __init__(self, capacity):
+        assert capacity > 0
+        self.capacity = capacity
+        self.dropped_size = 0
+        self._chunks = deque()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def write(self, data):
+        if not data:
+            return 0
+        size = len(data)
+        if size >= self.capacity:
+            self.dropped_size += self._size + size - self.capacity
+            self._chunks.clear()
+            self._chunks.append(memoryview(data)[size - self.capacity :])
+            self._size = self.capacity
+            return size
+        self._chunks.append(data)
+        self._size += size
+        self._drop(self._size - self.capacity)
+        return size
+
+    def _drop(self, size):
+        while size > 0:
+            chunk = self._chunks[0]
+            if len(chunk) <= size:
+                self._chunks.popleft()
+                dropped = len(chunk)
+            else:
+                self._chunks[0] = memoryview(chunk)[size:]
+                dropped = size
+            self._size -= dropped
+            self.dropped_size += dropped
+            size -= dropped
+
+    def read(self, size=None):
+        """Remove and return up to ``size`` bytes (all buffered data by default)"""
+        if size is None or size >= self._size:
+            parts = list(self._chunks)
+            self._chunks.clear()
+            self._size = 0
+            return b"".join(parts)
+        parts = []
+        remaining = size
+        while remaining > 0:
+            chunk = self._chunks[0]
+            if len(chunk) <= remaining:
+                parts.append(self._chunks.popleft())
+                remaining -= len(chunk)
+            else:
+                view = memoryview(chunk)
+                parts.append(view[:remaining])
+                self._chunks[0] = view[remaining:]
+                remaining = 0
+        self._size -= size
+        return b"".join(parts)
+
+    def clear(self):
+        self._chunks.clear()
+        self._size = 0
@@ -0,0 +1,107 @@
+import io
+import os
+import random
+
+import pytest
+
+from qio.remote.projectsync import (
+    CHUNK_MAX_SIZE,
+    CHUNK_MIN_SIZE,
+    CHUNKED_FILE_MIN_SIZE,
+    ProjectSync,
+    iter_content_chunks,
+)
+
+
+def _random_bytes(size, seed=0):
+    rnd = random.Random(seed)
+    return bytes(rnd.getrandbits(8) for _ in range(size))
+
+
+def _get_chunks(data):
+    return list(iter_content_chunks(io.BytesIO(data)))
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda data: data,
+        lambda data: data[:300000] + b"inserted" * 100 + data[300000:],
+        lambda data: data[:300000] + data[301000:],
+    ],
+    ids=["unchanged", "insert", "delete"],
+)
+def test_content_chunks(change):
+    data = _random_bytes(1024 * 1024)
+    chunks = _get_chunks(data)
+    assert b"".join(chunks) == data
+    assert all(len(chunk) <= CHUNK_MAX_SIZE for chunk in chunks)
+    assert all(len(chunk) > CHUNK_MIN_SIZE for chunk in chunks[:-1])
+
+    new_data = change(data)
+    new_chunks = _get_chunks(new_data)
+    assert b"".join(new_chunks) == new_data
+    # only the chunks around a changed region are different
+    assert len(set(new_chunks) - set(chunks)) <= (0 if new_data == data else 2)
+
+
+def test_project_sync_patch(tmp_path):
+    big_data = _random_bytes(CHUNKED_FILE_MIN_SIZE * 2)
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    (src_dir / "big.bin").write_bytes(
+        big_data[:200000] + b"inserted" + big_data[200000:]
+    )
+    (src_dir / "main.cpp").write_text("int main() { return 0; }\n")
+    dst_dir = tmp_path / "dst"
+    (dst_dir / "src").mkdir(parents=True)
+    (dst_dir / "src" / "big.bin").write_bytes(big_data)
+
+    local = ProjectSync(str(tmp_path))
+    local.add_item(str(src_dir), "src")
+    local.rebuild_dbindex()
+    remote = ProjectSync(str(dst_dir), index_path=str(dst_dir / ".psync.json"))
+    remote.add_item(str(dst_dir / "src"), "src")
+    remote.rebuild_dbindex()
+
+    deleted, changed = local.get_delta(remote.get_files_index())
+    assert not deleted
+    assert sorted(changed) == ["src/big.bin", "src/main.cpp"]
+    missed_chunks = remote.prepare_patch(local.get_recipes(changed))
+    total_chunks = sum(len(r["chunks"]) for r in local.get_recipes(changed).values())
+    assert len(missed_chunks) < total_chunks
+    pack = io.BytesIO()
+    local.write_chunks_pack(pack, missed_chunks)
+    assert remote.apply_patch(pack)
+
+    for name in ("big.bin", "main.cpp"):
+        assert (dst_dir / "src" / name).read_bytes() == (src_dir / name).read_bytes()
+    # the persisted index of the remote copy matches the local files
+    remote = ProjectSync(str(dst_dir), index_path=str(dst_dir / ".psync.json"))
+    remote.add_item(str(dst_dir / "src"), "src")
+    remote.rebuild_dbindex()
+    assert remote.get_files_index() == local.get_files_index()
+
+
+def test_project_sync_delta(tmp_path):
+    for name in ("src", "dst"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "main.cpp").write_text("int main() { return 0; }\n")
+        (tmp_path / name / ("%s.h" % name)).write_text("// %s\n" % name)
+    # the agent's file system keeps mtime in whole seconds
+    (tmp_path / "dst" / "main.cpp").touch()
+    st = (tmp_path / "dst" / "main.cpp").stat()
+    mtime = st.st_mtime_ns // 10**9 * 10**9
+    os.utime(str(tmp_path / "dst" / "main.cpp"), ns=(mtime, mtime))
+
+    local = ProjectSync(str(tmp_path / "src"))
+    local.add_item(str(tmp_path / "src"), "src")
+    local.rebuild_dbindex()
+    remote = ProjectSync(str(tmp_path / "dst"))
+    remote.add_item(str(tmp_path / "dst"), "src")
+    remote.rebuild_dbindex()
+
+    remote_files = remote.get_files_index()
+    assert remote_files["src/main.cpp"][1] != local.get_files_index()["src/main.cpp"][1]
+    # the files with the same content are not transferred
+    assert local.get_delta(remote_files) == (["src/dst.h"], ["src/src.h"])
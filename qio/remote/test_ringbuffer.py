@@ -0,0 +1,39 @@
+from qio.remote.ringbuffer import RingBuffer
+
+
+def test_ringbuffer_fifo():
+    rb = RingBuffer(16)
+    assert not rb
+    assert rb.read() == b""
+    assert rb.write(b"hello") == 5
+    assert rb.write(b"") == 0
+    rb.write(bytearray(b" world"))
+    assert len(rb) == 11
+    assert rb.read(3) == b"hel"
+    assert rb.read(4) == b"lo w"
+    assert rb.read(100) == b"orld"
+    assert not rb
+    assert rb.dropped_size == 0
+
+
+def test_ringbuffer_overflow():
+    rb = RingBuffer(8)
+    rb.write(b"abcdef")
+    rb.write(b"ghij")
+    # the oldest chunk is trimmed
+    assert len(rb) == 8
+    assert rb.dropped_size == 2
+    rb.write(b"kl")
+    assert rb.dropped_size == 4
+    assert rb.read() == b"efghijkl"
+
+    # a write larger than the capacity keeps its tail only
+    rb.write(b"xy")
+    rb.write(b"0123456789")
+    assert rb.dropped_size == 4 + 2 + 2
+    assert rb.read(5) == b"23456"
+    assert rb.read() == b"789"
+
+    rb.write(b"data")
+    rb.clear()
+    assert not rb and rb.read() == b""
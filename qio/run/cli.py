@@ -15,14 +15,18 @@
 import operator
 import os
 import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import cpu_count
 from time import time
 
 import click
 from tabulate import tabulate
 
-from qio import app, exception, fs, util
+from qio import app, exception, fs, proc, util
 from qio.device.monitor.command import device_monitor_cmd
+from qio.package.commands.install import install_project_env_dependencies
 from qio.project.config import ProjectConfig
 from qio.project.exception import ProjectError
 from qio.project.helpers import find_project_dir_above, load_build_metadata
@@ -68,6 +72,15 @@ except NotImplementedError:
         "Default is a number of CPUs in a system (N=%d)" % DEFAULT_JOB_NUMS
     ),
 )
+@click.option(
+    "--parallel-envs",
+    type=int,
+    default=1,
+    help=(
+        "Process N environments at once in separate worker processes. "
+        "The `--jobs` budget is shared between them"
+    ),
+)
 @click.option(
     "-a",
     "--program-arg",
@@ -76,6 +89,12 @@ except NotImplementedError:
     help="A program argument (multiple are allowed)",
 )
 @click.option("--disable-auto-clean", is_flag=True)
+@click.option("--worker", is_flag=True, hidden=True)
+@click.option(
+    "--explain-clean",
+    is_flag=True,
+    help="Report why the build directory is removed before processing",
+)
 @click.option("--list-targets", is_flag=True)
 @click.option("-s", "--silent", is_flag=True)
 @click.option("-v", "--verbose", is_flag=True)
@@ -89,8 +108,11 @@ def cli(
     project_dir,
     project_conf,
     jobs,
+    parallel_envs,
     program_args,
     disable_auto_clean,
+    worker,
+    explain_clean,
     list_targets,
     silent,
     verbose,
@@ -102,6 +124,8 @@ def cli(
         project_dir = find_project_dir_above(project_dir)
 
     is_test_running = CTX_META_TEST_IS_RUNNING in ctx.meta
+    # a header, a footer and a summary are printed by the parent process
+    is_quiet_progress = is_test_running or worker
 
     results = []
     with fs.cd(project_dir):
@@ -115,7 +139,7 @@ def cli(
         if not disable_auto_clean:
             build_dir = config.get("platformio", "build_dir")
             try:
-                clean_build_dir(build_dir, config)
+                clean_build_dir(build_dir, config, explain=explain_clean)
             except ProjectError as exc:
                 raise exc
             except:  # pylint: disable=bare-except
@@ -128,41 +152,67 @@ def cli(
         handle_legacy_libdeps(project_dir, config)
 
         default_envs = config.default_envs()
-        for env in config.envs():
-            skipenv = any(
+        selected_envs = [
+            env
+            for env in config.envs()
+            if not any(
                 [
                     environment and env not in environment,
                     not environment and default_envs and env not in default_envs,
                 ]
             )
-            if skipenv:
-                results.append({"env": env})
-                continue
-
-            # print empty line between multi environment project
-            if not silent and any(r.get("succeeded") is not None for r in results):
-                click.echo()
-
-            results.append(
-                process_env(
-                    ctx,
-                    env,
-                    config,
-                    environment,
-                    target,
-                    upload_port,
-                    monitor_port,
-                    jobs,
-                    program_args,
-                    is_test_running,
-                    silent,
-                    verbose,
-                )
+        ]
+
+        if (
+            parallel_envs > 1
+            and len(selected_envs) > 1
+            and not is_test_running
+            and not set(["upload", "monitor"]) & set(target)
+        ):
+            env_results = process_envs_in_parallel(
+                selected_envs,
+                config,
+                project_dir,
+                project_conf,
+                target,
+                upload_port,
+                jobs,
+                parallel_envs,
+                program_args,
+                silent,
+                verbose,
             )
+            results = [env_results.get(env, {"env": env}) for env in config.envs()]
+        else:
+            for env in config.envs():
+                if env not in selected_envs:
+                    results.append({"env": env})
+                    continue
+
+                # print empty line between multi environment project
+                if not silent and any(r.get("succeeded") is not None for r in results):
+                    click.echo()
+
+                results.append(
+                    process_env(
+                        ctx,
+                        env,
+                        config,
+                        environment,
+                        target,
+                        upload_port,
+                        monitor_port,
+                        jobs,
+                        program_args,
+                        is_quiet_progress,
+                        silent,
+                        verbose,
+                    )
+                )
 
     command_failed = any(r.get("succeeded") is False for r in results)
 
-    if not is_test_running and (command_failed or not silent) and len(results) > 1:
+    if not is_quiet_progress and (command_failed or not silent) and len(results) > 1:
         print_processing_summary(results, verbose)
 
     # Reset custom project config
@@ -183,11 +233,11 @@ def process_env(
     monitor_port,
     jobs,
     program_args,
-    is_test_running,
+    is_quiet_progress,
     silent,
     verbose,
 ):
-    if not is_test_running and not silent:
+    if not is_quiet_progress and not silent:
         print_processing_header(name, config, verbose)
 
     ep = EnvironmentProcessor(
@@ -205,7 +255,7 @@ def process_env(
     result["duration"] = time() - result["duration"]
 
     # print footer on error or when is not unit testing
-    if not is_test_running and (not silent or not result["succeeded"]):
+    if not is_quiet_progress and (not silent or not result["succeeded"]):
         print_processing_footer(result)
 
     if (
@@ -222,6 +272,95 @@ def process_env(
     return result
 
 
+def process_envs_in_parallel(
+    envs,
+    config,
+    project_dir,
+    project_conf,
+    targets,
+    upload_port,
+    jobs,
+    parallel_envs,
+    program_args,
+    silent,
+    verbose,
+):
+    parallel_envs = min(parallel_envs, len(envs))
+    # share the job slots between concurrent environments
+    env_jobs = max(1, jobs // parallel_envs)
+    results = {}
+
+    def _process_env(name):
+        args = [
+            proc.get_pythonexe_path(),
+            "-m",
+            "qio",
+            "run",
+            "--project-dir",
+            project_dir,
+            "--environment",
+            name,
+            "--jobs",
+            str(env_jobs),
+            "--disable-auto-clean",
+            "--worker",
+        ]
+        if project_conf:
+            args.extend(["--project-conf", project_conf])
+        if upload_port:
+            args.extend(["--upload-port", upload_port])
+        for item in targets:
+            args.extend(["--target", item])
+        for item in program_args:
+            args.extend(["--program-arg", item])
+        if silent:
+            args.append("--silent")
+        if verbose:
+            args.append("--verbose")
+
+        env = os.environ.copy()
+        # pylint: disable=protected-access
+        if click._compat.isatty(sys.stdout):
+            env["PLATFORMIO_FORCE_ANSI"] = "true"
+        started = time()
+        result = subprocess.run(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=env,
+            check=False,
+        )
+        return {
+            "env": name,
+            "duration": time() - started,
+            "succeeded": result.returncode == 0,
+            "output": result.stdout.decode("utf-8", errors="backslashreplace"),
+        }
+
+    # install dependencies in advance, workers must not race for the same packages
+    if not set(["clean", "cleanall"]) & set(targets):
+        for name in envs:
+            install_project_env_dependencies(
+                name, {"project_targets": list(targets), "silent": silent}
+            )
+
+    proc.copy_pythonpath_to_osenv()
+    with ThreadPoolExecutor(max_workers=parallel_envs) as executor:
+        for index, result in enumerate(executor.map(_process_env, envs)):
+            # print buffered output of each environment as a whole
+            if index and not silent:
+                click.echo()
+            if not silent:
+                print_processing_header(result["env"], config, verbose)
+            output = result.pop("output")
+            if output:
+                click.echo(output, nl=False, err=not result["succeeded"])
+            if not silent or not result["succeeded"]:
+                print_processing_footer(result)
+            results[result["env"]] = result
+    return results
+
+
 def print_processing_header(env, config, verbose=False):
     env_dump = []
     for k, v in config.items(env=env):
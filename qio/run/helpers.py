@@ -12,13 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 from os import makedirs
 from os.path import isdir, isfile, join
 
 import click
 
-from qio import fs
-from qio.project.helpers import compute_project_checksum, get_project_dir
+from qio import exception, fs
+from qio.project.helpers import (
+    compute_project_checksum,
+    get_project_dir,
+    get_project_manifest_files,
+)
 
 
 def handle_legacy_libdeps(project_dir, config):
@@ -42,23 +47,90 @@ def handle_legacy_libdeps(project_dir, config):
     )
 
 
-def clean_build_dir(build_dir, config):
+def clean_build_dir(build_dir, config, explain=False):
     # remove legacy ".pioenvs" folder
     legacy_build_dir = join(get_project_dir(), ".pioenvs")
     if isdir(legacy_build_dir) and legacy_build_dir != build_dir:
         fs.rmtree(legacy_build_dir)
 
     checksum_file = join(build_dir, "project.checksum")
-    checksum = compute_project_checksum(config)
+    manifest_file = join(build_dir, "project.manifest.json")
+    prev_manifest = {}
+    if isfile(manifest_file):
+        try:
+            prev_manifest = fs.load_json(manifest_file)
+        except exception.InvalidJSONFile:
+            pass
+    manifest = dict(prev_manifest)
+    checksum = compute_project_checksum(config, manifest)
 
     if isdir(build_dir):
         # check project structure
+        prev_checksum = None
         if isfile(checksum_file):
             with open(checksum_file, encoding="utf8") as fp:
-                if fp.read() == checksum:
-                    return
+                prev_checksum = fp.read()
+        if prev_checksum == checksum:
+            if explain:
+                click.secho(
+                    "Build directory `%s` is up-to-date" % build_dir, fg="green"
+                )
+            if manifest != prev_manifest:
+                _save_project_manifest(manifest_file, manifest)
+            return
+        if explain:
+            print_clean_reasons(
+                build_dir,
+                explain_project_checksum_change(prev_checksum, prev_manifest, manifest),
+            )
         fs.rmtree(build_dir)
+    elif explain:
+        click.secho(
+            "Build directory `%s` does not exist, nothing to clean" % build_dir,
+            fg="green",
+        )
 
     makedirs(build_dir)
     with open(checksum_file, mode="w", encoding="utf8") as fp:
         fp.write(checksum)
+    _save_project_manifest(manifest_file, manifest)
+
+
+def _save_project_manifest(path, manifest):
+    try:
+        with open(path, mode="w", encoding="utf8") as fp:
+            json.dump(manifest, fp)
+    except IOError:
+        pass
+
+
+def explain_project_checksum_change(prev_checksum, prev_manifest, manifest):
+    if not prev_checksum:
+        return ["The project checksum file is missing"]
+    if not prev_manifest.get("dirs"):
+        return ["The previous project structure is unknown"]
+    reasons = []
+    if prev_manifest.get("version") != manifest["version"]:
+        reasons.append(
+            "PlatformIO Core version has been changed from %s to %s"
+            % (prev_manifest.get("version"), manifest["version"])
+        )
+    if prev_manifest.get("config") != manifest["config"]:
+        reasons.append("Project configuration has been changed")
+    prev_files = get_project_manifest_files(prev_manifest)
+    files = get_project_manifest_files(manifest)
+    for title, paths in (
+        ("Added", files - prev_files),
+        ("Removed", prev_files - files),
+    ):
+        for path in sorted(paths):
+            reasons.append("%s source file `%s`" % (title, path))
+    return reasons or ["The project checksum has been changed"]
+
+
+def print_clean_reasons(build_dir, reasons, max_reasons=20):
+    click.secho("Removing build directory `%s`:" % build_dir, fg="yellow")
+    for reason in reasons[:max_reasons]:
+        click.echo(" - %s" % reason)
+    if len(reasons) > max_reasons:
+        click.echo(" - ... and %d more" % (len(reasons) - max_reasons))
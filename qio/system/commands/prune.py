@@ -18,6 +18,7 @@ from qio import fs
 from qio.system.prune import (
     prune_cached_data,
     prune_core_packages,
+    prune_package_store,
     prune_platform_packages,
 )
 
@@ -36,7 +37,14 @@ from qio.system.prune import (
     is_flag=True,
     help="Prune only unnecessary development platform packages",
 )
-def system_prune_cmd(force, dry_run, cache, core_packages, platform_packages):
+@click.option(
+    "--package-store",
+    is_flag=True,
+    help="Prune only unused files of the content-addressed package store",
+)
+def system_prune_cmd(  # pylint: disable=too-many-arguments
+    force, dry_run, cache, core_packages, platform_packages, package_store
+):
     if dry_run:
         click.secho(
             "Dry run mode (do not prune, only show data that will be removed)",
@@ -47,7 +55,8 @@ def system_prune_cmd(force, dry_run, cache, core_packages, platform_packages):
     reclaimed_cache = 0
     reclaimed_core_packages = 0
     reclaimed_platform_packages = 0
-    prune_all = not any([cache, core_packages, platform_packages])
+    reclaimed_package_store = 0
+    prune_all = not any([cache, core_packages, platform_packages, package_store])
 
     if cache or prune_all:
         reclaimed_cache = prune_cached_data(force, dry_run)
@@ -61,10 +70,18 @@ def system_prune_cmd(force, dry_run, cache, core_packages, platform_packages):
         reclaimed_platform_packages = prune_platform_packages(force, dry_run)
         click.echo()
 
+    # packages are pruned first, the store trees they used become unused
+    if package_store or prune_all:
+        reclaimed_package_store = prune_package_store(force, dry_run)
+        click.echo()
+
     click.secho(
         "Total reclaimed space: %s"
         % fs.humanize_file_size(
-            reclaimed_cache + reclaimed_core_packages + reclaimed_platform_packages
+            reclaimed_cache
+            + reclaimed_core_packages
+            + reclaimed_platform_packages
+            + reclaimed_package_store
         ),
         fg="green",
     )
@@ -18,9 +18,11 @@ from operator import itemgetter
 import click
 from tabulate import tabulate
 
-from qio import fs
+from qio import app, fs
 from qio.package.manager.core import remove_unnecessary_core_packages
 from qio.package.manager.platform import remove_unnecessary_platform_packages
+from qio.package.meta import PackageItem
+from qio.package.store import PackageStore
 from qio.project.helpers import get_project_cache_dir
 
 
@@ -55,16 +57,27 @@ def prune_platform_packages(force=False, dry_run=False, silent=False):
     return _prune_packages(force, dry_run, silent, remove_unnecessary_platform_packages)
 
 
+def prune_package_store(force=False, dry_run=False, silent=False):
+    if not silent:
+        click.secho("Prune unused files of the package store:", bold=True)
+        click.echo("Calculating...")
+    store = PackageStore()
+    reclaimed_space = store.collect_garbage(dry_run=True)
+    if reclaimed_space and not dry_run:
+        if not force:
+            click.confirm("Do you want to continue?", abort=True)
+        reclaimed_space = store.collect_garbage()
+    if not silent:
+        click.secho("Space on disk: %s" % fs.humanize_file_size(reclaimed_space))
+    return reclaimed_space
+
+
 def _prune_packages(force, dry_run, silent, handler):
     if not silent:
         click.echo("Calculating...")
-    items = [
-        (
-            pkg,
-            fs.calculate_folder_size(pkg.path),
-        )
-        for pkg in handler(dry_run=True)
-    ]
+    pkgs = handler(dry_run=True)
+    sizes = calculate_packages_size(pkgs)
+    items = [(pkg, sizes[pkg.path]) for pkg in pkgs]
     items = sorted(items, key=itemgetter(1), reverse=True)
     reclaimed_space = sum(item[1] for item in items)
     if items and not silent:
@@ -90,7 +103,35 @@ def _prune_packages(force, dry_run, silent, handler):
     return reclaimed_space
 
 
+def _get_package_stamp(path):
+    # a package dir is replaced on install/update and its metadata is rewritten
+    st = os.stat(path)
+    try:
+        meta_mtime = os.stat(os.path.join(path, PackageItem.METAFILE_NAME)).st_mtime_ns
+    except OSError:
+        meta_mtime = None
+    return [st.st_ino, st.st_mtime_ns, meta_mtime]
+
+
+def calculate_packages_size(pkgs):
+    """Return ``{pkg.path: size}``, known sizes of unchanged packages are reused"""
+    known = app.get_state_item("package_sizes", {})
+    result = {}
+    state = {path: item for path, item in known.items() if os.path.isdir(path)}
+    for pkg in pkgs:
+        stamp = _get_package_stamp(pkg.path)
+        item = known.get(pkg.path)
+        if not item or item[0] != stamp:
+            item = [stamp, fs.calculate_folder_size(pkg.path)]
+        state[pkg.path] = item
+        result[pkg.path] = item[1]
+    if state != known:
+        app.set_state_item("package_sizes", state)
+    return result
+
+
 def calculate_unnecessary_system_data():
+    # the package store is not walked here, it is checked by `pio system prune`
     return (
         prune_cached_data(force=True, dry_run=True, silent=True)
         + prune_core_packages(force=True, dry_run=True, silent=True)
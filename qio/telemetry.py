@@ -12,26 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import atexit
 import hashlib
 import json
 import os
-import queue
 import re
 import shutil
 import sys
-import threading
-from collections import deque
-from time import sleep, time
+from time import time
 from traceback import format_exc
 
-import requests
-
 from qio import __version__, app, exception, util
 from qio.cli import PlatformioCLI
 from qio.compat import hashlib_encode_data, string_types
-from qio.http import HTTPSession
-from qio.proc import is_ci, is_container
+from qio.proc import is_ci, is_container, start_detached_process
+from qio.project.config import ProjectConfig
 from qio.project.helpers import is_platformio_project
 
 
@@ -193,100 +187,179 @@ class MeasurementProtocol(TelemetryBase):
         if self._ignore_hit():
             return
         self["t"] = hittype
-        # correct queue time
-        if "qt" in self._params and isinstance(self["qt"], float):
-            self["qt"] = int((time() - self["qt"]) * 1000)
-        MPDataPusher().push(self._params)
+        # a hit time in UNIX format, converted to a queue time when sent
+        if "qt" not in self._params:
+            self["qt"] = time()
+        TelemetrySpool().append([self._params])
+
+
+class TelemetrySpool:
+    """Append-only local queue of the hits, it is flushed by a detached worker.
+
+    A hit is written as a JSON line to the spool file and is sent later, in a
+    batch with the others, by ``python -m qio.telemetry`` started from one of
+    the next CLI invocations. The worker is started at most once per
+    ``FLUSH_INTERVAL`` unless the spool grows over ``FLUSH_SIZE``. It takes the
+    whole spool away using an atomic rename, so the concurrent invocations keep
+    appending to a new file.
+    """
+
+    MAX_SIZE = 512 * 1024  # 512Kb
+    FLUSH_SIZE = 16 * 1024  # a bigger spool is flushed without waiting
+    FLUSH_INTERVAL = 600  # start a worker at most once per 10 minutes
+    BATCH_SIZE = 20  # the max number of hits per a batch request
+    MAX_HIT_AGE = 4 * 3600  # older hits are discarded by a collector
+    RETRY_INTERVAL = 3600  # do not try again an off-line endpoint for 1 hour
+    DEFAULT_ENDPOINT = "https://ssl.google-analytics.com/batch"
+
+    def __init__(self, path=None, endpoint=None):
+        self.path = path or os.path.join(
+            ProjectConfig.get_instance().get("platformio", "core_dir"),
+            "telemetry.spool",
+        )
+        self.endpoint = (
+            endpoint
+            or os.getenv("PLATFORMIO_TELEMETRY_ENDPOINT")
+            or self.DEFAULT_ENDPOINT
+        )
 
+    @property
+    def offline_marker_path(self):
+        return self.path + ".offline"
 
-@util.singleton
-class MPDataPusher:
+    @property
+    def flush_marker_path(self):
+        return self.path + ".flushed"
 
-    MAX_WORKERS = 5
+    @staticmethod
+    def _touch_marker(path):
+        try:
+            with open(path, mode="w", encoding="utf8"):
+                pass
+        except IOError:
+            pass
 
-    def __init__(self):
-        self._queue = queue.LifoQueue()
-        self._failedque = deque()
-        self._http_session = HTTPSession()
-        self._http_offline = False
-        self._workers = []
-
-    def push(self, item):
-        # if network is off-line
-        if self._http_offline:
-            if "qt" not in item:
-                item["qt"] = time()
-            self._failedque.append(item)
-            return
+    @staticmethod
+    def _get_marker_age(path):
+        try:
+            return time() - os.path.getmtime(path)
+        except OSError:
+            return None
 
-        self._queue.put(item)
-        self._tune_workers()
+    def append(self, items):
+        lines = "".join(json.dumps(item) + "\n" for item in items)
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        # keep the oldest hits, the spool is not rewritten
+        if size + len(lines) > self.MAX_SIZE:
+            return False
+        try:
+            with open(self.path, mode="a", encoding="utf8") as fp:
+                fp.write(lines)
+        except IOError:
+            return False
+        return True
 
-    def in_wait(self):
-        return self._queue.unfinished_tasks
+    def is_pending(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False
+        offline_age = self._get_marker_age(self.offline_marker_path)
+        if offline_age is not None and offline_age <= self.RETRY_INTERVAL:
+            return False
+        flush_age = self._get_marker_age(self.flush_marker_path)
+        return (
+            size >= self.FLUSH_SIZE
+            or flush_age is None
+            or flush_age > self.FLUSH_INTERVAL
+        )
 
-    def get_items(self):
-        items = list(self._failedque)
+    def flush_async(self):
+        if not self.is_pending():
+            return False
+        # the next invocations do not start the other workers meanwhile
+        self._touch_marker(self.flush_marker_path)
+        return start_detached_process([sys.executable, "-m", __name__, "flush"])
+
+    def flush(self):
+        """Send the spooled hits, returns the number of the sent ones.
+
+        An invocation which opened the spool right before the rename can write
+        its hits to the taken file after they were read. The file is read again
+        after the sending and such hits are returned to the new spool.
+        """
+        self._touch_marker(self.flush_marker_path)
+        tmp_path = "%s.%d.flush" % (self.path, os.getpid())
         try:
-            while True:
-                items.append(self._queue.get_nowait())
-        except queue.Empty:
-            pass
+            os.replace(self.path, tmp_path)
+        except OSError:  # flushed by another process
+            return 0
+        try:
+            with open(tmp_path, encoding="utf8") as fp:
+                items = self._load_items(fp)
+                if not app.get_setting("enable_telemetry"):
+                    return 0
+                sent = self._send_items(items)
+                late_items = self._load_items(fp)
+        finally:
+            os.remove(tmp_path)
+        if sent < len(items) or late_items:
+            self.append(items[sent:] + late_items)
+        return sent
+
+    def _send_items(self, items):
+        for offset in range(0, len(items), self.BATCH_SIZE):
+            if not self._send_batch(items[offset : offset + self.BATCH_SIZE]):
+                self._touch_marker(self.offline_marker_path)
+                return offset
+        if os.path.isfile(self.offline_marker_path):
+            os.remove(self.offline_marker_path)
+        return len(items)
+
+    def _load_items(self, fp):
+        items = []
+        expire_time = time() - self.MAX_HIT_AGE
+        for line in fp:
+            try:
+                item = json.loads(line)
+            except ValueError:  # a partially written hit
+                continue
+            if isinstance(item, dict) and item.get("qt", 0) > expire_time:
+                items.append(item)
         return items
 
-    def _tune_workers(self):
-        for i, w in enumerate(self._workers):
-            if not w.is_alive():
-                del self._workers[i]
-
-        need_nums = min(self._queue.qsize(), self.MAX_WORKERS)
-        active_nums = len(self._workers)
-        if need_nums <= active_nums:
-            return
+    def _send_batch(self, items):
+        # pylint: disable=import-outside-toplevel
+        from urllib.parse import urlencode
 
-        for i in range(need_nums - active_nums):
-            t = threading.Thread(target=self._worker)
-            t.daemon = True
-            t.start()
-            self._workers.append(t)
+        import requests
 
-    def _worker(self):
-        while True:
-            try:
-                item = self._queue.get()
-                _item = item.copy()
-                if "qt" not in _item:
-                    _item["qt"] = time()
-                self._failedque.append(_item)
-                if self._send_data(item):
-                    self._failedque.remove(_item)
-                self._queue.task_done()
-            except:  # pylint: disable=W0702
-                pass
+        from qio.http import HTTPSession
 
-    def _send_data(self, data):
-        if self._http_offline:
-            return False
+        payload = []
+        for item in items:
+            item = item.copy()
+            # a queue time, the offset in milliseconds
+            item["qt"] = int((time() - item["qt"]) * 1000)
+            payload.append(urlencode(item))
         try:
-            r = self._http_session.post(
-                "https://ssl.google-analytics.com/collect",
-                data=data,
-                timeout=1,
-            )
+            with HTTPSession() as session:
+                r = session.post(self.endpoint, data="\n".join(payload), timeout=5)
             r.raise_for_status()
-            return True
         except requests.exceptions.HTTPError as exc:
             # skip Bad Request
-            if 400 >= exc.response.status_code < 500:
-                return True
-        except:  # pylint: disable=bare-except
-            pass
-        self._http_offline = True
-        return False
+            return 400 <= exc.response.status_code < 500
+        except requests.exceptions.RequestException:
+            return False
+        return True
 
 
 def on_command():
-    resend_backuped_reports()
+    import_legacy_reports()
+    TelemetrySpool().flush_async()
 
     mp = MeasurementProtocol()
     mp.send("screenview")
@@ -395,60 +468,21 @@ def send_exception(description, is_fatal=False):
     mp.send("exception")
 
 
-@atexit.register
-def _finalize():
-    timeout = 1000  # msec
-    elapsed = 0
-    try:
-        while elapsed < timeout:
-            if not MPDataPusher().in_wait():
-                break
-            sleep(0.2)
-            elapsed += 200
-        backup_reports(MPDataPusher().get_items())
-    except KeyboardInterrupt:
-        pass
-
-
-def backup_reports(items):
-    if not items:
-        return
-
-    KEEP_MAX_REPORTS = 100
+def import_legacy_reports():
+    """Move the reports backed up by the previous versions to the spool"""
     tm = app.get_state_item("telemetry", {})
     if "backup" not in tm:
-        tm["backup"] = []
-
-    for params in items:
-        # skip static options
-        for key in list(params.keys()):
-            if key in ("v", "tid", "cid", "cd1", "cd2", "sr", "an"):
-                del params[key]
-
-        # store time in UNIX format
-        if "qt" not in params:
-            params["qt"] = time()
-        elif not isinstance(params["qt"], float):
-            params["qt"] = time() - (params["qt"] / 1000)
-
-        tm["backup"].append(params)
-
-    tm["backup"] = tm["backup"][KEEP_MAX_REPORTS * -1 :]
-    app.set_state_item("telemetry", tm)
-
-
-def resend_backuped_reports():
-    tm = app.get_state_item("telemetry", {})
-    if "backup" not in tm or not tm["backup"]:
         return False
-
     for report in tm["backup"]:
         mp = MeasurementProtocol()
         for key, value in report.items():
             mp[key] = value
         mp.send(report["t"])
-
-    # clean
-    tm["backup"] = []
+    del tm["backup"]
     app.set_state_item("telemetry", tm)
     return True
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["flush"]:
+        TelemetrySpool().flush()
@@ -12,18 +12,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import glob
+import hashlib
+import io
 import os
+import re
 import shutil
+import subprocess
+import sys
 
 import click
 
-from qio import app, exception, fs, util
+from qio import app, exception, fs, proc, util
+from qio.compat import hashlib_encode_data
+from qio.package.commands.install import install_project_env_dependencies
 from qio.project.config import ProjectConfig
+from qio.test.exception import UnitTestSuiteError
 from qio.test.helpers import list_test_suites
+from qio.test.impact import TestImpactAnalysis
 from qio.test.reports.base import TestReportFactory
-from qio.test.result import TestResult, TestStatus
+from qio.test.result import TestCase, TestResult, TestStatus
 from qio.test.runners.base import TestRunnerOptions
 from qio.test.runners.factory import TestRunnerFactory
+from qio.test.runners.readers.program import ProgramTestOutputReader
+
+
+def validate_changed_since(ctx, param, value):  # pylint: disable=unused-argument
+    # a snapshot is resolved before a project dir becomes a current dir
+    if value and os.path.isdir(value):
+        return os.path.abspath(value)
+    return value
 
 
 @click.command("test", short_help="Unit Testing")
@@ -82,6 +101,25 @@ from qio.test.runners.factory import TestRunnerFactory
     multiple=True,
     help="A program argument (multiple are allowed)",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help=(
+        "Build and test N native test suites at once " "in separate build directories"
+    ),
+)
+@click.option("--build-jobs", type=int, hidden=True)
+@click.option(
+    "--changed-since",
+    metavar="<git-ref|snapshot>",
+    callback=validate_changed_since,
+    help=(
+        "Run only test suites affected by the changes since a Git reference "
+        "or since a folder with the saved suite fingerprints"
+    ),
+)
 @click.option("--list-tests", is_flag=True)
 @click.option("--json-output-path", type=click.Path(resolve_path=True))
 @click.option("--junit-output-path", type=click.Path(resolve_path=True))
@@ -108,6 +146,9 @@ def cli(  # pylint: disable=too-many-arguments,too-many-locals,redefined-builtin
     monitor_rts,
     monitor_dtr,
     program_args,
+    jobs,
+    build_jobs,
+    changed_since,
     list_tests,
     json_output_path,
     junit_output_path,
@@ -121,7 +162,15 @@ def cli(  # pylint: disable=too-many-arguments,too-many-locals,redefined-builtin
 
         test_result = TestResult(project_dir)
         test_suites = list_test_suites(
-            project_config, environments=environment, filters=filter, ignores=ignore
+            project_config,
+            environments=environment,
+            filters=filter,
+            ignores=ignore,
+            impact=(
+                TestImpactAnalysis(project_config, changed_since)
+                if changed_since
+                else None
+            ),
         )
         test_names = sorted(set(s.test_name for s in test_suites))
 
@@ -131,30 +180,45 @@ def cli(  # pylint: disable=too-many-arguments,too-many-locals,redefined-builtin
         if verbose:
             click.echo(" (%s)" % ", ".join(test_names))
 
+        runners = []
         for test_suite in test_suites:
             test_result.add_suite(test_suite)
             if list_tests or test_suite.is_finished():  # skipped by user
                 continue
-            runner = TestRunnerFactory.new(
-                test_suite,
-                project_config,
-                TestRunnerOptions(
-                    verbose=verbose,
-                    without_building=without_building,
-                    without_uploading=without_uploading,
-                    without_testing=without_testing,
-                    upload_port=upload_port,
-                    test_port=test_port,
-                    no_reset=no_reset,
-                    monitor_rts=monitor_rts,
-                    monitor_dtr=monitor_dtr,
-                    program_args=program_args,
-                ),
+            runners.append(
+                TestRunnerFactory.new(
+                    test_suite,
+                    project_config,
+                    TestRunnerOptions(
+                        verbose=verbose,
+                        without_building=without_building,
+                        without_uploading=without_uploading,
+                        without_testing=without_testing,
+                        upload_port=upload_port,
+                        test_port=test_port,
+                        no_reset=no_reset,
+                        monitor_rts=monitor_rts,
+                        monitor_dtr=monitor_dtr,
+                        program_args=program_args,
+                        build_jobs=build_jobs,
+                    ),
+                )
             )
+
+        parallel_runners = get_parallel_runners(runners, jobs)
+
+        for runner in runners:
+            if runner in parallel_runners:
+                continue
             click.echo()
-            print_suite_header(test_suite)
+            print_suite_header(runner.test_suite)
             runner.start(ctx)
-            print_suite_footer(test_suite)
+            print_suite_footer(runner.test_suite)
+
+        if parallel_runners:
+            process_test_suites_in_parallel(
+                parallel_runners, project_dir, project_conf, jobs
+            )
 
     stdout_report = TestReportFactory.new("stdout", test_result)
     stdout_report.generate(verbose=verbose or list_tests)
@@ -175,6 +239,181 @@ def cli(  # pylint: disable=too-many-arguments,too-many-locals,redefined-builtin
         raise exception.ReturnErrorCode(1)
 
 
+def get_parallel_runners(runners, jobs):
+    """Returns the runners which are processed concurrently, the rest ones are
+    started one by one"""
+    if jobs < 2:
+        return []
+    result = [r for r in runners if r.is_parallel_safe()]
+    return result if len(result) > 1 else []
+
+
+def get_suite_build_dir(runner):
+    test_name = runner.test_suite.test_name
+    return os.path.join(
+        os.path.abspath(runner.project_config.get("platformio", "build_dir")),
+        runner.test_suite.env_name,
+        "suites",
+        "%s-%s"
+        % (
+            re.sub(r"[^\da-z\_\-]+", "_", test_name, flags=re.I),
+            hashlib.sha1(hashlib_encode_data(test_name)).hexdigest()[:8],
+        ),
+    )
+
+
+async def build_test_suite(  # pylint: disable=too-many-arguments
+    runner, project_dir, project_conf, build_jobs, shared_build_dir=None
+):
+    """Build a program of the suite in a subprocess, returns a return code and
+    the captured output"""
+    args = [
+        proc.get_pythonexe_path(),
+        "-m",
+        "qio",
+        "test",
+        "--project-dir",
+        project_dir,
+        "--environment",
+        runner.test_suite.env_name,
+        "--filter",
+        glob.escape(runner.test_suite.test_name),
+        "--without-uploading",
+        "--without-testing",
+        "--build-jobs",
+        str(build_jobs),
+    ]
+    if project_conf:
+        args.extend(["--project-conf", project_conf])
+    if runner.options.verbose:
+        args.append("-" + "v" * runner.options.verbose)
+
+    env = os.environ.copy()
+    env["PLATFORMIO_BUILD_DIR"] = runner.build_dir
+    if shared_build_dir:
+        # link the project sources and libraries built by the primary suite
+        env["PIOTEST_SHARED_BUILD_DIR"] = shared_build_dir
+    # pylint: disable=protected-access
+    if click._compat.isatty(sys.stdout):
+        env["PLATFORMIO_FORCE_ANSI"] = "true"
+    process = await asyncio.create_subprocess_exec(
+        *args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env
+    )
+    output, _ = await process.communicate()
+    return process.returncode, output.decode("utf-8", errors="backslashreplace")
+
+
+def process_test_suites_in_parallel(runners, project_dir, project_conf, jobs):
+    # pylint: disable=too-many-statements
+    jobs = min(jobs, len(runners))
+    options = runners[0].options
+    # share the job slots between concurrent builds
+    build_jobs = options.build_jobs or max(1, (os.cpu_count() or 1) // jobs)
+
+    # install dependencies in advance, workers must not race for the same packages
+    if not options.without_building:
+        for env_name in sorted(set(r.test_suite.env_name for r in runners)):
+            install_project_env_dependencies(
+                env_name,
+                {
+                    "project_targets": ["__test"],
+                    "piotest_running_name": next(
+                        r.test_suite.test_name
+                        for r in runners
+                        if r.test_suite.env_name == env_name
+                    ),
+                    "silent": options.verbose < 2,
+                },
+            )
+
+    async def _process_suite(runner, semaphore, primary_built):
+        test_suite = runner.test_suite
+        primary = primaries[test_suite.env_name]
+        shared_build_dir = None
+        if runner is not primary and not options.without_building:
+            await primary_built[test_suite.env_name].wait()
+            # the objects of a failed build can be stale or incomplete
+            if primary_returncodes.get(test_suite.env_name) == 0:
+                shared_build_dir = os.path.join(primary.build_dir, "test_shared")
+        output = io.StringIO()
+        async with semaphore:
+            test_suite.on_start()
+            try:
+                if not options.without_building:
+                    returncode = None
+                    try:
+                        if runner is primary:
+                            # a manifest of the previous build must not be
+                            # linked if this one fails
+                            manifest_path = os.path.join(
+                                runner.build_dir, "test_shared", "manifest.json"
+                            )
+                            if os.path.isfile(manifest_path):
+                                os.remove(manifest_path)
+                        returncode, build_output = await build_test_suite(
+                            runner,
+                            project_dir,
+                            project_conf,
+                            build_jobs,
+                            shared_build_dir,
+                        )
+                    finally:
+                        if runner is primary:
+                            primary_returncodes[test_suite.env_name] = returncode
+                            primary_built[test_suite.env_name].set()
+                    if returncode != 0 or options.verbose:
+                        output.write(build_output)
+                    if returncode != 0:
+                        raise UnitTestSuiteError(
+                            "Building stage has failed, see errors above. "
+                            "Use `pio test -vvv` option to enable verbose output."
+                        )
+                if not options.without_testing:
+                    await ProgramTestOutputReader(
+                        runner, aio_loop, output
+                    ).gather_results()
+            except Exception as exc:  # pylint: disable=broad-except
+                output.write(click.style(str(exc), fg="red") + "\n")
+                test_suite.add_case(
+                    TestCase(
+                        name=f"{test_suite.env_name}:{test_suite.test_name}",
+                        status=TestStatus.ERRORED,
+                        exception=exc,
+                    )
+                )
+            finally:
+                test_suite.on_finish()
+
+        # print buffered output of each suite as a whole
+        click.echo()
+        print_suite_header(test_suite)
+        click.echo(output.getvalue(), nl=False)
+        print_suite_footer(test_suite)
+
+    async def _process_suites():
+        semaphore = asyncio.Semaphore(jobs)
+        primary_built = {env_name: asyncio.Event() for env_name in primaries}
+        await asyncio.gather(
+            *[_process_suite(r, semaphore, primary_built) for r in runners]
+        )
+
+    # the first suite of each environment builds the objects which are shared
+    # with the rest suites, see `BuildTestSharedSources()`
+    primaries = {}
+    primary_returncodes = {}
+    for runner in runners:
+        runner.build_dir = get_suite_build_dir(runner)
+        primaries.setdefault(runner.test_suite.env_name, runner)
+    proc.copy_pythonpath_to_osenv()
+    # builds and test programs of all suites are driven from one event loop
+    aio_loop = ProgramTestOutputReader.new_event_loop()
+    try:
+        aio_loop.run_until_complete(_process_suites())
+    finally:
+        aio_loop.run_until_complete(aio_loop.shutdown_asyncgens())
+        aio_loop.close()
+
+
 def print_suite_header(test_suite):
     click.echo(
         "Processing %s in %s environment"
@@ -33,7 +33,7 @@ def list_test_names(project_config):
     return names
 
 
-def list_test_suites(project_config, environments, filters, ignores):
+def list_test_suites(project_config, environments, filters, ignores, impact=None):
     result = []
     test_dir = project_config.get("platformio", "test_dir")
     default_envs = project_config.default_envs()
@@ -59,6 +59,9 @@ def list_test_suites(project_config, environments, filters, ignores):
                 test_name != "*"
                 and any(fnmatch(test_name, p) for p in patterns["ignore"]),
             ]
+            # not affected by the changes, see `pio test --changed-since`
+            if impact and not any(skip_conditions):
+                skip_conditions.append(not impact.is_affected(env_name, test_name))
             result.append(
                 TestSuite(
                     env_name,
@@ -0,0 +1,171 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import re
+
+from qio import fs
+from qio.compat import hashlib_encode_data
+from qio.exception import InvalidJSONFile
+from qio.proc import exec_command
+from qio.test.exception import UnitTestError
+
+
+class TestImpactError(UnitTestError):
+
+    MESSAGE = "Could not detect the changed files since `{0}`: {1}"
+
+
+def get_fingerprints_dir(workspace_dir):
+    return os.path.join(workspace_dir, "test_impact")
+
+
+def get_fingerprint_path(fingerprints_dir, env_name, test_name):
+    return os.path.join(
+        fingerprints_dir,
+        env_name,
+        "%s-%s.json"
+        % (
+            re.sub(r"[^\da-z\_\-]+", "_", test_name, flags=re.I),
+            hashlib.sha1(hashlib_encode_data(test_name)).hexdigest()[:8],
+        ),
+    )
+
+
+def calculate_dir_digest(path):
+    """A digest of the file list of a directory with the sizes and the
+    modification times, a content is not read"""
+    if not os.path.isdir(path):
+        return None
+    items = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            items.append([os.path.relpath(file_path, path), st.st_size, st.st_mtime])
+    return hashlib.sha1(hashlib_encode_data(json.dumps(items))).hexdigest()
+
+
+class TestFingerprint:
+    """Inputs of a test suite build resolved by LDF: the scanned project
+    files with their digests and the directories of the used libraries"""
+
+    VERSION = 1
+
+    def __init__(self, files=None, dirs=None):
+        self.files = files or {}
+        self.dirs = dirs or {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.isfile(path):
+            return None
+        try:
+            data = fs.load_json(path)
+        except InvalidJSONFile:
+            return None
+        if data.get("version") != cls.VERSION:
+            return None
+        return cls(data.get("files"), data.get("dirs"))
+
+    def save(self, path):
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, mode="w", encoding="utf8") as fp:
+            json.dump(dict(version=self.VERSION, files=self.files, dirs=self.dirs), fp)
+
+    def add_file(self, path, digest=None):
+        path = os.path.realpath(path)
+        if digest is None and os.path.isfile(path):
+            digest = fs.calculate_file_hashsum("sha1", path)
+        self.files[path] = digest
+
+    def add_dir(self, path):
+        path = os.path.realpath(path)
+        self.dirs[path] = calculate_dir_digest(path)
+
+    def is_changed(self):
+        for path, digest in self.files.items():
+            current = (
+                fs.calculate_file_hashsum("sha1", path)
+                if os.path.isfile(path)
+                else None
+            )
+            if current != digest:
+                return True
+        return any(
+            calculate_dir_digest(path) != digest for path, digest in self.dirs.items()
+        )
+
+    def depends_on(self, paths):
+        for path in paths:
+            if path in self.files:
+                return True
+            if any(path.startswith(d + os.sep) for d in self.dirs):
+                return True
+        return False
+
+
+class TestImpactAnalysis:
+    """Selects the test suites affected by the changes since a Git reference
+    or since a directory with the fingerprints (a snapshot) saved by the
+    previous builds. A suite without a fingerprint is always affected."""
+
+    def __init__(self, project_config, changed_since):
+        self.changed_since = changed_since
+        self.fingerprints_dir = get_fingerprints_dir(
+            project_config.get("platformio", "workspace_dir")
+        )
+        self._changed_paths = None
+        if os.path.isdir(changed_since):
+            self.fingerprints_dir = changed_since
+        else:
+            self._changed_paths = self.get_git_changed_paths(os.getcwd(), changed_since)
+
+    @staticmethod
+    def get_git_changed_paths(cwd, ref):
+        def _git(*args):
+            try:
+                result = exec_command(["git"] + list(args), cwd=cwd)
+            except OSError as exc:
+                raise TestImpactError(ref, exc) from exc
+            if result["returncode"] != 0:
+                raise TestImpactError(ref, result["err"].strip())
+            return result["out"].strip()
+
+        root = _git("rev-parse", "--show-toplevel")
+        _git("rev-parse", "--verify", "%s^{commit}" % ref)
+        names = _git("diff", "--name-only", "--no-renames", ref, "--").splitlines()
+        names.extend(
+            _git(
+                "ls-files", "--others", "--exclude-standard", "--full-name"
+            ).splitlines()
+        )
+        return set(os.path.realpath(os.path.join(root, name)) for name in names if name)
+
+    def is_affected(self, env_name, test_name):
+        fingerprint = TestFingerprint.load(
+            get_fingerprint_path(self.fingerprints_dir, env_name, test_name)
+        )
+        if not fingerprint:
+            return True
+        if self._changed_paths is None:
+            return fingerprint.is_changed()
+        return fingerprint.depends_on(self._changed_paths)
@@ -39,6 +39,7 @@ class TestRunnerOptions:  # pylint: disable=too-many-instance-attributes
         monitor_rts=None,
         monitor_dtr=None,
         program_args=None,
+        build_jobs=None,
     ):
         self.verbose = verbose
         self.without_building = without_building
@@ -51,6 +52,7 @@ class TestRunnerOptions:  # pylint: disable=too-many-instance-attributes
         self.monitor_rts = monitor_rts
         self.monitor_dtr = monitor_dtr
         self.program_args = program_args
+        self.build_jobs = build_jobs
 
 
 class TestRunnerBase:
@@ -68,6 +70,8 @@ class TestRunnerBase:
             autoinstall=True,
         )
         self.cmd_ctx = None
+        # a custom `build_dir` of a suite that is built concurrently with others
+        self.build_dir = None
         self._testing_output_buffer = ""
 
     @property
@@ -84,6 +88,34 @@ class TestRunnerBase:
             f"env:{self.test_suite.env_name}", "test_port"
         )
 
+    def is_parallel_safe(self):
+        """Whether a suite can be built and tested concurrently with other
+        suites, a native program does not share a device with them"""
+        # the concurrent suites are built and tested by the workers, they do
+        # not call the hooks of a custom runner
+        if any(
+            getattr(type(self), name) is not getattr(TestRunnerBase, name)
+            for name in (
+                "start",
+                "setup",
+                "stage_building",
+                "stage_uploading",
+                "stage_testing",
+                "teardown",
+            )
+        ):
+            return False
+        test_port = self.get_test_port()
+        return not any(
+            [
+                self.platform.is_embedded(),
+                test_port and "://" in test_port,
+                self.project_config.get(
+                    f"env:{self.test_suite.env_name}", "test_testing_command"
+                ),
+            ]
+        )
+
     def start(self, cmd_ctx):
         # setup command context
         self.cmd_ctx = cmd_ctx
@@ -183,6 +215,9 @@ class TestRunnerBase:
         from qio.run.cli import cli as run_cmd
 
         assert self.cmd_ctx
+        kwargs = {}
+        if self.options.build_jobs:
+            kwargs["jobs"] = self.options.build_jobs
         return self.cmd_ctx.invoke(
             run_cmd,
             project_conf=self.project_config.path,
@@ -192,6 +227,7 @@ class TestRunnerBase:
             environment=[self.test_suite.env_name],
             disable_auto_clean="nobuild" in targets,
             target=targets,
+            **kwargs,
         )
 
     def configure_build_env(self, env):
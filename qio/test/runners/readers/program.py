@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import asyncio
+import contextlib
 import os
 import signal
 import subprocess
@@ -30,9 +31,10 @@ EXITING_TIMEOUT = 5  # seconds
 
 
 class ProgramProcessProtocol(asyncio.SubprocessProtocol):
-    def __init__(self, test_runner, exit_future):
+    def __init__(self, test_runner, exit_future, output=None):
         self.test_runner = test_runner
         self.exit_future = exit_future
+        self.output = output
         self._exit_timer = None
 
     def pipe_data_received(self, _, data):
@@ -40,7 +42,12 @@ class ProgramProcessProtocol(asyncio.SubprocessProtocol):
             data = data.decode(get_locale_encoding() or get_filesystem_encoding())
         except UnicodeDecodeError:
             data = data.decode("latin-1")
-        self.test_runner.on_testing_data_output(data)
+        if self.output:
+            # a suite running concurrently with others prints to its own buffer
+            with contextlib.redirect_stdout(self.output):
+                self.test_runner.on_testing_data_output(data)
+        else:
+            self.test_runner.on_testing_data_output(data)
         if self.test_runner.test_suite.is_finished():
             self._exit_timer = aio_get_running_loop().call_later(
                 EXITING_TIMEOUT, self._stop_testing
@@ -57,12 +64,21 @@ class ProgramProcessProtocol(asyncio.SubprocessProtocol):
 
 
 class ProgramTestOutputReader:
-    def __init__(self, test_runner):
+    def __init__(self, test_runner, aio_loop=None, output=None):
+        """A shared ``aio_loop`` allows to gather results of several programs
+        at once, it is not closed by the reader"""
         self.test_runner = test_runner
-        self.aio_loop = (
+        self.output = output
+        self._own_loop = aio_loop is None
+        self.aio_loop = aio_loop or self.new_event_loop()
+
+    @staticmethod
+    def new_event_loop():
+        aio_loop = (
             asyncio.ProactorEventLoop() if IS_WINDOWS else asyncio.new_event_loop()
         )
-        asyncio.set_event_loop(self.aio_loop)
+        asyncio.set_event_loop(aio_loop)
+        return aio_loop
 
     def get_testing_command(self):
         custom_testing_command = self.test_runner.project_config.get(
@@ -70,7 +86,9 @@ class ProgramTestOutputReader:
         )
         if custom_testing_command:
             return custom_testing_command
-        build_dir = self.test_runner.project_config.get("platformio", "build_dir")
+        build_dir = self.test_runner.build_dir or self.test_runner.project_config.get(
+            "platformio", "build_dir"
+        )
         cmd = [
             os.path.join(
                 build_dir,
@@ -85,7 +103,7 @@ class ProgramTestOutputReader:
     async def gather_results(self):
         exit_future = asyncio.Future(loop=self.aio_loop)
         transport, _ = await self.aio_loop.subprocess_exec(
-            lambda: ProgramProcessProtocol(self.test_runner, exit_future),
+            lambda: ProgramProcessProtocol(self.test_runner, exit_future, self.output),
             *self.get_testing_command(),
             stdin=None,
             stdout=subprocess.PIPE,
@@ -121,8 +139,10 @@ class ProgramTestOutputReader:
             raise UnitTestError("Program errored with %d code" % return_code) from exc
 
     def begin(self):
+        if not self._own_loop:
+            return self.aio_loop.run_until_complete(self.gather_results())
         try:
-            self.aio_loop.run_until_complete(self.gather_results())
+            return self.aio_loop.run_until_complete(self.gather_results())
         finally:
             self.aio_loop.run_until_complete(self.aio_loop.shutdown_asyncgens())
             self.aio_loop.close()
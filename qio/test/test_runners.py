@@ -0,0 +1,172 @@
+import asyncio
+import os
+
+import pytest
+
+from qio.project.config import ProjectConfig
+from qio.test import cli as test_cli
+from qio.test import result as test_result
+from qio.test.runners import base as runners_base
+
+
+class DummyPlatform:
+    def __init__(self, name):
+        self.name = name
+
+    def is_embedded(self):
+        return self.name != "native"
+
+
+class NativeRunner(runners_base.TestRunnerBase):
+    def on_testing_line_output(self, line):
+        pass
+
+
+class CustomHooksRunner(runners_base.TestRunnerBase):
+    def setup(self):
+        pass
+
+
+@pytest.fixture
+def project_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        runners_base.PlatformFactory,
+        "new",
+        lambda name, autoinstall=False: DummyPlatform(name),
+    )
+    (tmp_path / "platformio.ini").write_text(
+        "\n".join(
+            [
+                "[env:native]",
+                "platform = native",
+                "[env:remote]",
+                "platform = native",
+                "test_port = socket://localhost:8888",
+                "[env:device]",
+                "platform = atmelavr",
+            ]
+        )
+    )
+    return ProjectConfig(str(tmp_path / "platformio.ini"))
+
+
+def test_parallel_runners(project_config):
+    # pylint: disable=redefined-outer-name
+    def _new_runner(env_name, test_name, runner_cls=NativeRunner):
+        return runner_cls(
+            test_result.TestSuite(env_name, test_name),
+            project_config,
+            runners_base.TestRunnerOptions(),
+        )
+
+    native_runners = [_new_runner("native", "test_%d" % i) for i in range(2)]
+    assert all(r.is_parallel_safe() for r in native_runners)
+    other_runners = [
+        _new_runner("remote", "test_remote"),
+        _new_runner("device", "test_device"),
+        # the hooks of a custom runner are not called by the workers
+        _new_runner("native", "test_custom", CustomHooksRunner),
+    ]
+    assert not any(r.is_parallel_safe() for r in other_runners)
+
+    runners = native_runners + other_runners
+    assert test_cli.get_parallel_runners(runners, jobs=4) == native_runners
+    assert not test_cli.get_parallel_runners(runners, jobs=1)
+    # a single safe suite is processed as usual
+    assert not test_cli.get_parallel_runners(runners[1:], jobs=4)
+
+
+def test_process_test_suites_in_parallel(project_config, monkeypatch, capsys):
+    # pylint: disable=redefined-outer-name,too-many-locals
+    events = []
+    shared_build_dirs = {}
+
+    async def _build_test_suite(  # pylint: disable=too-many-arguments
+        runner, project_dir, project_conf, build_jobs, shared_build_dir=None
+    ):
+        assert (project_dir, project_conf, build_jobs) == ("/project", None, 2)
+        test_suite = runner.test_suite
+        events.append(("build", test_suite.env_name, test_suite.test_name))
+        await asyncio.sleep(0.01)
+        returncode = 1 if test_suite.test_name == "test_broken" else 0
+        events.append(("built", test_suite.env_name, test_suite.test_name))
+        shared_build_dirs[test_suite.test_name] = shared_build_dir
+        return returncode, "build %s\n" % test_suite.test_name
+
+    class DummyTestOutputReader:
+        new_event_loop = staticmethod(asyncio.new_event_loop)
+
+        def __init__(self, runner, aio_loop, output):
+            self.runner = runner
+            self.aio_loop = aio_loop
+            self.output = output
+
+        async def gather_results(self):
+            test_suite = self.runner.test_suite
+            for number in range(3):
+                self.output.write("%s line %d\n" % (test_suite.test_name, number))
+                await asyncio.sleep(0)
+            test_suite.add_case(
+                test_result.TestCase(
+                    name=test_suite.test_name, status=test_result.TestStatus.PASSED
+                )
+            )
+
+    monkeypatch.setattr(test_cli, "build_test_suite", _build_test_suite)
+    monkeypatch.setattr(test_cli, "ProgramTestOutputReader", DummyTestOutputReader)
+    monkeypatch.setattr(
+        test_cli, "install_project_env_dependencies", lambda *args: None
+    )
+    monkeypatch.setattr(test_cli.proc, "copy_pythonpath_to_osenv", lambda: None)
+
+    options = runners_base.TestRunnerOptions(build_jobs=2)
+    suites = [
+        test_result.TestSuite(env_name, test_name)
+        for env_name, test_name in (
+            ("native", "test_a"),
+            ("native", "test_b"),
+            ("native", "test_c"),
+            ("remote", "test_broken"),
+            ("remote", "test_d"),
+        )
+    ]
+    result = test_result.TestResult("/project")
+    for suite in suites:
+        result.add_suite(suite)
+    runners = [NativeRunner(suite, project_config, options) for suite in suites]
+    test_cli.process_test_suites_in_parallel(runners, "/project", None, jobs=4)
+    output = capsys.readouterr().out
+
+    # the primary suite of each environment is built before the rest ones
+    for env_name, primary in (("native", "test_a"), ("remote", "test_broken")):
+        env_events = [e for e in events if e[1] == env_name]
+        assert env_events[:2] == [
+            ("build", env_name, primary),
+            ("built", env_name, primary),
+        ]
+    # the objects of a failed primary build are not shared
+    assert shared_build_dirs == {
+        "test_a": None,
+        "test_b": os.path.join(runners[0].build_dir, "test_shared"),
+        "test_c": os.path.join(runners[0].build_dir, "test_shared"),
+        "test_broken": None,
+        "test_d": None,
+    }
+
+    # the buffered output of each suite is printed as a whole
+    for suite in suites:
+        if suite.test_name == "test_broken":
+            continue
+        header = "Processing %s in %s environment" % (suite.test_name, suite.env_name)
+        block = output[output.index(header) :].split("Processing ")[1]
+        assert [line for line in block.splitlines() if " line " in line] == [
+            "%s line %d" % (suite.test_name, number) for number in range(3)
+        ]
+    # the build output is printed for a failed build only
+    assert "build test_broken\nBuilding stage has failed" in output
+    assert "build test_a" not in output
+
+    # the suites report to the same result
+    assert result.get_status_nums(test_result.TestStatus.PASSED) == 4
+    assert result.get_status_nums(test_result.TestStatus.ERRORED) == 1
+    assert all(suite.is_finished() for suite in result.suites)
@@ -0,0 +1,113 @@
+import sqlite3
+from collections import OrderedDict
+
+import pytest
+
+from qio import cache
+from qio.cache import ContentCache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "get_project_cache_dir", lambda: str(tmp_path))
+    monkeypatch.setattr("qio.app.get_setting", lambda name: True)
+    return tmp_path
+
+
+def _query(cc, sql):
+    with sqlite3.connect(cc._db_path) as conn:  # pylint: disable=protected-access
+        return conn.execute(sql).fetchall()
+
+
+def test_content_cache(cache_dir):  # pylint: disable=redefined-outer-name
+    with ContentCache("test") as cc:
+        assert cc.cache_dir == str(cache_dir / "test")
+        assert cc.get("foo") is None
+        assert cc.set("foo", "bar", "1h")
+        assert cc.get("foo") == "bar"
+        assert cc.set("foo", "baz", "1h")
+        assert cc.get("foo") == "baz"
+        # empty data removes an item
+        assert not cc.set("foo", "", "1h")
+        assert cc.get("foo") is None
+        assert cc.set("foo", "bar", "1h")
+        assert cc.delete("foo")
+        assert cc.get("foo") is None
+
+    # the expired items
+    with ContentCache("test") as cc:
+        cc.set("expired", "data", "1s")
+        cc.set("alive", "data", "1d")
+    with sqlite3.connect(str(cache_dir / "test" / ContentCache.DB_NAME)) as conn:
+        conn.execute("UPDATE items SET expire = 0 WHERE key = 'expired'")
+    with ContentCache("test") as cc:
+        assert cc.get("expired") is None
+        assert cc.delete()
+        assert [row[0] for row in _query(cc, "SELECT key FROM items")] == ["alive"]
+        assert _query(cc, "SELECT value FROM meta WHERE name = 'size'") == [(4,)]
+
+
+def test_content_cache_eviction(cache_dir, monkeypatch):
+    # pylint: disable=redefined-outer-name,unused-argument
+    monkeypatch.setattr(ContentCache, "MAX_SIZE", 100)
+    now = [1000000]
+    monkeypatch.setattr(cache, "time", lambda: now[0])
+    with ContentCache("test") as cc:
+        for index in range(5):
+            now[0] += 1
+            assert cc.set("item%d" % index, "x" * 30, "1h")
+        # a total size is kept in sync with the items
+        assert _query(cc, "SELECT value FROM meta WHERE name = 'size'") == _query(
+            cc, "SELECT SUM(size) FROM items"
+        )
+        assert _query(cc, "SELECT SUM(size) FROM items") == [(90,)]
+        assert [row[0] for row in _query(cc, "SELECT key FROM items ORDER BY key")] == [
+            "item2",
+            "item3",
+            "item4",
+        ]
+
+
+def test_content_cache_access_time(cache_dir):
+    # pylint: disable=redefined-outer-name,unused-argument
+    with ContentCache("test") as cc:
+        cc.set("foo", "bar", "1h")
+        conn = cc._get_connection()  # pylint: disable=protected-access
+        conn.execute("UPDATE items SET accessed = 1")
+        statements = []
+        conn.set_trace_callback(statements.append)
+
+        # a stale access time is updated once
+        assert cc.get("foo") == "bar"
+        assert cc.get("foo") == "bar"
+        assert len([s for s in statements if s.startswith("UPDATE")]) == 1
+        assert _query(cc, "SELECT accessed FROM items")[0][0] > 1
+
+
+def test_content_cache_memory_layer(cache_dir, monkeypatch):
+    # pylint: disable=redefined-outer-name,unused-argument,protected-access
+    monkeypatch.setattr(ContentCache, "MEMORY_MAX_ITEMS", 3)
+    monkeypatch.setattr(ContentCache, "_MEMORY_ITEMS", OrderedDict())
+    now = [1000000]
+    monkeypatch.setattr(cache, "time", lambda: now[0])
+    with ContentCache("test", memory_layer=True) as cc:
+        for index in range(3):
+            cc.set("item%d" % index, "data%d" % index, "1h")
+        # the least recently used item is dropped
+        assert cc.get("item0") == "data0"
+        cc.set("item3", "data3", "1h")
+        assert [key[1] for key in ContentCache._MEMORY_ITEMS] == [
+            "item2",
+            "item0",
+            "item3",
+        ]
+        # the expired items are dropped first
+        cc.set("short", "data", "1s")
+        assert len(ContentCache._MEMORY_ITEMS) == 3
+        now[0] += 2
+        assert cc.get("short") is None
+        assert len(ContentCache._MEMORY_ITEMS) == 2
+        now[0] += 3600
+        cc.set("item4", "data4", "1h")
+        cc.set("item5", "data5", "1h")
+        assert [key[1] for key in ContentCache._MEMORY_ITEMS] == ["item4", "item5"]
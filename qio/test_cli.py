@@ -0,0 +1,75 @@
+import json
+import subprocess
+import sys
+
+from qio.cli import PlatformioCLI
+from qio.clicommands import COMMANDS
+
+# modules executed on every CLI invocation before a command
+STARTUP_MODULES = ("qio.__main__", "qio.maintenance")
+HEAVY_MODULES = ("requests", "semantic_version", "tabulate", "SCons", "asyncio")
+# a startup budget relative to a bare `import click` (about 4x when measured)
+STARTUP_IMPORT_TIME_FACTOR = 10
+
+
+def get_import_time(*modules, attempts=3):
+    """The best cumulative import time of modules in microseconds"""
+    timings = []
+    for _ in range(attempts):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                "import %s" % ", ".join(modules),
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        total = 0
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            _, cumulative, name = line.split("|")
+            # the nested imports are indented and included in a cumulative time
+            if name.strip() in modules and not name.startswith("  "):
+                total += int(cumulative)
+        timings.append(total)
+    return min(timings)
+
+
+def test_commands_registry():
+    # regenerate using `python -m qio.cli`
+    assert PlatformioCLI(name="pio").discover_commands() == COMMANDS
+    for name in ("run", "pkg", "lib", "org"):
+        assert name in PlatformioCLI(name="pio").list_commands(None)
+
+
+def test_startup_imports():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import json, sys; import %s; print(json.dumps(sorted(sys.modules)))"
+            % ", ".join(STARTUP_MODULES),
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    imported = json.loads(result.stdout)
+    assert not [name for name in imported if name.split(".")[0] in HEAVY_MODULES]
+
+
+def test_startup_import_time():
+    click_time = get_import_time("click")
+    startup_time = get_import_time(*STARTUP_MODULES)
+    assert 0 < click_time < startup_time
+    assert (
+        startup_time < click_time * STARTUP_IMPORT_TIME_FACTOR
+    ), "startup imports take %d us, a bare `import click` takes %d us" % (
+        startup_time,
+        click_time,
+    )
@@ -0,0 +1,39 @@
+import os
+
+from qio import fs
+
+
+def test_match_src_files(tmpdir):
+    src_dir = tmpdir.mkdir("src")
+    src_dir.join("main.cpp").write("")
+    src_dir.join("main.h").write("")
+    src_dir.join(".hidden.c").write("")
+    src_dir.mkdir("utility").join("util.c").write("")
+    src_dir.join("utility").join("asm.S").write("")
+    src_dir.mkdir("examples").join("demo.cpp").write("")
+    src_dir.mkdir(".git").join("hook.c").write("")
+
+    src_filter = ["+<*>", "-<.git%s>" % os.sep, "-<examples%s>" % os.sep]
+    src_index = fs.SourceTreeIndex(str(src_dir))
+    expected = [
+        "main.cpp",
+        os.path.join("utility", "asm.S"),
+        os.path.join("utility", "util.c"),
+    ]
+    assert (
+        fs.match_src_files(
+            str(src_dir), src_filter, ["c", "cpp", "S"], src_index=src_index
+        )
+        == expected
+    )
+    assert fs.match_src_files(str(src_dir), "+<**/*.c> -<utility%s>" % os.sep) == []
+    assert fs.match_src_files(str(src_dir), "+<*.h> +<utility/*.c>") == [
+        "main.h",
+        os.path.join("utility", "util.c"),
+    ]
+
+    # index is refreshed when a tree was changed
+    src_dir.join("generated.cpp").write("")
+    assert "generated.cpp" in fs.match_src_files(
+        str(src_dir), src_filter, ["cpp"], src_index=src_index
+    )
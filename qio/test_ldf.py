@@ -0,0 +1,40 @@
+import os
+
+from qio.builder.tools.piolib import IncludeGraphCache
+
+
+def test_include_graph_cache(tmp_path):
+    include_dir = tmp_path / "include"
+    (include_dir / "sub").mkdir(parents=True)
+    (include_dir / "sub" / "a.h").write_text("#pragma once\n")
+    (tmp_path / "src").mkdir()
+    src_file = tmp_path / "src" / "main.cpp"
+    src_file.write_text('#include "sub/a.h"\n#include "sub/b.h"\n')
+    cache_path = str(tmp_path / "ldf.cache.json")
+    includes = [str(include_dir / "sub" / "a.h")]
+
+    cache = IncludeGraphCache(cache_path)
+    context = cache.get_context([str(include_dir)], "chain")
+    assert cache.get(context, str(src_file)) is None
+    cache.set(context, str(src_file), includes)
+    cache.save()
+
+    cache = IncludeGraphCache(cache_path)
+    context = cache.get_context([str(include_dir)], "chain")
+    assert cache.get(context, str(src_file)) == includes
+
+    # a changed dependency
+    (include_dir / "sub" / "a.h").write_text("#pragma once\n#define A\n")
+    cache = IncludeGraphCache(cache_path)
+    context = cache.get_context([str(include_dir)], "chain")
+    assert cache.get(context, str(src_file)) is None
+    cache.set(context, str(src_file), includes)
+    cache.save()
+
+    # a new header in a nested directory of the include dir
+    (include_dir / "sub" / "b.h").write_text("#pragma once\n")
+    sub_dir = str(include_dir / "sub")
+    os.utime(sub_dir, (os.path.getatime(sub_dir), os.path.getmtime(sub_dir) + 10))
+    cache = IncludeGraphCache(cache_path)
+    context = cache.get_context([str(include_dir)], "chain")
+    assert cache.get(context, str(src_file)) is None
@@ -1,4 +1,3 @@
-
 import json
 import os
 import re
@@ -14,21 +13,24 @@ def test_check_pio_upgrade(clirunner, isolated_pio_core, validate_cliresult):
         maintenance.__version__ = version
         cmd_upgrade.VERSION = version.split(".", 3)
 
-    interval = int(app.get_setting("check_platformio_interval")) * 3600 * 24
-    last_check = {"platformio_upgrade": time() - interval - 1}
     origin_version = maintenance.__version__
 
     # check development version
     _patch_pio_version("3.0.0-a1")
-    app.set_state_item("last_check", last_check)
+    # a job of the background maintenance worker
+    maintenance.run_maintenance_jobs(["platformio_upgrade"])
     result = clirunner.invoke(cli_pio, ["platform", "list"])
     validate_cliresult(result)
     assert "There is a new version" in result.output
     assert "Please upgrade" in result.output
+    # a notice is shown once
+    result = clirunner.invoke(cli_pio, ["platform", "list"])
+    validate_cliresult(result)
+    assert "There is a new version" not in result.output
 
     # check stable version
     _patch_pio_version("2.11.0")
-    app.set_state_item("last_check", last_check)
+    maintenance.run_maintenance_jobs(["platformio_upgrade"])
     result = clirunner.invoke(cli_pio, ["platform", "list"])
     validate_cliresult(result)
     assert "There is a new version" in result.output
@@ -38,6 +40,30 @@ def test_check_pio_upgrade(clirunner, isolated_pio_core, validate_cliresult):
     _patch_pio_version(origin_version)
 
 
+def test_schedule_maintenance_jobs(isolated_pio_core, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        maintenance,
+        "update_platformio_core_packages",
+        lambda: calls.append("update_core_packages"),
+    )
+    monkeypatch.setattr(maintenance, "start_maintenance_worker", calls.append)
+    app.set_state_item("last_check", {"platformio_upgrade": 1, "prune_system": 1})
+    assert maintenance.schedule_maintenance_jobs() == [
+        "platformio_upgrade",
+        "prune_system",
+    ]
+    # the core packages are not updated by the detached worker
+    assert calls == [
+        "update_core_packages",
+        ["platformio_upgrade", "prune_system"],
+    ]
+    # the jobs are not due anymore
+    calls.clear()
+    assert not maintenance.schedule_maintenance_jobs()
+    assert not calls
+
+
 def test_check_lib_updates(clirunner, isolated_pio_core, validate_cliresult):
     # install obsolete library
     result = clirunner.invoke(cli_pio, ["lib", "-g", "install", "ArduinoJson@<6.13"])
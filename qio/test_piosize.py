@@ -0,0 +1,125 @@
+import shutil
+import subprocess
+
+import pytest
+from elftools.elf.constants import SH_FLAGS
+from elftools.elf.elffile import ELFFile
+
+from qio.builder.tools.piosize import (
+    DwarfLineIndex,
+    _build_section_intervals,
+    _determine_section,
+)
+
+
+def test_section_intervals():
+    def _section(start_addr, size, flags="AX", type_="SHT_PROGBITS"):
+        return dict(start_addr=start_addr, size=size, flags=flags, type=type_)
+
+    sections = {
+        ".text": _section(0x1000, 0x100),
+        # overlaps .text, the first section in ELF order owns a range
+        ".rodata": _section(0x1080, 0x100, flags="A"),
+        ".data": _section(0x2000, 0x10, flags="WA"),
+        ".bss": _section(0x2010, 0x20, flags="WA", type_="SHT_NOBITS"),
+        ".comment": _section(0x3000, 0x10, flags="MS"),
+        ".empty": _section(0x4000, 0),
+    }
+    intervals = _build_section_intervals(sections)
+    assert intervals[1] == [
+        (0x1000, 0x1100, ".text"),
+        (0x1100, 0x1180, ".rodata"),
+        (0x2000, 0x2010, ".data"),
+        (0x2010, 0x2030, ".bss"),
+    ]
+    for addr, name in [
+        (0xFFF, "unknown"),
+        (0x1000, ".text"),
+        (0x10FF, ".text"),
+        (0x1100, ".rodata"),
+        (0x1180, "unknown"),
+        (0x200F, ".data"),
+        (0x2010, ".bss"),
+        (0x3000, "unknown"),
+        (0x4000, "unknown"),
+    ]:
+        assert _determine_section(intervals, addr) == name
+    assert _build_section_intervals({}) == ([], [])
+
+
+def test_dwarf_line_index_sequences():
+    sequences = [
+        # a section removed by a linker, relocated to 0
+        [(0x0, 0x10, "unused.c", 1), (0x10, 0x20, "unused.c", 2)],
+        [(0x1000, 0x1008, "main.c", 10), (0x1008, 0x1010, "main.c", 11)],
+        # outside the loaded sections
+        [(0x3000, 0x3010, "other.c", 5)],
+        [(0x2000, 0x2010, "lib.c", 20)],
+    ]
+    index = DwarfLineIndex(sequences, [(0x1000, 0x1100), (0x2000, 0x2010)])
+    assert len(index) == 3
+    assert index.lookup(0x8) is None
+    assert index.lookup(0x1004) == ("main.c", 10)
+    assert index.lookup(0x1008) == ("main.c", 11)
+    assert index.lookup(0x1010) is None
+    assert index.lookup(0x200F) == ("lib.c", 20)
+    assert index.lookup(0x3004) is None
+
+    # a flash which starts at 0, a vector table of MCU
+    index = DwarfLineIndex(sequences, [(0x0, 0x100), (0x1000, 0x1100)])
+    assert index.lookup(0x8) == ("unused.c", 1)
+    assert index.lookup(0x1004) == ("main.c", 10)
+    assert index.lookup(0x200F) is None
+
+
+def test_dwarf_line_index_loaded_ranges():
+    class DummyELFFile:
+        @staticmethod
+        def iter_sections():
+            return [
+                dict(sh_addr=0x0, sh_size=0xC0, sh_flags=SH_FLAGS.SHF_ALLOC),
+                dict(sh_addr=0xC0, sh_size=0x400, sh_flags=SH_FLAGS.SHF_ALLOC),
+                dict(sh_addr=0x0, sh_size=0x200, sh_flags=0),  # .debug_info
+                dict(sh_addr=0x800, sh_size=0, sh_flags=SH_FLAGS.SHF_ALLOC),
+            ]
+
+    # pylint: disable=protected-access
+    assert DwarfLineIndex._get_loaded_ranges(DummyELFFile()) == [
+        (0x0, 0xC0),
+        (0xC0, 0x4C0),
+    ]
+
+
+@pytest.mark.skipif(not shutil.which("gcc"), reason="GCC is not installed")
+def test_dwarf_line_index_gc_sections(tmp_path):
+    src_path = tmp_path / "main.c"
+    src_path.write_text(
+        "int unused_func(int x) { return x * 3 + 1; }\n"
+        "int used_func(int x) { return x + 2; }\n"
+        "int main(void) { return used_func(1); }\n"
+    )
+    elf_path = tmp_path / "program"
+    subprocess.run(
+        [
+            "gcc",
+            "-g",
+            "-O0",
+            "-ffunction-sections",
+            "-Wl,--gc-sections",
+            "-o",
+            str(elf_path),
+            str(src_path),
+        ],
+        check=True,
+    )
+    with open(elf_path, "rb") as fp:
+        elffile = ELFFile(fp)
+        index = DwarfLineIndex.from_elffile(elffile)
+        symbols = {
+            s.name: s["st_value"]
+            for s in elffile.get_section_by_name(".symtab").iter_symbols()
+        }
+    assert "unused_func" not in symbols
+    assert index.lookup(symbols["used_func"]) == (str(src_path), 2)
+    assert index.lookup(symbols["main"]) == (str(src_path), 3)
+    assert index.lookup(0) is None
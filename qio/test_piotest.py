@@ -0,0 +1,147 @@
+import json
+import os
+
+from SCons.Environment import Environment  # pylint: disable=import-error
+
+from qio.builder.tools import piotest
+
+
+class DummyNode:
+    def __init__(self, path):
+        self.path = path
+
+    def get_abspath(self):
+        return self.path
+
+
+class DummyEnv:
+    def __init__(self, shared_objects, build_hash):
+        self.shared_objects = shared_objects
+        self.build_hash = build_hash
+        self.built = []
+
+    def get(self, name, default=None):  # pylint: disable=unused-argument
+        return default
+
+    def ProcessUnFlags(self, flags):  # pylint: disable=invalid-name
+        pass
+
+    def GetTestSharedBuildHash(self):  # pylint: disable=invalid-name
+        return self.build_hash
+
+    def GetTestSharedObjects(self):  # pylint: disable=invalid-name
+        return self.shared_objects
+
+    def File(self, path):  # pylint: disable=invalid-name
+        return DummyNode(path)
+
+    def BuildLibrary(  # pylint: disable=invalid-name
+        self, variant_dir, src_dir, src_filter=None, nodes=None
+    ):
+        assert src_dir is None and src_filter is None
+        self.built.append((variant_dir, nodes))
+        return DummyNode(os.path.join(variant_dir, "libfoo.a"))
+
+    @staticmethod
+    def Flatten(items):  # pylint: disable=invalid-name
+        return list(items)
+
+
+def new_build_env(build_dir, cpppath=None):
+    return Environment(
+        tools=[],
+        CC="gcc",
+        INCPREFIX="-I",
+        INCSUFFIX="",
+        BUILD_DIR=build_dir,
+        UNITY_CONFIG_DIR=os.path.join("$BUILD_DIR", "unity_config"),
+        CPPPATH=(cpppath or []) + ["$UNITY_CONFIG_DIR"],
+    )
+
+
+def test_shared_build_hash(tmp_path):
+    env_1 = new_build_env(str(tmp_path / "suite-1"))
+    env_2 = new_build_env(str(tmp_path / "suite-2"))
+    assert env_1.subst("$_CPPINCFLAGS") != env_2.subst("$_CPPINCFLAGS")
+    # the Unity config of a suite build dir does not change the hash
+    assert piotest.GetTestSharedBuildHash(env_1) == piotest.GetTestSharedBuildHash(
+        env_2
+    )
+    env_3 = new_build_env(str(tmp_path / "suite-1"), cpppath=["/custom/include"])
+    assert piotest.GetTestSharedBuildHash(env_3) != piotest.GetTestSharedBuildHash(
+        env_1
+    )
+
+
+def test_shared_objects(tmp_path, monkeypatch):
+    build_failures = []
+    monkeypatch.setattr(piotest, "GetBuildFailures", lambda: build_failures)
+    primary_dir = tmp_path / "primary"
+    suite_dir = tmp_path / "suite"
+    objects = [tmp_path / "main.o", tmp_path / "util.o"]
+    for path in objects:
+        path.write_text("")
+
+    primary = piotest.TestSharedObjects(str(primary_dir))
+    # nothing is saved if no objects were built
+    primary.save()
+    assert not os.path.exists(primary.path)
+    primary.add("src:abc", "abc", [DummyNode(str(path)) for path in objects])
+    primary.add("lib:missing", "abc", [DummyNode(str(tmp_path / "missing.o"))])
+    primary.save()
+    with open(primary.path, encoding="utf8") as fp:
+        # the items with a missing object are not saved
+        assert list(json.load(fp)["items"]) == ["src:abc"]
+
+    shared = piotest.TestSharedObjects(str(suite_dir), str(primary_dir))
+    assert shared.get_prebuilt("src:abc", "abc") == [str(path) for path in objects]
+    assert shared.get_prebuilt("src:abc", "other-hash") is None
+    assert shared.get_prebuilt("lib:missing", "abc") is None
+    assert shared.get_prebuilt("lib:unknown", "abc") is None
+    # a primary suite does not link its own objects
+    assert not piotest.TestSharedObjects(
+        str(primary_dir), str(primary_dir)
+    ).get_prebuilt("src:abc", "abc")
+
+    # an object removed since the primary build
+    objects[1].unlink()
+    assert shared.get_prebuilt("src:abc", "abc") is None
+
+    # a manifest of an incompatible version
+    with open(primary.path, mode="w", encoding="utf8") as fp:
+        json.dump(dict(version=0, items={}), fp)
+    assert not piotest.TestSharedObjects(str(primary_dir)).get_prebuilt(
+        "src:abc", "abc"
+    )
+
+    # a failed build removes the manifest
+    build_failures.append("failure")
+    primary.add("src:abc", "abc", [DummyNode(str(objects[0]))])
+    primary.save()
+    assert not os.path.exists(primary.path)
+
+
+def test_shared_library(tmp_path, monkeypatch):
+    monkeypatch.setattr(piotest, "GetBuildFailures", lambda: [])
+    primary_dir = tmp_path / "primary"
+    nodes = [DummyNode(str(tmp_path / "foo.o"))]
+
+    env = DummyEnv(piotest.TestSharedObjects(str(primary_dir)), "abc")
+    library = piotest.BuildTestSharedLibrary(env, "/lib/foo", str(tmp_path), nodes)
+    assert env.built == [(str(tmp_path), nodes)]
+    (tmp_path / "libfoo.a").write_text("")
+    env.shared_objects.save()
+
+    # a suite links the library built by the primary suite
+    shared_objects = piotest.TestSharedObjects(
+        str(tmp_path / "suite"), str(primary_dir)
+    )
+    env = DummyEnv(shared_objects, "abc")
+    prebuilt = piotest.BuildTestSharedLibrary(env, "/lib/foo", "/suite/foo", nodes)
+    assert not env.built
+    assert [node.path for node in prebuilt] == [library.path]
+
+    # another compiler configuration
+    env = DummyEnv(shared_objects, "other-hash")
+    piotest.BuildTestSharedLibrary(env, "/lib/foo", "/suite/foo", nodes)
+    assert env.built == [("/suite/foo", nodes)]
@@ -0,0 +1,154 @@
+import json
+import os
+import time
+from hashlib import sha1
+
+import pytest
+
+from qio import __version__, fs
+from qio.compat import IS_WINDOWS, hashlib_encode_data
+from qio.project import helpers
+from qio.project.config import ProjectConfig
+from qio.run.helpers import clean_build_dir
+
+
+def baseline_project_checksum(config):
+    """The full scan of a project without a manifest"""
+    checksum = sha1(hashlib_encode_data(__version__))
+    checksum.update(hashlib_encode_data(config.to_json()))
+    for d in (
+        config.get("platformio", "include_dir"),
+        config.get("platformio", "src_dir"),
+        config.get("platformio", "lib_dir"),
+    ):
+        chunks = []
+        for root, _, files in os.walk(d):
+            for name in files:
+                if name.endswith(helpers.PROJECT_CHECKSUM_SUFFIXES):
+                    chunks.append(os.path.join(root, name))
+        if not chunks:
+            continue
+        chunks_to_str = ",".join(sorted(chunks))
+        if IS_WINDOWS:
+            chunks_to_str = chunks_to_str.lower()
+        checksum.update(hashlib_encode_data(chunks_to_str))
+    return checksum.hexdigest()
+
+
+def backdate_dirs(root):
+    mtime = time.time() - helpers.PROJECT_MANIFEST_RACY_PERIOD * 10
+    for path, _, _ in os.walk(root):
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    for name in (
+        "src/main.cpp",
+        "src/nested/util.cpp",
+        "src/readme.txt",
+        "include/config.h",
+        "lib/foo/src/foo.cpp",
+        "lib/foo/src/foo.h",
+    ):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text("// %s\n" % name)
+    (tmp_path / "platformio.ini").write_text("[env:native]\nplatform = native\n")
+    with fs.cd(str(tmp_path)):
+        yield tmp_path
+
+
+def test_incremental_checksum(project_dir, monkeypatch):
+    # pylint: disable=redefined-outer-name
+    config = ProjectConfig(str(project_dir / "platformio.ini"))
+    scanned_dirs = []
+    scan_project_dir = helpers._scan_project_dir  # pylint: disable=protected-access
+
+    def _scan(path):
+        scanned_dirs.append(os.path.relpath(path, str(project_dir)))
+        return scan_project_dir(path)
+
+    monkeypatch.setattr(helpers, "_scan_project_dir", _scan)
+
+    def _check(manifest):
+        full_checksum = helpers.compute_project_checksum(config)
+        assert full_checksum == baseline_project_checksum(config)
+        del scanned_dirs[:]
+        checksum = helpers.compute_project_checksum(config, manifest)
+        assert checksum == full_checksum
+        return checksum
+
+    backdate_dirs(str(project_dir))
+    manifest = {}
+    checksum = _check(manifest)
+    assert len(scanned_dirs) == 6
+    # the unchanged directories are not scanned again
+    assert _check(manifest) == checksum
+    assert not scanned_dirs
+    # a manifest survives a JSON round trip
+    manifest = json.loads(json.dumps(manifest))
+    assert _check(manifest) == checksum
+    assert not scanned_dirs
+
+    # an added file
+    (project_dir / "src" / "nested" / "added.c").write_text("int a;\n")
+    added_checksum = _check(manifest)
+    assert added_checksum != checksum
+    assert scanned_dirs == [os.path.join("src", "nested")]
+
+    # a renamed file
+    os.rename(
+        str(project_dir / "src" / "nested" / "added.c"),
+        str(project_dir / "src" / "nested" / "renamed.c"),
+    )
+    assert _check(manifest) not in (checksum, added_checksum)
+
+    # a removed file restores the original structure
+    os.remove(str(project_dir / "src" / "nested" / "renamed.c"))
+    assert _check(manifest) == checksum
+
+    # an added, renamed and removed directory
+    (project_dir / "lib" / "bar").mkdir()
+    (project_dir / "lib" / "bar" / "bar.cpp").write_text("int bar;\n")
+    added_checksum = _check(manifest)
+    assert added_checksum != checksum
+    os.rename(str(project_dir / "lib" / "bar"), str(project_dir / "lib" / "baz"))
+    assert _check(manifest) not in (checksum, added_checksum)
+    fs.rmtree(str(project_dir / "lib" / "baz"))
+    assert _check(manifest) == checksum
+
+    # a non-source file is not a part of the structure
+    (project_dir / "src" / "notes.md").write_text("notes\n")
+    assert _check(manifest) == checksum
+
+
+def test_explain_clean(project_dir, capsys):
+    # pylint: disable=redefined-outer-name
+    config = ProjectConfig(str(project_dir / "platformio.ini"))
+    build_dir = str(project_dir / ".pio" / "build")
+
+    clean_build_dir(build_dir, config, explain=True)
+    assert "does not exist, nothing to clean" in capsys.readouterr().out
+    clean_build_dir(build_dir, config, explain=True)
+    assert "is up-to-date" in capsys.readouterr().out
+
+    (project_dir / "src" / "added.cpp").write_text("int added;\n")
+    os.remove(str(project_dir / "include" / "config.h"))
+    clean_build_dir(build_dir, config, explain=True)
+    output = capsys.readouterr().out
+    assert "Removing build directory" in output
+    assert "Added source file `%s`" % (project_dir / "src" / "added.cpp") in output
+    assert "Removed source file `%s`" % (project_dir / "include" / "config.h") in output
+
+    config.set("env:native", "build_flags", "-DCHANGED")
+    clean_build_dir(build_dir, config, explain=True)
+    assert "Project configuration has been changed" in capsys.readouterr().out
+
+    os.remove(os.path.join(build_dir, "project.checksum"))
+    clean_build_dir(build_dir, config, explain=True)
+    assert "The project checksum file is missing" in capsys.readouterr().out
+
+    os.remove(os.path.join(build_dir, "project.manifest.json"))
+    (project_dir / "src" / "other.cpp").write_text("int other;\n")
+    clean_build_dir(build_dir, config, explain=True)
+    assert "The previous project structure is unknown" in capsys.readouterr().out
@@ -1,8 +1,11 @@
+import configparser
+import json
 import os
+import time
 
 import pytest
 
-from qio.project.config import ConfigParser, ProjectConfig
+from qio.project.config import ProjectConfig
 from qio.project.exception import InvalidProjectConfError, UnknownEnvNamesError
 
 BASE_CONFIG = """
@@ -122,7 +125,7 @@ def test_defaults(config):
 
 
 def test_sections(config):
-    with pytest.raises(ConfigParser.NoSectionError):
+    with pytest.raises(configparser.NoSectionError):
         config.getraw("unknown_section", "unknown_option")
 
     assert config.sections() == [
@@ -175,15 +178,15 @@ def test_has_option(config):
     assert config.has_option("env:test_extends", "lib_compat_mode")
 
 
-def test_sysenv_options(config):
+def test_sysenv_options(config, monkeypatch):
     assert config.getraw("custom", "extra_flags") == ""
     assert config.get("env:base", "build_flags") == ["-D DEBUG=1"]
     assert config.get("env:base", "upload_port") is None
     assert config.get("env:extra_2", "upload_port") == "/dev/extra_2/port"
-    os.environ["PLATFORMIO_BUILD_FLAGS"] = "-DSYSENVDEPS1 -DSYSENVDEPS2"
-    os.environ["PLATFORMIO_BUILD_UNFLAGS"] = "-DREMOVE_MACRO"
-    os.environ["PLATFORMIO_UPLOAD_PORT"] = "/dev/sysenv/port"
-    os.environ["__PIO_TEST_CNF_EXTRA_FLAGS"] = "-L /usr/local/lib"
+    monkeypatch.setenv("PLATFORMIO_BUILD_FLAGS", "-DSYSENVDEPS1 -DSYSENVDEPS2")
+    monkeypatch.setenv("PLATFORMIO_BUILD_UNFLAGS", "-DREMOVE_MACRO")
+    monkeypatch.setenv("PLATFORMIO_UPLOAD_PORT", "/dev/sysenv/port")
+    monkeypatch.setenv("__PIO_TEST_CNF_EXTRA_FLAGS", "-L /usr/local/lib")
     assert config.get("custom", "extra_flags") == "-L /usr/local/lib"
     assert config.get("env:base", "build_flags") == [
         "-D DEBUG=1 -L /usr/local/lib",
@@ -209,23 +212,16 @@ def test_sysenv_options(config):
     ]
 
     # sysenv
-    os.environ["PLATFORMIO_HOME_DIR"] = "/custom/core/dir"
+    monkeypatch.setenv("PLATFORMIO_HOME_DIR", "/custom/core/dir")
     assert config.get("platformio", "core_dir") == "/custom/core/dir"
 
-    # cleanup system environment variables
-    del os.environ["PLATFORMIO_BUILD_FLAGS"]
-    del os.environ["PLATFORMIO_BUILD_UNFLAGS"]
-    del os.environ["PLATFORMIO_UPLOAD_PORT"]
-    del os.environ["__PIO_TEST_CNF_EXTRA_FLAGS"]
-    del os.environ["PLATFORMIO_HOME_DIR"]
-
 
 def test_getraw_value(config):
     # unknown option
-    with pytest.raises(ConfigParser.NoOptionError):
+    with pytest.raises(configparser.NoOptionError):
         config.getraw("custom", "unknown_option")
     # unknown option even if exists in [env]
-    with pytest.raises(ConfigParser.NoOptionError):
+    with pytest.raises(configparser.NoOptionError):
         config.getraw("platformio", "monitor_speed")
 
     # default
@@ -259,6 +255,75 @@ def test_get_value(config):
     assert config.get("env:base", "build_flags") == ["-D DEBUG=1"]
 
 
+def test_resolved_values_cache(tmpdir_factory, monkeypatch):
+    tmpdir = tmpdir_factory.mktemp("project")
+    tmpdir.join("platformio.ini").write(BASE_CONFIG)
+    project_config = ProjectConfig(tmpdir.join("platformio.ini").strpath)
+
+    # a resolved value is invalidated by its dependencies
+    assert project_config.get("env:base", "build_flags") == ["-D RELEASE"]
+    assert project_config.get("env:test_extends", "monitor_speed") == 115200
+    project_config.set("custom", "debug_flags", "-D DEBUG=2")
+    assert project_config.get("env:base", "build_flags") == ["-D DEBUG=2"]
+    project_config.set("env", "custom_monitor_speed", "57600")
+    assert project_config.get("env:test_extends", "monitor_speed") == 57600
+    project_config.set("strict_ldf", "lib_compat_mode", "soft")
+    assert project_config.get("env:test_extends", "lib_compat_mode") == "soft"
+    assert project_config.get("env:test_extends", "lib_ldf_mode") == "chain+"
+    project_config.remove_option("strict_ldf", "lib_ldf_mode")
+    assert project_config.get("env:test_extends", "lib_ldf_mode") == "chain"
+    # a cached value can not be modified by a caller
+    project_config.get("env:base", "build_flags").append("-D EXTRA")
+    assert project_config.get("env:base", "build_flags") == ["-D DEBUG=2"]
+
+    # the cached values are not resolved again
+    resolved = []
+    original_get = ProjectConfig._get  # pylint: disable=protected-access
+
+    def _get(self, section, option, *args, **kwargs):
+        resolved.append((section, option))
+        return original_get(self, section, option, *args, **kwargs)
+
+    monkeypatch.setattr(ProjectConfig, "_get", _get)
+
+    def _resolve_envs():
+        del resolved[:]
+        for env in project_config.envs():
+            project_config.items(env=env)
+        return list(resolved)
+
+    project_config._invalidate()  # pylint: disable=protected-access
+    assert _resolve_envs()
+    assert not _resolve_envs()
+    project_config.set("custom", "debug_flags", "-D DEBUG=3")
+    assert ("env:base", "build_flags") in _resolve_envs()
+
+
+def test_snapshot(tmpdir_factory):
+    tmpdir = tmpdir_factory.mktemp("project")
+    tmpdir.join("platformio.ini").write(BASE_CONFIG)
+    project_config = ProjectConfig(tmpdir.join("platformio.ini").strpath)
+    for env in project_config.envs():
+        project_config.items(env=env)
+    data = json.loads(json.dumps(project_config.to_snapshot()))
+
+    restored = ProjectConfig.from_snapshot(data)
+    assert restored.path == project_config.path
+    assert restored.warnings == project_config.warnings
+    assert restored.as_tuple() == project_config.as_tuple()
+    for env in project_config.envs():
+        assert restored.items(env=env) == project_config.items(env=env)
+    # the resolved values are restored and are still invalidated by a change
+    assert restored._cache  # pylint: disable=protected-access
+    restored.set("custom", "debug_flags", "-D DEBUG=2")
+    assert restored.get("env:base", "build_flags") == ["-D DEBUG=2"]
+
+    # a modified configuration file is parsed again
+    mtime = os.path.getmtime(project_config.path)
+    os.utime(project_config.path, (mtime + 10, mtime + 10))
+    assert ProjectConfig.from_snapshot(data) is None
+
+
 def test_items(config):
     assert config.items("custom") == [
         ("debug_flags", "-D DEBUG=1"),
@@ -430,3 +495,31 @@ def test_dump(tmpdir_factory):
         ),
         ("env:test_extends", [("extends", ["strict_settings"])]),
     ]
+
+
+def test_resolved_values_cache_benchmark(tmpdir_factory, capsys):
+    tmpdir = tmpdir_factory.mktemp("project")
+    tmpdir.join("platformio.ini").write(BASE_CONFIG)
+    project_config = ProjectConfig(tmpdir.join("platformio.ini").strpath)
+
+    def _measure(cached, number=50):
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            for _ in range(number):
+                if not cached:
+                    project_config._invalidate()  # pylint: disable=protected-access
+                for env in project_config.envs():
+                    project_config.items(env=env)
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    uncached = _measure(cached=False)
+    cached = _measure(cached=True)
+    with capsys.disabled():
+        print(
+            "\nitems(env=...): uncached %.1f ms, cached %.1f ms, x%.1f"
+            % (uncached * 1000, cached * 1000, uncached / cached)
+        )
+    # a loose bound, the cache hits skip the interpolations and extends
+    assert uncached > cached * 2
@@ -0,0 +1,115 @@
+import json
+import os
+
+import pytest
+
+from qio import fs
+from qio.builder.tools import pioproject
+from qio.platform.factory import PlatformFactory
+from qio.project.config import ProjectConfig
+
+
+def backdate(path, seconds=100):
+    mtime = os.path.getmtime(path) - seconds
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def project_dir(tmp_path, monkeypatch):
+    core_dir = tmp_path / "core"
+    monkeypatch.setenv("PLATFORMIO_CORE_DIR", str(core_dir))
+    monkeypatch.setattr(ProjectConfig, "_instances", {})
+    pkg_dir = core_dir / "packages" / "tool-stub"
+    pkg_dir.mkdir(parents=True)
+    (pkg_dir / "package.json").write_text(
+        json.dumps(dict(name="tool-stub", version="1.2.3"))
+    )
+    platform_dir = tmp_path / "stubplatform"
+    (platform_dir / "boards").mkdir(parents=True)
+    (platform_dir / "platform.json").write_text(
+        json.dumps(dict(name="stubplatform", version="1.0.0", title="Stub"))
+    )
+    (platform_dir / "boards" / "stub_board.json").write_text(
+        json.dumps(
+            dict(
+                name="Stub Board",
+                url="https://example.com",
+                vendor="Stub",
+                build=dict(mcu="stub32"),
+            )
+        )
+    )
+    project_path = tmp_path / "project"
+    project_path.mkdir()
+    (project_path / "platformio.ini").write_text(
+        "[env:stub]\nplatform = %s\nboard = stub_board\nbuild_flags = -DSTUB\n"
+        % platform_dir
+    )
+    for path in (
+        str(pkg_dir.parent),
+        str(platform_dir / "boards" / "stub_board.json"),
+    ):
+        backdate(path)
+    with fs.cd(str(project_path)):
+        yield project_path
+    pioproject._LoadProjectSnapshot.reset()  # pylint: disable=protected-access
+
+
+def load_project_snapshot(path):
+    pioproject._LoadProjectSnapshot.reset()  # pylint: disable=protected-access
+    return pioproject._LoadProjectSnapshot(path)  # pylint: disable=protected-access
+
+
+def new_platform(path):
+    return PlatformFactory.new(str(path.parent / "stubplatform"))
+
+
+def test_project_snapshot_round_trip(project_dir):
+    # pylint: disable=redefined-outer-name,protected-access
+    config_path = str(project_dir / "platformio.ini")
+    snapshot_path = new_platform(project_dir).dump_project_snapshot("stub")
+    assert snapshot_path == os.path.join(
+        str(project_dir), ".pio", "build", "stub", "project.snapshot.json"
+    )
+
+    # a build process restores the resolved config instead of parsing it
+    ProjectConfig._instances.clear()
+    data = load_project_snapshot(snapshot_path)
+    assert data
+    config = ProjectConfig.get_instance(config_path)
+    assert ("env:stub", "build_flags") in [key[1:3] for key in config._cache]
+    assert config.get("env:stub", "build_flags") == ["-DSTUB"]
+    assert config.get("env:stub", "board") == "stub_board"
+
+    p = new_platform(project_dir)
+    p.apply_project_snapshot(data)
+    assert list(p._BOARDS_CACHE) == ["stub_board"]
+    assert p.board_config("stub_board").get("build.mcu") == "stub32"
+    installed = p.pm.memcache_get("get_installed")
+    assert [(pkg.metadata.name, str(pkg.metadata.version)) for pkg in installed] == [
+        ("tool-stub", "1.2.3")
+    ]
+    assert p.pm.get_installed() is installed
+
+
+def test_project_snapshot_invalidation(project_dir):
+    # pylint: disable=redefined-outer-name,protected-access
+    platform_dir = project_dir.parent / "stubplatform"
+    snapshot_path = new_platform(project_dir).dump_project_snapshot("stub")
+
+    # a modified board manifest is loaded again
+    backdate(str(platform_dir / "boards" / "stub_board.json"), 10)
+    p = new_platform(project_dir)
+    p.apply_project_snapshot(load_project_snapshot(snapshot_path))
+    assert not p._BOARDS_CACHE
+    assert p.pm.memcache_get("get_installed")
+
+    # a package installed or removed since the snapshot
+    backdate(p.pm.package_dir, 10)
+    p = new_platform(project_dir)
+    p.apply_project_snapshot(load_project_snapshot(snapshot_path))
+    assert p.pm.memcache_get("get_installed") is None
+
+    # a modified configuration file is parsed again
+    backdate(str(project_dir / "platformio.ini"), 10)
+    assert load_project_snapshot(snapshot_path) is None
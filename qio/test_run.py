@@ -0,0 +1,35 @@
+from qio.run.cli import cli as cmd_run
+
+
+def test_parallel_envs(clirunner, validate_cliresult, tmpdir):
+    tmpdir.join("platformio.ini").write(
+        """
+[env:first]
+platform = native
+build_flags = -DENV_NAME=1
+
+[env:second]
+platform = native
+build_flags = -DENV_NAME=2
+"""
+    )
+    tmpdir.mkdir("src").join("main.c").write(
+        """
+#ifndef ENV_NAME
+#error "ENV_NAME"
+#endif
+int main() { return 0; }
+"""
+    )
+
+    result = clirunner.invoke(
+        cmd_run, ["-d", str(tmpdir), "--parallel-envs", "2", "--jobs", "2"]
+    )
+    validate_cliresult(result)
+    # the workers print neither headers nor a summary
+    for env in ("first", "second"):
+        assert result.output.count("Processing %s" % env) == 1
+    assert result.output.count("SUCCESS") == 4
+    assert result.output.count("2 succeeded in") == 1
+    assert tmpdir.join(".pio", "build", "first", "program").check()
+    assert tmpdir.join(".pio", "build", "second", "program").check()
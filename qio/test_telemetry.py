@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from time import time
+from urllib.parse import parse_qsl
+
+from qio.telemetry import TelemetrySpool
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        self.server.batches.append([dict(parse_qsl(line)) for line in body.split("\n")])
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def test_spool_flush(tmp_path, monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), CollectorHandler)
+    server.batches = []
+    server.status = 200
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr("qio.app.get_setting", lambda name: True)
+    spool = TelemetrySpool(
+        path=str(tmp_path / "telemetry.spool"),
+        endpoint="http://127.0.0.1:%d/batch" % server.server_port,
+    )
+    try:
+        # an expired hit is not sent
+        hits = [dict(t="event", ea="Run", qt=time() - 5 * 3600)]
+        hits.extend(dict(t="screenview", cd="Run %d" % i, qt=time()) for i in range(25))
+        assert spool.append(hits)
+        assert spool.is_pending()
+        assert spool.flush() == 25
+        assert [len(batch) for batch in server.batches] == [20, 5]
+        assert server.batches[0][0]["cd"] == "Run 0"
+        assert int(server.batches[0][0]["qt"]) >= 0
+        assert not spool.is_pending()
+
+        # the unsent hits are returned to the spool, an endpoint is off-line
+        server.status = 500
+        spool.append(hits[1:3])
+        assert spool.flush() == 0
+        assert not spool.is_pending()
+        with open(spool.path, encoding="utf8") as fp:
+            assert len(fp.readlines()) == 2
+
+        # a worker is not started again until an interval passes
+        os.remove(spool.offline_marker_path)
+        assert not spool.is_pending()
+        flushed_time = time() - TelemetrySpool.FLUSH_INTERVAL - 1
+        os.utime(spool.flush_marker_path, (flushed_time, flushed_time))
+        assert spool.is_pending()
+        os.utime(spool.flush_marker_path)
+        monkeypatch.setattr(TelemetrySpool, "FLUSH_SIZE", 10)
+        assert spool.is_pending()
+
+        # the hits written to the taken spool are not lost
+        server.status = 200
+        with open(spool.path, mode="a", encoding="utf8") as late_fp:
+            send_batch = spool._send_batch  # pylint: disable=protected-access
+
+            def _send_batch(items):
+                late_fp.write(json.dumps(dict(hits[3], cd="Late")) + "\n")
+                late_fp.flush()
+                return send_batch(items)
+
+            monkeypatch.setattr(spool, "_send_batch", _send_batch)
+            assert spool.flush() == 2
+        with open(spool.path, encoding="utf8") as fp:
+            assert [json.loads(line)["cd"] for line in fp] == ["Late"]
+
+        # size cap
+        assert not spool.append([dict(t="event", ea="x" * TelemetrySpool.MAX_SIZE)])
+    finally:
+        server.shutdown()
+        server.server_close()
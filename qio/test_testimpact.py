@@ -0,0 +1,134 @@
+import os
+import subprocess
+
+from qio import fs
+from qio.builder.tools import piolib, piomisc, piotest
+from qio.project.config import ProjectConfig
+from qio.test import cli as test_cli
+from qio.test import impact
+from qio.test.helpers import list_test_suites
+
+
+class DummyEnv(dict):
+    def __init__(self, config, env_name, test_name):
+        super().__init__(PIOENV=env_name, PIOTEST_RUNNING_NAME=test_name)
+        self.config = config
+
+    def subst(self, value):
+        for name, option in (
+            ("$PROJECT_WORKSPACE_DIR", "workspace_dir"),
+            ("$PROJECT_TEST_DIR", "test_dir"),
+        ):
+            value = value.replace(name, self.config.get("platformio", option))
+        return value.replace("$PROJECT_DIR", os.getcwd())
+
+    def GetProjectConfig(self):  # pylint: disable=invalid-name
+        return self.config
+
+    def GetProjectOption(self, option, default=None):  # pylint: disable=invalid-name
+        return self.config.get("env:" + self["PIOENV"], option, default)
+
+    def GetExtraScripts(self, scope):  # pylint: disable=invalid-name
+        return piomisc.GetExtraScripts(self, scope)
+
+
+class DummyLibBuilder:
+    def __init__(self, path, depbuilders=None):
+        self.path = path
+        self.depbuilders = depbuilders or []
+
+
+class DummyProjectBuilder(DummyLibBuilder):
+    lib_ldf_mode = "chain"
+
+    def __init__(self, config, search_files, depbuilders):
+        super().__init__(os.getcwd(), depbuilders)
+        self.include_dir = config.get("platformio", "include_dir")
+        self.src_dir = config.get("platformio", "src_dir")
+        self._processed_search_files = [os.path.abspath(p) for p in search_files]
+        self._graph_cache = piolib.IncludeGraphCache(
+            os.path.join(config.get("platformio", "build_dir"), "ldf.cache.json")
+        )
+
+    def get_include_graph_cache(self):
+        return self._graph_cache
+
+
+def save_fingerprint(monkeypatch, config, test_name, lib_name):
+    callbacks = []
+    monkeypatch.setattr(piotest.atexit, "register", callbacks.append)
+    project = DummyProjectBuilder(
+        config,
+        [os.path.join("test", test_name, "main.cpp")],
+        [DummyLibBuilder(os.path.realpath(os.path.join("lib", lib_name)))],
+    )
+    piotest.SaveTestFingerprint(DummyEnv(config, "native", test_name), project)
+    assert len(callbacks) == 1
+    callbacks[0]()
+
+
+def test_changed_since(tmp_path, monkeypatch):
+    project_dir = tmp_path / "project"
+    for name in ("lib/foo/foo.h", "lib/bar/bar.h", "src/main.cpp", "extra.py"):
+        (project_dir / name).parent.mkdir(parents=True, exist_ok=True)
+        (project_dir / name).write_text("// %s\n" % name)
+    for name in ("test_foo", "test_bar", "test_new"):
+        (project_dir / "test" / name).mkdir(parents=True)
+        (project_dir / "test" / name / "main.cpp").write_text("int main() {}\n")
+    (project_dir / "platformio.ini").write_text(
+        "[env:native]\nplatform = native\nextra_scripts = pre:extra.py\n"
+        "test_build_src = yes\n"
+    )
+
+    def _git(*args):
+        subprocess.run(["git"] + list(args), cwd=str(project_dir), check=True)
+
+    _git("init", "-q")
+    _git("add", ".")
+    _git("-c", "user.name=qio", "-c", "user.email=qio@localhost", "commit", "-qm", "1")
+
+    with fs.cd(str(project_dir)):
+        config = ProjectConfig("platformio.ini")
+        for name, lib in (("test_foo", "foo"), ("test_bar", "bar")):
+            save_fingerprint(monkeypatch, config, name, lib)
+
+    # a relative snapshot is resolved against the current dir
+    with fs.cd(str(tmp_path)):
+        snapshot_dir = test_cli.validate_changed_since(
+            None, None, os.path.join("project", ".pio", "test_impact")
+        )
+    assert snapshot_dir == os.path.join(str(project_dir), ".pio", "test_impact")
+
+    with fs.cd(str(project_dir)):
+
+        def _selected(changed_since):
+            return [
+                s.test_name
+                for s in list_test_suites(
+                    config,
+                    environments=[],
+                    filters=[],
+                    ignores=[],
+                    impact=impact.TestImpactAnalysis(config, changed_since),
+                )
+                if not s.is_finished()
+            ]
+
+        # suites without a fingerprint are always selected
+        assert _selected("HEAD") == ["test_new"]
+        assert _selected(snapshot_dir) == ["test_new"]
+
+        (project_dir / "lib" / "foo" / "foo.h").write_text("// changed\n")
+        assert sorted(_selected("HEAD")) == ["test_foo", "test_new"]
+        assert sorted(_selected(snapshot_dir)) == ["test_foo", "test_new"]
+
+        # a new project source is built for all suites
+        (project_dir / "src" / "extra.cpp").write_text("int extra;\n")
+        assert sorted(_selected("HEAD")) == ["test_bar", "test_foo", "test_new"]
+        assert sorted(_selected(snapshot_dir)) == ["test_bar", "test_foo", "test_new"]
+        (project_dir / "src" / "extra.cpp").unlink()
+        assert sorted(_selected(snapshot_dir)) == ["test_foo", "test_new"]
+
+        (project_dir / "extra.py").write_text("# changed\n")
+        assert sorted(_selected("HEAD")) == ["test_bar", "test_foo", "test_new"]
+        assert sorted(_selected(snapshot_dir)) == ["test_bar", "test_foo", "test_new"]
@@ -0,0 +1,72 @@
+import os
+import stat
+from collections import OrderedDict
+
+import pytest
+
+from qio import cache, toolchain
+from qio.cache import ContentCache
+from qio.compat import IS_WINDOWS
+
+STUB_COMPILER = """#!/bin/sh
+echo "$*" >> "%s"
+echo "#define __STUB__ %s"
+echo "#define __FLAGS__ $*"
+echo "#define __EMPTY__"
+"""
+
+
+@pytest.mark.skipif(IS_WINDOWS, reason="a stub compiler is a shell script")
+def test_compiler_defines_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "get_project_cache_dir", lambda: str(tmp_path))
+    monkeypatch.setattr("qio.app.get_setting", lambda name: True)
+    monkeypatch.setattr(ContentCache, "_MEMORY_ITEMS", OrderedDict())
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls_path = tmp_path / "calls.txt"
+    compiler_path = bin_dir / "stub-gcc"
+
+    def _write_compiler(version):
+        compiler_path.write_text(STUB_COMPILER % (calls_path, version))
+        os.chmod(str(compiler_path), stat.S_IRWXU)
+
+    def _get_defines(*flags):
+        return toolchain.get_compiler_defines(
+            "stub-gcc",
+            language="c",
+            flags=list(flags),
+            env=dict(os.environ, PATH=str(bin_dir)),
+        )
+
+    def _calls():
+        if not calls_path.is_file():
+            return 0
+        return len(calls_path.read_text().splitlines())
+
+    _write_compiler("1")
+    defines = _get_defines("-mcpu=cortex-m4", "-O2")
+    assert "__STUB__=1" in defines
+    assert "__EMPTY__" in defines
+    assert _calls() == 1
+    # a cache hit, the other flags do not change builtin macros
+    assert _get_defines("-mcpu=cortex-m4", "-O0", "-DDEBUG") == defines
+    assert _calls() == 1
+    # the cache is shared between processes
+    monkeypatch.setattr(ContentCache, "_MEMORY_ITEMS", OrderedDict())
+    assert _get_defines("-mcpu=cortex-m4") == defines
+    assert _calls() == 1
+
+    # the -m/-f/-std flags are a part of a key
+    for flags in (
+        ("-mcpu=cortex-m0",),
+        ("-mcpu=cortex-m4", "-fno-common"),
+        ("-mcpu=cortex-m4", "-std=gnu11"),
+    ):
+        calls = _calls()
+        assert "__FLAGS__=-x c %s -dM -E -" % " ".join(flags) in _get_defines(*flags)
+        assert _calls() == calls + 1
+
+    # a changed compiler binary
+    _write_compiler("22")
+    assert "__STUB__=22" in _get_defines("-mcpu=cortex-m4")
+    assert _calls() == 5
@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from qio import util
+
+
+def test_throttle_threads():
+    calls = []
+
+    @util.throttle(50)
+    def _call(_):
+        calls.append(time.time())
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_call, range(4)))
+    calls.sort()
+    # the concurrent calls are spaced out too
+    assert all(b - a >= 0.045 for a, b in zip(calls, calls[1:]))
+
+
+def test_throttle_suspended():
+    calls = []
+
+    @util.throttle(500)
+    def _call(_):
+        calls.append(time.time())
+
+    def _suspended_call(value):
+        with util.throttle.suspended():
+            _call(value)
+
+    _call(None)
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_suspended_call, range(4)))
+    assert len(calls) == 5
+    assert time.time() - started < 0.4
+    # the other calls are still throttled
+    _call(None)
+    assert calls[-1] - max(calls[:-1]) >= 0.45
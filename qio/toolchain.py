@@ -0,0 +1,88 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+
+from qio import fs
+from qio.cache import ContentCache
+from qio.proc import exec_command
+
+COMPILER_DEFINES_CACHE_VALID = "30d"
+# only these flags change a set of the builtin compiler macros
+COMPILER_DEFINES_FLAG_PREFIXES = ("-m", "-f", "-std")
+
+# {(path, mtime, size): sha1}
+_COMPILER_DIGESTS = {}
+
+
+def get_compiler_digest(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    stamp = (path, st.st_mtime, st.st_size)
+    if stamp not in _COMPILER_DIGESTS:
+        _COMPILER_DIGESTS[stamp] = fs.calculate_file_hashsum("sha1", path)
+    return _COMPILER_DIGESTS[stamp]
+
+
+def get_compiler_defines(compiler, language=None, flags=None, env=None):
+    """Return builtin macros of a GCC-compatible compiler as ``NAME[=VALUE]`` list.
+
+    A result is kept in the content cache under the core cache dir and is
+    shared between processes, it is keyed by a hash of the compiler binary and
+    the ``-m/-f/-std`` flags.
+    """
+    flags = [f for f in flags or [] if f.startswith(COMPILER_DEFINES_FLAG_PREFIXES)]
+    cmd = "echo | %s %s%s -dM -E -" % (
+        compiler,
+        "-x %s " % language if language else "",
+        " ".join(flags),
+    )
+
+    compiler_path = shutil.which(compiler, path=(env or os.environ).get("PATH"))
+    digest = get_compiler_digest(compiler_path) if compiler_path else None
+    cache_key = None
+    if digest:
+        cache_key = ContentCache.key_from_args(
+            "compiler-defines", digest, language, json.dumps(flags)
+        )
+        with ContentCache("toolchain", memory_layer=True) as cc:
+            data = cc.get(cache_key)
+        if data:
+            return json.loads(data)
+
+    try:
+        result = exec_command(cmd, env=env, shell=True)
+    except OSError:
+        return []
+    if result["returncode"] != 0:
+        return []
+
+    defines = []
+    for line in result["out"].split("\n"):
+        tokens = line.strip().split(" ", 2)
+        if not tokens or tokens[0] != "#define":
+            continue
+        if len(tokens) > 2:
+            defines.append("%s=%s" % (tokens[1], tokens[2]))
+        else:
+            defines.append(tokens[1])
+
+    if cache_key and defines:
+        with ContentCache("toolchain", memory_layer=True) as cc:
+            cc.set(cache_key, json.dumps(defines), COMPILER_DEFINES_CACHE_VALID)
+    return defines
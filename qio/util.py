@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
 import functools
 import math
 import platform
 import re
 import shutil
+import threading
 import time
 from datetime import datetime
 
@@ -64,17 +66,36 @@ class memoized:
 
 
 class throttle:
+
+    _local = threading.local()
+
     def __init__(self, threshhold):
         self.threshhold = threshhold  # milliseconds
         self.last = 0
+        # the calls from the concurrent threads are spaced out too
+        self._lock = threading.Lock()
+
+    @classmethod
+    @contextlib.contextmanager
+    def suspended(cls):
+        """Skip throttling of the calls made by the current thread, the caller
+        bounds the rate itself (e.g. with a fixed pool of workers)"""
+        cls._local.suspended = True
+        try:
+            yield
+        finally:
+            cls._local.suspended = False
 
     def __call__(self, func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            diff = int(round((time.time() - self.last) * 1000))
-            if diff < self.threshhold:
-                time.sleep((self.threshhold - diff) * 0.001)
-            self.last = time.time()
+            if getattr(throttle._local, "suspended", False):
+                return func(*args, **kwargs)
+            with self._lock:
+                diff = int(round((time.time() - self.last) * 1000))
+                if diff < self.threshhold:
+                    time.sleep((self.threshhold - diff) * 0.001)
+                self.last = time.time()
             return func(*args, **kwargs)
 
         return wrapper